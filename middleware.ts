@@ -0,0 +1,22 @@
+import slugRedirects from "./src/lib/slugRedirects.json";
+
+// Vercel Routing Middleware: 308-redirects migrated article slugs with one
+// lookup in the flat slug store (chains are resolved when the store is
+// written by scripts/migrate_to_clean_urls.py), instead of one vercel.json
+// rule per slug.
+
+export const config = {
+  matcher: "/articles/:slug*",
+};
+
+const SLUG_REDIRECTS: Record<string, string> = slugRedirects;
+
+export default function middleware(request: Request) {
+  const url = new URL(request.url);
+  const slug = url.pathname.slice("/articles/".length).replace(/\/$/, "");
+  const target = SLUG_REDIRECTS[slug];
+  if (!target) return;
+
+  url.pathname = `/articles/${target}`;
+  return Response.redirect(url, 308);
+}
@@ -0,0 +1,348 @@
+"""
+Batch rollup of product activity into static homepage feeds.
+
+Streams new rows from the event tables in keyset-paginated pages, resuming
+from a cursor stored per table, and folds them into per-product daily
+counters in .build/analytics_rollup.json:
+
+  views, clicks   analytics_events (optional: skipped if the table is missing)
+  tracks          wishlist — Deals adds a product there whenever a user
+                  tracks it or sets a price alert
+
+Rows can commit a little after rows with later timestamps, so each run
+re-reads from LATE_ARRIVAL before the newest event seen and skips the ids
+it already counted in that overlap. Counters, cursors and those ids are
+saved together at the end of a run, so an interrupted run is simply
+re-read next time; every event is counted once.
+Daily buckets older than the longest window are dropped, so the state stays
+small however large the tables grow.
+
+Then publishes small feeds to public/feeds/ for the CDN:
+
+  most-tracked.json   most tracked products (30 days, then all time)
+  biggest-drops.json  largest 30-day price drops (price_analytics.py)
+  trending.json       per category, products whose last 7 days beat their
+                      weekly average over the 23 days before
+
+A feed file is only rewritten (and recompressed) when its content changes.
+
+Usage: python scripts/analytics_rollup.py [--rebuild]
+"""
+import os
+import json
+import time
+import argparse
+from datetime import datetime, timedelta, timezone
+
+import requests
+
+import job_ledger
+import metrics
+import precompress
+import price_analytics
+import supabase_client
+from http_renderer import latest_prices
+from optimize_html import kb
+
+PROJECT_ROOT = os.path.abspath(os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+STATE_PATH = os.path.join(PROJECT_ROOT, ".build", "analytics_rollup.json")
+LOCK_PATH = os.path.join(PROJECT_ROOT, ".build", "analytics_rollup.lock")
+FEEDS_DIR = os.path.join(PROJECT_ROOT, "public", "feeds")
+
+STATE_VERSION = 1
+COUNTERS = ("views", "tracks", "clicks")
+WINDOWS = (7, 30)
+FEED_SIZE = 12
+# Commit skew tolerated between concurrent inserts
+LATE_ARRIVAL = timedelta(minutes=10)
+TRENDING_PER_CATEGORY = 6
+
+# How much each kind of event says about interest, for trending
+ACTIVITY_WEIGHTS = {"views": 1, "tracks": 3, "clicks": 2}
+
+# analytics_events.event_type values → counter. Tracks come from wishlist
+# only, so a track logged in both places is not counted twice.
+EVENT_COUNTERS = {
+    "view": "views",
+    "page_view": "views",
+    "product_view": "views",
+    "click": "clicks",
+    "affiliate_click": "clicks",
+    "outbound_click": "clicks",
+}
+
+# (table, time column, select, counter — None means by event_type, optional)
+SOURCES = (
+    ("analytics_events", "created_at", "id,product_id,event_type,created_at", None, True),
+    ("wishlist", "added_at", "id,product_id,added_at", "tracks", False),
+)
+
+CARD_COLUMNS = "id,name,slug,image,category_id,amazon_link,flipkart_link,rating"
+PRICE_COLUMNS = "product_id,created_at,amazon_price,flipkart_price,amazon_discount,flipkart_discount,original_price"
+
+
+def empty_state():
+    return {"version": STATE_VERSION, "cursors": {}, "recent": {}, "days": {}, "totals": {}}
+
+
+def load_state():
+    if not os.path.exists(STATE_PATH):
+        return empty_state()
+    with open(STATE_PATH, "r", encoding="utf-8") as f:
+        state = json.load(f)
+    return state if state.get("version") == STATE_VERSION else empty_state()
+
+
+def save_state(state):
+    os.makedirs(os.path.dirname(STATE_PATH), exist_ok=True)
+    tmp_path = f"{STATE_PATH}.tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(state, f, separators=(",", ":"))
+    os.replace(tmp_path, STATE_PATH)
+
+
+def add_event(state, product_id, day, counter, oldest_day):
+    """Counts one event in the product's all-time total and, if recent enough, its daily bucket."""
+    index = COUNTERS.index(counter)
+    product_id = str(product_id)
+    totals = state["totals"].setdefault(product_id, [0] * len(COUNTERS))
+    totals[index] += 1
+    if day >= oldest_day:
+        bucket = state["days"].setdefault(product_id, {}).setdefault(day, [0] * len(COUNTERS))
+        bucket[index] += 1
+
+
+def parse_time(value):
+    return datetime.fromisoformat(value.replace("Z", "+00:00"))
+
+
+def consume(state, today):
+    """Folds every event not yet counted into `state`. Returns {table: events}."""
+    oldest_day = (today - timedelta(days=max(WINDOWS) - 1)).isoformat()
+    counts = {}
+    for table, column, select, counter, optional in SOURCES:
+        newest = state["cursors"].get(table)
+        recent = state["recent"].setdefault(table, {})
+        params = {"select": select}
+        if newest:
+            params[column] = f"gte.{(parse_time(newest) - LATE_ARRIVAL).isoformat()}"
+        counts[table] = 0
+        try:
+            for page in supabase_client.iter_keyset(table, params, column=column):
+                for row in page:
+                    if row["id"] in recent:
+                        continue
+                    recent[row["id"]] = row[column]
+                    if newest is None or parse_time(row[column]) > parse_time(newest):
+                        newest = row[column]
+                    kind = counter or EVENT_COUNTERS.get(row.get("event_type"))
+                    if not kind or not row.get("product_id"):
+                        metrics.incr("analytics_events_skipped", source=table)
+                        continue
+                    add_event(state, row["product_id"], row[column][:10], kind, oldest_day)
+                    counts[table] += 1
+        except requests.HTTPError as e:
+            if not optional:
+                raise
+            print(f"⚠ Could not read {table} ({e.response.status_code}); skipping it")
+        if newest:
+            state["cursors"][table] = newest
+            overlap = parse_time(newest) - LATE_ARRIVAL
+            state["recent"][table] = {i: ts for i, ts in recent.items() if parse_time(ts) >= overlap}
+        metrics.incr("analytics_events", counts[table], source=table)
+    return counts
+
+
+def prune(state, today):
+    """Drops daily buckets that have left every window."""
+    oldest_day = (today - timedelta(days=max(WINDOWS) - 1)).isoformat()
+    for product_id in list(state["days"]):
+        days = {day: bucket for day, bucket in state["days"][product_id].items() if day >= oldest_day}
+        if days:
+            state["days"][product_id] = days
+        else:
+            del state["days"][product_id]
+
+
+def window_stats(state, product_id, today):
+    """{counter_7d, counter_30d, tracks_total} for one product."""
+    days = state["days"].get(product_id, {})
+    stats = {}
+    for window in WINDOWS:
+        first_day = (today - timedelta(days=window - 1)).isoformat()
+        sums = [0] * len(COUNTERS)
+        for day, bucket in days.items():
+            if day >= first_day:
+                sums = [a + b for a, b in zip(sums, bucket)]
+        stats.update({f"{name}_{window}d": value for name, value in zip(COUNTERS, sums)})
+    stats["tracks_total"] = state["totals"].get(product_id, [0] * len(COUNTERS))[COUNTERS.index("tracks")]
+    return stats
+
+
+def activity(stats, window):
+    return sum(weight * stats[f"{name}_{window}d"] for name, weight in ACTIVITY_WEIGHTS.items())
+
+
+def trend_score(stats):
+    """Last 7 days' activity minus the weekly rate of the 23 days before it."""
+    short, long = min(WINDOWS), max(WINDOWS)
+    recent = activity(stats, short)
+    return recent - (activity(stats, long) - recent) * short / (long - short)
+
+
+def fetch_cards(product_ids):
+    """Card rows plus latest prices for `product_ids`, in bulk: {id: card}."""
+    cards = {}
+    product_ids = list(product_ids)
+    for i in range(0, len(product_ids), supabase_client.PATCH_BATCH_SIZE):
+        batch = supabase_client.in_filter(product_ids[i:i + supabase_client.PATCH_BATCH_SIZE])
+        products = supabase_client.get_all("products", {"select": CARD_COLUMNS, "id": batch})
+        history = supabase_client.get_all("product_price_history", {
+            "select": PRICE_COLUMNS,
+            "product_id": batch,
+            "order": "created_at.desc,id.asc",
+        })
+        by_product = {}
+        for row in history:
+            by_product.setdefault(str(row["product_id"]), []).append(row)
+        for product in products:
+            key = str(product["id"])
+            cards[key] = dict(product, **latest_prices(by_product.get(key, [])))
+    return cards
+
+
+def build_feeds(state, today):
+    """Returns {filename: feed}."""
+    stats = {pid: window_stats(state, pid, today) for pid in set(state["days"]) | set(state["totals"])}
+
+    tracked = sorted(
+        (pid for pid, s in stats.items() if s["tracks_total"]),
+        key=lambda pid: (stats[pid]["tracks_30d"], stats[pid]["tracks_total"], stats[pid]["views_30d"], pid),
+        reverse=True,
+    )[:FEED_SIZE]
+
+    rollups = price_analytics.refresh()["products"]
+    drops = sorted(
+        (pid for pid, r in rollups.items() if (r.get("drop_pct_30d") or 0) > 0),
+        key=lambda pid: (rollups[pid]["drop_pct_30d"], pid),
+        reverse=True,
+    )[:FEED_SIZE]
+
+    # Pick each category's risers from a two-column scan, then fetch just their cards
+    category_of = {
+        str(p["id"]): p.get("category_id")
+        for p in supabase_client.get_all("products", {"select": "id,category_id", "order": "id.asc"})
+    }
+    categories = {c["id"]: c for c in supabase_client.get_all("categories", {"select": "id,name,slug"})}
+    rising = {}
+    for pid in sorted((pid for pid, s in stats.items() if trend_score(s) > 0),
+                      key=lambda pid: (trend_score(stats[pid]), pid), reverse=True):
+        category = categories.get(category_of.get(pid))
+        if category:
+            picks = rising.setdefault(category["id"], [])
+            if len(picks) < TRENDING_PER_CATEGORY:
+                picks.append(pid)
+
+    cards = fetch_cards(set(tracked) | set(drops) | {pid for picks in rising.values() for pid in picks})
+    trending = [
+        {
+            "name": categories[category_id]["name"],
+            "slug": categories[category_id]["slug"],
+            "items": [dict(cards[pid], stats=stats[pid], trend=round(trend_score(stats[pid]), 1))
+                      for pid in picks if pid in cards],
+        }
+        for category_id, picks in rising.items()
+    ]
+
+    as_of = today.isoformat()
+    return {
+        "most-tracked.json": {
+            "as_of": as_of,
+            "items": [dict(cards[pid], stats=stats[pid]) for pid in tracked if pid in cards],
+        },
+        "biggest-drops.json": {
+            "as_of": as_of,
+            "items": [dict(cards[pid], price=rollups[pid]) for pid in drops if pid in cards],
+        },
+        "trending.json": {
+            "as_of": as_of,
+            "categories": sorted(trending, key=lambda c: c["name"]),
+        },
+    }
+
+
+def publish(feeds):
+    """Writes feeds whose content changed. Returns (written paths, all paths)."""
+    os.makedirs(FEEDS_DIR, exist_ok=True)
+    written, paths = [], []
+    for filename, feed in feeds.items():
+        path = os.path.join(FEEDS_DIR, filename)
+        text = json.dumps(feed, ensure_ascii=False, separators=(",", ":"), default=str)
+        paths.append(path)
+        if os.path.exists(path):
+            with open(path, "r", encoding="utf-8") as f:
+                if f.read() == text:
+                    continue
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            f.write(text)
+        os.replace(tmp_path, path)
+        written.append(path)
+    return written, paths
+
+
+def rollup(rebuild=False):
+    started = time.perf_counter()
+    today = datetime.now(timezone.utc).date()
+    state = empty_state() if rebuild else load_state()
+
+    with metrics.phase("consume"):
+        counts = consume(state, today)
+        prune(state, today)
+    for table, n in counts.items():
+        newest = state["cursors"].get(table)
+        print(f"📊 {table}: {n:,} new event(s)" + (f" (newest {newest})" if newest else ""))
+
+    with metrics.phase("feeds"):
+        feeds = build_feeds(state, today)
+        written, paths = publish(feeds)
+        sizes = precompress.precompress(paths, workers=1)
+    # Feeds are on disk before the cursors move; a crash in between just re-reads the events
+    save_state(state)
+
+    for path in paths:
+        raw, gz, br = sizes[path]
+        feed = feeds[os.path.basename(path)]
+        entries = len(feed.get("items", feed.get("categories", [])))
+        status = "updated" if path in written else "unchanged"
+        print(f"   feeds/{os.path.basename(path)}: {entries} entries, {kb(raw)} raw, {kb(br)} brotli ({status})")
+    print(f"   {len(state['totals'])} products with activity, {len(state['days'])} in the last {max(WINDOWS)} days "
+          f"({time.perf_counter() - started:.1f}s)")
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Roll product activity up into static JSON feeds")
+    parser.add_argument("--rebuild", action="store_true",
+                        help="forget the cursors and counters and re-read every event")
+    return parser.parse_args()
+
+
+def main():
+    args = parse_args()
+    try:
+        lock = job_ledger.RunLock(LOCK_PATH).acquire()
+    except job_ledger.RunLocked as e:
+        print(f"❌ {e}")
+        return
+    metrics.start("analytics_rollup")
+    status = "error"
+    try:
+        rollup(rebuild=args.rebuild)
+        status = "ok"
+    finally:
+        metrics.finish(status)
+        lock.release()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,336 @@
+"""
+Structured index of every generated article page, in .build/article_index.sqlite.
+
+One row per public/articles/<slug>.html with the facts the post-processors
+and audit tools otherwise regex out of the HTML again and again:
+
+  pages      slug, title, description, canonical URL, og:image, JSON-LD
+             @types present, datePublished/dateModified, keywords, size,
+             mtime and two hashes: the raw bytes (output_hash) and the bytes
+             with the page's own article URL normalised away (content_hash,
+             see dedup_articles.py)
+  products   slug, position, name, price, image, offer URL (from ItemList)
+
+generate_html.write_page() and postprocess.py index each page as they write
+it; sync() catches anything else (dedup pruning, hand edits) by re-reading
+only the files whose size or mtime no longer match their row.
+
+Usage: python scripts/article_index.py [--rebuild] [--audit] [--sql "SELECT ..."]
+"""
+import os
+import re
+import sys
+import json
+import sqlite3
+import hashlib
+import argparse
+import threading
+from datetime import datetime, timezone
+from html import unescape
+
+from html_utils import parse_ld_json, ld_json_schemas
+from migrate_to_clean_urls import update_canonical_in_html
+
+PROJECT_ROOT = os.path.abspath(os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+ARTICLES_DIR = os.path.join(PROJECT_ROOT, "public", "articles")
+INDEX_PATH = os.path.join(PROJECT_ROOT, ".build", "article_index.sqlite")
+
+PLACEHOLDER_SLUG = "__slug__"
+PLACEHOLDER_IMAGE = "https://lovable.dev/opengraph-image-p98pqg.png"
+# Pages above this are flagged by --audit
+LARGE_PAGE_BYTES = 400 * 1024
+
+TITLE_PATTERN = re.compile(r"<title[^>]*>([^<]+)</title>")
+CANONICAL_PATTERN = re.compile(r'<link[^>]*rel="canonical"[^>]*href="([^"]+)"')
+# The react-helmet (data-rh) og:image is the page's own; the first one is the site default
+OG_IMAGE_PATTERN = re.compile(r'<meta[^>]*property="og:image"[^>]*content="([^"]+)"[^>]*>')
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS pages (
+    slug TEXT PRIMARY KEY,
+    title TEXT,
+    description TEXT,
+    canonical TEXT,
+    og_image TEXT,
+    ld_types TEXT NOT NULL,
+    date_published TEXT,
+    date_modified TEXT,
+    keywords TEXT,
+    bytes INTEGER NOT NULL,
+    mtime_ns INTEGER NOT NULL,
+    output_hash TEXT NOT NULL,
+    content_hash TEXT NOT NULL,
+    indexed_at TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS products (
+    slug TEXT NOT NULL,
+    position INTEGER NOT NULL,
+    name TEXT NOT NULL,
+    price REAL,
+    image TEXT,
+    url TEXT,
+    PRIMARY KEY (slug, position)
+);
+CREATE INDEX IF NOT EXISTS products_name ON products (name);
+"""
+
+PAGE_COLUMNS = ("slug", "title", "description", "canonical", "og_image", "ld_types", "date_published",
+                "date_modified", "keywords", "bytes", "mtime_ns", "output_hash", "content_hash", "indexed_at")
+# Bump when the tables change; older index files are dropped and rebuilt by sync()
+SCHEMA_VERSION = 2
+
+
+def sha256(data):
+    return hashlib.sha256(data).hexdigest()
+
+
+def content_hash(html, slug):
+    """Hash with this page's own article URL replaced by a placeholder."""
+    normalised = update_canonical_in_html(html, slug, PLACEHOLDER_SLUG)
+    return sha256(normalised.encode("utf-8"))
+
+
+def page_facts(page_html, ld_blocks=None):
+    """
+    Everything the index stores about a page's content (text and attribute
+    values unescaped). Pass already-parsed `ld_blocks` to avoid re-scanning the page.
+    """
+    if ld_blocks is None:
+        ld_blocks = parse_ld_json(page_html)
+
+    title_match = TITLE_PATTERN.search(page_html)
+    canonical_match = CANONICAL_PATTERN.search(page_html)
+    og_images = OG_IMAGE_PATTERN.findall(page_html)
+    facts = {
+        "title": unescape(re.sub(r"\s*\|\s*ApniList\s*$", "", title_match.group(1)).strip()) if title_match else None,
+        "description": None,
+        "canonical": unescape(canonical_match.group(1)) if canonical_match else None,
+        "og_image": unescape(og_images[-1]) if og_images else None,
+        "ld_types": [],
+        "date_published": None,
+        "date_modified": None,
+        "keywords": None,
+        "products": [],
+    }
+
+    for schema in ld_json_schemas(ld_blocks):
+        kind = schema.get("@type")
+        if isinstance(kind, str) and kind not in facts["ld_types"]:
+            facts["ld_types"].append(kind)
+        if kind == "Article":
+            facts["description"] = schema.get("description")
+            facts["date_published"] = schema.get("datePublished")
+            facts["date_modified"] = schema.get("dateModified")
+            keywords = schema.get("keywords")
+            facts["keywords"] = ", ".join(keywords) if isinstance(keywords, list) else keywords
+        elif kind == "ItemList":
+            for item in schema.get("itemListElement", []):
+                product = item.get("item", {})
+                if product.get("@type") != "Product":
+                    continue
+                offers = product.get("offers")
+                offers = offers if isinstance(offers, dict) else {}
+                image = product.get("image")
+                facts["products"].append({
+                    "position": item.get("position") or len(facts["products"]) + 1,
+                    "name": product.get("name", ""),
+                    "price": offers.get("price"),
+                    "image": image if isinstance(image, str) else None,
+                    "url": offers.get("url"),
+                })
+    facts["ld_types"].sort()
+    return facts
+
+
+def page_entry(path, data=None, ld_blocks=None):
+    """Index entry for the article file at `path` (its current bytes if `data` is omitted)."""
+    if data is None:
+        with open(path, "rb") as f:
+            data = f.read()
+    slug = os.path.basename(path)[:-5]
+    html = data.decode("utf-8")
+    stat = os.stat(path)
+    entry = page_facts(html, ld_blocks)
+    entry.update(
+        slug=slug,
+        bytes=len(data),
+        mtime_ns=stat.st_mtime_ns,
+        output_hash=sha256(data),
+        content_hash=content_hash(html, slug),
+    )
+    return entry
+
+
+class ArticleIndex:
+    """The pages/products tables. Safe to share between render threads."""
+
+    def __init__(self, path=INDEX_PATH):
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        self.conn = sqlite3.connect(path, check_same_thread=False, timeout=30)
+        self.conn.row_factory = sqlite3.Row
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        if self.conn.execute("PRAGMA user_version").fetchone()[0] != SCHEMA_VERSION:
+            self.conn.executescript("DROP TABLE IF EXISTS pages; DROP TABLE IF EXISTS products;")
+            self.conn.execute(f"PRAGMA user_version = {SCHEMA_VERSION}")
+        self.conn.executescript(SCHEMA)
+        self.lock = threading.Lock()
+
+    def put(self, entries):
+        """Inserts or replaces the pages (and their products) for `entries`."""
+        stamp = datetime.now(timezone.utc).isoformat(timespec="seconds")
+        page_rows = []
+        product_rows = []
+        for entry in entries:
+            row = dict(entry, ld_types=json.dumps(entry["ld_types"]), indexed_at=stamp)
+            page_rows.append(tuple(row[column] for column in PAGE_COLUMNS))
+            product_rows.extend(
+                (entry["slug"], p["position"], p["name"], p["price"], p["image"], p["url"])
+                for p in entry["products"]
+            )
+        placeholders = ",".join("?" * len(PAGE_COLUMNS))
+        with self.lock:
+            self.conn.executemany("DELETE FROM products WHERE slug = ?", [(row[0],) for row in page_rows])
+            self.conn.executemany(f"INSERT OR REPLACE INTO pages ({','.join(PAGE_COLUMNS)}) "
+                                  f"VALUES ({placeholders})", page_rows)
+            self.conn.executemany("INSERT OR REPLACE INTO products VALUES (?, ?, ?, ?, ?, ?)", product_rows)
+            self.conn.commit()
+
+    def remove(self, slugs):
+        rows = [(slug,) for slug in slugs]
+        with self.lock:
+            self.conn.executemany("DELETE FROM pages WHERE slug = ?", rows)
+            self.conn.executemany("DELETE FROM products WHERE slug = ?", rows)
+            self.conn.commit()
+
+    def query(self, sql, params=()):
+        with self.lock:
+            return self.conn.execute(sql, params).fetchall()
+
+    def sync(self, articles_dir=ARTICLES_DIR):
+        """
+        Re-indexes the files whose size or mtime changed and drops rows for
+        deleted files. Returns (reindexed, removed).
+        """
+        known = {row["slug"]: (row["bytes"], row["mtime_ns"])
+                 for row in self.query("SELECT slug, bytes, mtime_ns FROM pages")}
+        stale = []
+        present = set()
+        for filename in os.listdir(articles_dir):
+            if not filename.endswith(".html"):
+                continue
+            slug = filename[:-5]
+            present.add(slug)
+            stat = os.stat(os.path.join(articles_dir, filename))
+            if known.get(slug) != (stat.st_size, stat.st_mtime_ns):
+                stale.append(os.path.join(articles_dir, filename))
+
+        self.put(page_entry(path) for path in stale)
+        removed = sorted(set(known) - present)
+        self.remove(removed)
+        return len(stale), len(removed)
+
+    def pages(self):
+        """{slug: row} for every indexed page."""
+        return {row["slug"]: row for row in self.query("SELECT * FROM pages ORDER BY slug")}
+
+    def page(self, slug):
+        rows = self.query("SELECT * FROM pages WHERE slug = ?", (slug,))
+        return rows[0] if rows else None
+
+    def products(self, slug):
+        return self.query("SELECT * FROM products WHERE slug = ? ORDER BY position", (slug,))
+
+    def close(self):
+        with self.lock:
+            self.conn.close()
+
+
+_index = None
+_index_lock = threading.Lock()
+
+
+def default_index():
+    """The process-wide ArticleIndex on INDEX_PATH, opened on first use."""
+    global _index
+    with _index_lock:
+        if _index is None:
+            _index = ArticleIndex()
+        return _index
+
+
+def is_article_path(path):
+    """Only public/articles pages are indexed (not e.g. benchmark output)."""
+    return os.path.dirname(os.path.abspath(path)) == ARTICLES_DIR
+
+
+def record(path, data=None, ld_blocks=None):
+    """Indexes a page that was just written."""
+    if is_article_path(path):
+        default_index().put([page_entry(path, data, ld_blocks)])
+
+
+# --- Audit ---
+
+def audit(index):
+    """Returns [(slug, problem)] for pages that fail the SEO checks."""
+    problems = []
+    with_products = {slug for (slug,) in index.query("SELECT DISTINCT slug FROM products")}
+    for slug, page in index.pages().items():
+        ld_types = set(json.loads(page["ld_types"]))
+        if not page["title"]:
+            problems.append((slug, "no <title>"))
+        if page["canonical"] != f"https://www.apnilist.co.in/articles/{slug}":
+            problems.append((slug, f"canonical is {page['canonical'] or 'missing'}"))
+        if not page["og_image"] or page["og_image"] == PLACEHOLDER_IMAGE:
+            problems.append((slug, "placeholder og:image"))
+        if "Article" not in ld_types:
+            problems.append((slug, "no Article JSON-LD"))
+        if slug not in with_products:
+            problems.append((slug, "no products in ItemList JSON-LD"))
+        if slug.startswith("best-") and "FAQPage" not in ld_types:
+            problems.append((slug, "clean-URL page without FAQPage JSON-LD"))
+        if page["bytes"] > LARGE_PAGE_BYTES:
+            problems.append((slug, f"{page['bytes'] / 1024:.0f} KB page"))
+
+    for slug, missing in index.query(
+        "SELECT slug, COUNT(*) FROM products WHERE price IS NULL OR price = 0 OR image IS NULL GROUP BY slug"
+    ):
+        problems.append((slug, f"{missing} product(s) without a price or image"))
+    return sorted(problems)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Index generated article pages")
+    parser.add_argument("--rebuild", action="store_true", help="re-index every page from scratch")
+    parser.add_argument("--audit", action="store_true", help="report pages failing the SEO checks")
+    parser.add_argument("--sql", help="run a read-only query against the index and print the rows")
+    args = parser.parse_args()
+
+    index = default_index()
+    if args.rebuild:
+        index.remove(index.pages())
+    reindexed, removed = index.sync()
+    total = index.query("SELECT COUNT(*), COALESCE(SUM(bytes), 0) FROM pages")[0]
+    print(f"🗂  Article index: {total[0]} pages ({total[1] / 1024 / 1024:.1f} MB of HTML), "
+          f"{reindexed} re-indexed, {removed} removed")
+
+    if args.sql:
+        conn = sqlite3.connect(f"file:{INDEX_PATH}?mode=ro", uri=True)
+        rows = conn.execute(args.sql).fetchall()
+        conn.close()
+        for row in rows:
+            print(" | ".join(str(value) for value in row))
+        print(f"({len(rows)} row(s))")
+
+    if args.audit:
+        problems = audit(index)
+        for slug, problem in problems:
+            print(f"   ⚠ {slug}: {problem}")
+        print(f"🔎 Audit: {len(problems)} problem(s) across {len({slug for slug, _ in problems})} page(s)")
+        return 1 if problems else 0
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
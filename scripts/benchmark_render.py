@@ -0,0 +1,425 @@
+"""
+Render throughput benchmark for generate_html.py.
+Starts a local fixture server that plays both the dev server (/draft/<slug>
+pages that set window.__APNILIST_READY__) and Supabase (stubbed /rest/v1
+tables holding N synthetic articles), then runs the generator's phases
+against it and times each one:
+
+  server_check    is_server_running()
+  supabase_fetch  unprocessed-article query and bulk bundle fetch
+  driver_startup  setup_driver()                    (selenium)
+  driver_get      driver.get()                      (selenium)
+  wait            wait_until_ready()                (selenium)
+  page_source     driver.page_source                (selenium)
+  render          http_renderer.render_article()    (http)
+  disk_write      write_page()
+  patch           mark_articles_as_processed()
+
+The JSON report holds p50/p95/p99 per phase and pages per minute; pass an
+earlier report with --compare to print the difference.
+
+Pages are written to a temporary directory, so public/ is never touched.
+
+Usage: python scripts/benchmark_render.py [--articles 50] [--renderer http] [--workers 4]
+                                          [--compare .build/benchmarks/<old>.json]
+"""
+import os
+import re
+import sys
+import json
+import time
+import argparse
+import tempfile
+import threading
+import subprocess
+from datetime import datetime, timezone
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qsl
+
+PROJECT_ROOT = os.path.abspath(os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+REPORT_DIR = os.path.join(PROJECT_ROOT, ".build", "benchmarks")
+
+PHASES = [
+    "server_check", "supabase_fetch", "driver_startup", "driver_get",
+    "wait", "page_source", "render", "disk_write", "patch",
+]
+
+RANGE_PATTERN = re.compile(r"(\d+)-(\d+)")
+
+
+# --- Synthetic data ---
+
+def synthetic_tables(articles, products_per_article, history_per_product):
+    """Builds the rows the generator reads: articles, article_products and price history."""
+    rows = {"articles": [], "article_products": [], "product_price_history": []}
+    paragraph = "<p>" + "Detailed comparison of features, build quality and value for money. " * 12 + "</p>"
+    product_id = 0
+    for i in range(1, articles + 1):
+        rows["articles"].append({
+            "id": i,
+            "slug": f"bench-article-{i:05d}",
+            "title": f"Best Benchmark Appliance {i} in India",
+            "excerpt": f"Our picks for benchmark appliance {i}, compared on price and features.",
+            "content": paragraph * 20,
+            "tags": ["benchmark", f"appliance-{i % 10}"],
+            "author": "ApniList Team",
+            "featured_image": f"https://example.com/images/{i}.jpg",
+            "status": "published",
+            "views": i * 10,
+            "static_html_generated": False,
+            "created_at": "2026-01-01T00:00:00+00:00",
+            "updated_at": "2026-02-01T00:00:00+00:00",
+            "category_id": 1,
+            "categories": {"id": 1, "name": "Appliances", "slug": "appliances"},
+        })
+        for rank in range(1, products_per_article + 1):
+            product_id += 1
+            rows["article_products"].append({
+                "article_id": i,
+                "rank": rank,
+                "product_id": product_id,
+                "products": {
+                    "id": product_id,
+                    "name": f"Benchmark Product {product_id}",
+                    "slug": f"benchmark-product-{product_id}",
+                    "image": f"https://example.com/products/{product_id}.jpg",
+                    "short_description": "A dependable pick with a strong feature set.",
+                    "pros": ["Quiet", "Efficient", "Good warranty"],
+                    "cons": ["Bulky"],
+                    "tags": ["benchmark"],
+                    "badge": "Top Pick" if rank == 1 else None,
+                    "rating": 4.2,
+                    "amazon_link": f"https://amazon.in/dp/{product_id}",
+                    "flipkart_link": f"https://flipkart.com/p/{product_id}",
+                },
+            })
+            for day in range(history_per_product):
+                rows["product_price_history"].append({
+                    "id": len(rows["product_price_history"]) + 1,
+                    "product_id": product_id,
+                    "amazon_price": 20000 - day * 10,
+                    "flipkart_price": 20500 - day * 10,
+                    "original_price": 25000,
+                    "amazon_discount": 20,
+                    "flipkart_discount": 18,
+                    "created_at": f"2026-01-{28 - day % 28:02d}T00:00:00+00:00",
+                })
+    return rows
+
+
+def draft_page(article, products, ready_delay_ms):
+    """The /draft/<slug> stand-in: article markup plus the readiness flag ArticleDetail sets."""
+    cards = "".join(
+        f'<div data-product-card id="product-{p["rank"]}"><h3>{p["products"]["name"]}</h3>'
+        f'<img src="/placeholder.svg" alt=""><p>{p["products"]["short_description"]}</p></div>'
+        for p in products
+    )
+    return (
+        f'<!doctype html><html lang="en"><head><meta charset="UTF-8">'
+        f'<title>{article["title"]} | ApniList</title>'
+        f'<meta name="description" content="{article["excerpt"]}"></head>'
+        f'<body><div id="root"><main><article><h1>{article["title"]}</h1>'
+        f'{article["content"]}{cards}</article></main></div>'
+        f'<script>window.__APNILIST_READY__ = false;'
+        f'setTimeout(function () {{ window.__APNILIST_READY__ = true; }}, {ready_delay_ms});</script>'
+        f'</body></html>'
+    )
+
+
+TEMPLATE_HTML = (
+    '<!doctype html><html lang="en"><head><meta charset="UTF-8">'
+    '<title>ApniList</title><meta name="description" content="ApniList">'
+    '<meta property="og:title" content="ApniList"></head>'
+    '<body><div id="root"></div></body></html>'
+)
+
+
+# --- Fixture server ---
+
+def make_handler(tables, ready_delay_ms):
+    articles_by_slug = {a["slug"]: a for a in tables["articles"]}
+    products_by_article = {}
+    for ap in tables["article_products"]:
+        products_by_article.setdefault(ap["article_id"], []).append(ap)
+
+    class FixtureHandler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+
+        def log_message(self, format, *args):
+            pass
+
+        def send(self, status, body=b"", content_type="application/json"):
+            self.send_response(status)
+            self.send_header("Content-Type", content_type)
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def do_GET(self):
+            path, _, query = self.path.partition("?")
+            if path.startswith("/rest/v1/"):
+                rows = tables.get(path[len("/rest/v1/"):])
+                if rows is None:
+                    return self.send(404, b"[]")
+                # Only in.(...) filters matter here: http_renderer batches history by product id
+                for column, value in parse_qsl(query):
+                    if value.startswith("in.(") and value.endswith(")"):
+                        wanted = {v.strip('"') for v in value[4:-1].split(",")}
+                        rows = [row for row in rows if str(row.get(column)) in wanted]
+                match = RANGE_PATTERN.match(self.headers.get("Range", ""))
+                if match:
+                    start, end = int(match.group(1)), int(match.group(2))
+                    rows = rows[start:end + 1]
+                return self.send(200, json.dumps(rows).encode("utf-8"))
+            if path.startswith("/draft/"):
+                article = articles_by_slug.get(path[len("/draft/"):])
+                if article is None:
+                    return self.send(404, b"Not found", "text/plain")
+                html = draft_page(article, products_by_article.get(article["id"], []), ready_delay_ms)
+                return self.send(200, html.encode("utf-8"), "text/html; charset=utf-8")
+            self.send(200, b"<!doctype html><title>fixture</title>", "text/html; charset=utf-8")
+
+        def do_PATCH(self):
+            self.rfile.read(int(self.headers.get("Content-Length") or 0))
+            self.send(204)
+
+    return FixtureHandler
+
+
+def start_fixture_server(tables, ready_delay_ms):
+    server = ThreadingHTTPServer(("127.0.0.1", 0), make_handler(tables, ready_delay_ms))
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, name="fixture-server", daemon=True).start()
+    return server
+
+
+# --- Phase timing ---
+
+class PhaseTimer:
+    """Collects per-call durations (ms) for each phase, from any thread."""
+
+    def __init__(self):
+        self.samples = {}
+        self.lock = threading.Lock()
+
+    def record(self, phase, ms):
+        with self.lock:
+            self.samples.setdefault(phase, []).append(ms)
+
+    def wrap(self, phase, fn):
+        def timed(*args, **kwargs):
+            started = time.perf_counter()
+            try:
+                return fn(*args, **kwargs)
+            finally:
+                self.record(phase, (time.perf_counter() - started) * 1000)
+        return timed
+
+
+class TimedDriver:
+    """Proxies a WebDriver, timing get() and page_source."""
+
+    def __init__(self, driver, timer):
+        self._driver = driver
+        self._timer = timer
+
+    def get(self, url):
+        return self._timer.wrap("driver_get", self._driver.get)(url)
+
+    @property
+    def page_source(self):
+        started = time.perf_counter()
+        try:
+            return self._driver.page_source
+        finally:
+            self._timer.record("page_source", (time.perf_counter() - started) * 1000)
+
+    def __getattr__(self, name):
+        return getattr(self._driver, name)
+
+
+def instrument(generate_html, http_renderer, timer):
+    """Wraps the generator's phase functions with timers."""
+    generate_html.is_server_running = timer.wrap("server_check", generate_html.is_server_running)
+    generate_html.get_unprocessed_articles_from_supabase = timer.wrap(
+        "supabase_fetch", generate_html.get_unprocessed_articles_from_supabase)
+    http_renderer.fetch_all_bundles = timer.wrap("supabase_fetch", http_renderer.fetch_all_bundles)
+    generate_html.wait_until_ready = timer.wrap("wait", generate_html.wait_until_ready)
+    generate_html.write_page = timer.wrap("disk_write", generate_html.write_page)
+    generate_html.mark_articles_as_processed = timer.wrap("patch", generate_html.mark_articles_as_processed)
+    http_renderer.render_article = timer.wrap("render", http_renderer.render_article)
+
+    setup_driver = timer.wrap("driver_startup", generate_html.setup_driver)
+    generate_html.setup_driver = lambda: TimedDriver(setup_driver(), timer)
+
+
+def percentile(sorted_values, pct):
+    """Nearest-rank percentile of an already sorted list."""
+    if not sorted_values:
+        return None
+    rank = max(1, -(-len(sorted_values) * pct // 100))
+    return sorted_values[int(rank) - 1]
+
+
+def summarize(samples):
+    phases = {}
+    for phase in PHASES:
+        values = sorted(samples.get(phase, []))
+        if not values:
+            continue
+        phases[phase] = {
+            "count": len(values),
+            "total_ms": round(sum(values), 2),
+            "p50_ms": round(percentile(values, 50), 2),
+            "p95_ms": round(percentile(values, 95), 2),
+            "p99_ms": round(percentile(values, 99), 2),
+            "max_ms": round(values[-1], 2),
+        }
+    return phases
+
+
+def git_commit():
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"],
+            cwd=PROJECT_ROOT, capture_output=True, text=True, check=True,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+# --- Run ---
+
+def run_benchmark(args):
+    tables = synthetic_tables(args.articles, args.products, args.history)
+    server = start_fixture_server(tables, args.ready_delay)
+    fixture_url = f"http://127.0.0.1:{server.server_address[1]}"
+    print(f"🧪 Fixture server at {fixture_url} ({args.articles} articles, {args.products} products each)")
+
+    workdir = tempfile.mkdtemp(prefix="apnilist-bench-")
+    template_path = os.path.join(workdir, "index.html")
+    with open(template_path, "w", encoding="utf-8") as f:
+        f.write(TEMPLATE_HTML)
+
+    # The scripts read these at import time
+    os.environ["BASE_URL"] = fixture_url
+    os.environ["SUPABASE_URL"] = fixture_url
+    os.environ["TEMPLATE_PATH"] = template_path
+    if args.workers:
+        os.environ["RENDER_WORKERS"] = str(args.workers)
+    import generate_html
+    import http_renderer
+
+    generate_html.OUTPUT_DIR = os.path.join(workdir, "articles")
+    os.makedirs(generate_html.OUTPUT_DIR)
+
+    timer = PhaseTimer()
+    instrument(generate_html, http_renderer, timer)
+
+    started = time.perf_counter()
+    if args.renderer == "selenium" and not generate_html.is_server_running():
+        server.shutdown()
+        raise RuntimeError(f"Fixture server not reachable at {fixture_url}")
+    slugs = generate_html.get_unprocessed_articles_from_supabase()
+    bundles = http_renderer.fetch_all_bundles()
+
+    render_started = time.perf_counter()
+    if args.renderer == "http":
+        processed, not_ready, worker_stats = generate_html.render_slugs_http(slugs, bundles)
+    else:
+        processed, not_ready, worker_stats = generate_html.render_slugs(slugs, workers=generate_html.RENDER_WORKERS)
+    render_elapsed = time.perf_counter() - render_started
+
+    generate_html.mark_articles_as_processed(processed)
+    elapsed = time.perf_counter() - started
+    server.shutdown()
+
+    return {
+        "commit": git_commit(),
+        "timestamp": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+        "config": {
+            "renderer": args.renderer,
+            "articles": args.articles,
+            "products_per_article": args.products,
+            "history_per_product": args.history,
+            "ready_delay_ms": args.ready_delay,
+            "workers": generate_html.RENDER_WORKERS if args.renderer == "selenium" else 1,
+            "recycle_after": generate_html.RECYCLE_AFTER,
+        },
+        "pages": {
+            "requested": len(slugs),
+            "rendered": len(processed),
+            "not_ready": len(not_ready),
+            "failed": len(slugs) - len(processed) - len(not_ready),
+        },
+        "elapsed_s": round(elapsed, 3),
+        "render_elapsed_s": round(render_elapsed, 3),
+        "pages_per_minute": round(len(processed) / render_elapsed * 60, 1) if render_elapsed else 0,
+        "phases": summarize(timer.samples),
+        "workers": worker_stats,
+    }
+
+
+def print_report(report):
+    print(f"\n📊 {report['config']['renderer']} renderer @ {report['commit'] or 'unknown commit'}: "
+          f"{report['pages']['rendered']}/{report['pages']['requested']} pages in {report['elapsed_s']:.1f}s "
+          f"({report['pages_per_minute']:.1f} pages/min)")
+    print(f"   {'phase':<15}{'count':>7}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}{'total ms':>12}")
+    for phase, stats in report["phases"].items():
+        print(f"   {phase:<15}{stats['count']:>7}{stats['p50_ms']:>10.1f}{stats['p95_ms']:>10.1f}"
+              f"{stats['p99_ms']:>10.1f}{stats['total_ms']:>12.1f}")
+
+
+def print_comparison(report, baseline):
+    def delta(new, old):
+        if not old:
+            return "n/a"
+        return f"{(new - old) / old:+.1%}"
+
+    print(f"\n🔁 Compared with {baseline.get('commit') or 'baseline'} ({baseline.get('timestamp')}):")
+    print(f"   pages/min: {baseline['pages_per_minute']:.1f} → {report['pages_per_minute']:.1f} "
+          f"({delta(report['pages_per_minute'], baseline['pages_per_minute'])})")
+    for phase, stats in report["phases"].items():
+        old = baseline.get("phases", {}).get(phase)
+        if not old:
+            continue
+        print(f"   {phase:<15} p50 {old['p50_ms']:.1f} → {stats['p50_ms']:.1f} ms ({delta(stats['p50_ms'], old['p50_ms'])}), "
+              f"p95 {old['p95_ms']:.1f} → {stats['p95_ms']:.1f} ms ({delta(stats['p95_ms'], old['p95_ms'])})")
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Benchmark generate_html.py against a local fixture server")
+    parser.add_argument("--articles", type=int, default=50, help="number of synthetic articles (default: 50)")
+    parser.add_argument("--products", type=int, default=5, help="products per article (default: 5)")
+    parser.add_argument("--history", type=int, default=30, help="price history rows per product (default: 30)")
+    parser.add_argument("--renderer", choices=["selenium", "http"], default="selenium")
+    parser.add_argument("--workers", type=int, default=None, help="browser workers (default: RENDER_WORKERS)")
+    parser.add_argument("--ready-delay", type=int, default=200,
+                        help="ms before a fixture page sets window.__APNILIST_READY__ (default: 200)")
+    parser.add_argument("--output", help="report path (default: .build/benchmarks/render-<commit>-<time>.json)")
+    parser.add_argument("--compare", help="earlier report to compare against")
+    return parser.parse_args()
+
+
+def main():
+    args = parse_args()
+    report = run_benchmark(args)
+    print_report(report)
+
+    if args.compare:
+        with open(args.compare, "r", encoding="utf-8") as f:
+            print_comparison(report, json.load(f))
+
+    output = args.output
+    if not output:
+        stamp = datetime.now(timezone.utc).strftime("%Y%m%dT%H%M%SZ")
+        output = os.path.join(REPORT_DIR, f"render-{report['commit'] or 'local'}-{args.renderer}-{stamp}.json")
+    os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+    with open(output, "w", encoding="utf-8") as f:
+        json.dump(report, f, indent=2)
+    print(f"\n💾 Report written to {output}")
+    return 0 if report["pages"]["failed"] == 0 else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
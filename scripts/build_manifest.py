@@ -0,0 +1,96 @@
+"""
+Build manifest for incremental static generation.
+Records, per article slug, a hash of the page's input data (article row,
+ranked products, current prices), the renderer version that produced it and
+a hash of the HTML that was written. generate_html.py re-renders a page only
+when one of those no longer matches; generate_product_pages.py keeps its own
+manifest the same way.
+
+Manifests are build state, so they live in .build/ rather than in the
+deployed public/ tree; one left at its old public/ location is read once
+and removed on the next save.
+"""
+import os
+import json
+import hashlib
+
+import price_analytics
+
+PROJECT_ROOT = os.path.abspath(os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+ARTICLES_DIR = os.path.join(PROJECT_ROOT, "public", "articles")
+MANIFEST_PATH = os.path.join(PROJECT_ROOT, ".build", "article_manifest.json")
+LEGACY_MANIFEST_PATH = os.path.join(ARTICLES_DIR, ".manifest.json")
+
+# Columns that change without affecting the rendered page. updated_at is bumped
+# by a trigger on every PATCH, including our own static_html_generated one.
+VOLATILE_ARTICLE_FIELDS = {"views", "status", "static_html_generated", "updated_at"}
+VOLATILE_PRODUCT_FIELDS = {"processed"}
+
+
+def hash_bytes(data):
+    return hashlib.sha256(data).hexdigest()
+
+
+def hash_file(path):
+    with open(path, "rb") as f:
+        return hash_bytes(f.read())
+
+
+def input_hash(bundle, rollups=False):
+    """
+    Stable hash of everything a page is rendered from. With `rollups`, each
+    product's price_analytics rollup is included too: the HTTP renderer
+    quotes them in the FAQ answers.
+    """
+    article = {k: v for k, v in bundle["article"].items() if k not in VOLATILE_ARTICLE_FIELDS}
+    products = [{
+        "rank": entry["rank"],
+        "product": {k: v for k, v in entry["product"].items() if k not in VOLATILE_PRODUCT_FIELDS},
+        "prices": entry["prices"],
+        **({"rollup": price_analytics.rollup_for(entry["product"].get("id"))} if rollups else {}),
+    } for entry in bundle["products"]]
+    payload = json.dumps({"article": article, "products": products}, sort_keys=True, default=str)
+    return hash_bytes(payload.encode("utf-8"))
+
+
+def load_manifest(path=MANIFEST_PATH, legacy_path=LEGACY_MANIFEST_PATH):
+    for candidate in (path, legacy_path):
+        if candidate and os.path.exists(candidate):
+            with open(candidate, "r", encoding="utf-8") as f:
+                return json.load(f)
+    return {"pages": {}}
+
+
+def save_manifest(manifest, path=MANIFEST_PATH, legacy_path=LEGACY_MANIFEST_PATH):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(manifest, f, indent=2, sort_keys=True)
+    os.replace(tmp_path, path)
+    if legacy_path and os.path.exists(legacy_path):
+        os.remove(legacy_path)
+
+
+def stale_reason(manifest, slug, page_input_hash, renderer_version, output_dir=ARTICLES_DIR):
+    """Returns why `slug` must be re-rendered, or None if it is up to date."""
+    entry = manifest["pages"].get(slug)
+    output_path = os.path.join(output_dir, f"{slug}.html")
+    if not os.path.exists(output_path):
+        return "missing output"
+    if entry is None:
+        return "not in manifest"
+    if entry.get("input_hash") != page_input_hash:
+        return "inputs changed"
+    if entry.get("renderer") != renderer_version:
+        return "renderer changed"
+    return None
+
+
+def record_page(manifest, slug, page_input_hash, renderer_version, output_dir=ARTICLES_DIR):
+    """Records a freshly written page (hashes the file on disk)."""
+    output_path = os.path.join(output_dir, f"{slug}.html")
+    manifest["pages"][slug] = {
+        "input_hash": page_input_hash,
+        "renderer": renderer_version,
+        "output_hash": hash_file(output_path),
+    }
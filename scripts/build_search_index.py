@@ -0,0 +1,333 @@
+"""
+Static search index.
+Builds a sharded inverted index over product names and brands, category
+names, article titles and tags into public/search/, so /search runs in
+the browser (src/lib/searchIndex.ts) without querying Supabase.
+
+  index.json    manifest: shard boundaries, doc chunks, categories
+  t-<hash>.json a contiguous, sorted range of terms and their postings
+  d-<hash>.json up to DOC_CHUNK_SIZE result cards, by doc id
+
+Shard and chunk names are content hashes, so the CDN can cache them
+forever and the browser only fetches the shards a query's terms (and
+their prefixes) fall in. Postings are delta-encoded doc ids with the
+best field weight in the low two bits: (delta << 2) | weight.
+
+Besides word terms, every doc carries facet terms ("cat:<slug>",
+"tag:<tag>") so category and tag browsing use the same shards. Prefix
+and typo matching happen in the browser against the loaded shard terms.
+Every file gets .br/.gz siblings from precompress.py.
+
+Usage: python scripts/build_search_index.py
+"""
+import os
+import re
+import json
+import time
+import hashlib
+import argparse
+import statistics
+
+import metrics
+import precompress
+import price_analytics
+import supabase_client
+from optimize_html import kb
+
+PROJECT_ROOT = os.path.abspath(os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+SEARCH_DIR = os.path.join(PROJECT_ROOT, "public", "search")
+MANIFEST_PATH = os.path.join(SEARCH_DIR, "index.json")
+
+# Bump when the file format changes; searchIndex.ts checks it
+INDEX_VERSION = 1
+
+# Uncompressed JSON bytes per term shard (roughly a quarter of that over the wire)
+SHARD_BYTES = int(os.environ.get("SEARCH_SHARD_BYTES", 32 * 1024))
+DOC_CHUNK_SIZE = int(os.environ.get("SEARCH_DOC_CHUNK", 200))
+EXCERPT_CHARS = 160
+
+# Field weights; must fit the two low bits of a posting
+WEIGHT_NAME = 3       # article title, product name
+WEIGHT_BRAND = 2      # product brand, category name
+WEIGHT_TAG = 1
+
+# Must match tokenize() in src/lib/searchIndex.ts
+TOKEN_PATTERN = re.compile(r"[a-z0-9]+")
+SHARD_FILE_PATTERN = re.compile(r"^[td]-[0-9a-f]{12}\.json(\.gz|\.br)?$")
+
+
+def tokenize(text):
+    return TOKEN_PATTERN.findall((text or "").lower())
+
+
+def facet(kind, value):
+    return f"{kind}:{str(value).strip().lower()}"
+
+
+def as_list(value):
+    if isinstance(value, list):
+        return [str(v) for v in value if v]
+    if isinstance(value, str) and value:
+        try:
+            parsed = json.loads(value)
+        except ValueError:
+            return [value]
+        return as_list(parsed)
+    return []
+
+
+def fetch_rows():
+    """Live articles, products and categories: three bulk queries."""
+    # generate_html.py flips rendered articles from published to processed
+    articles = supabase_client.get_all("articles", {
+        "select": "id,slug,title,excerpt,featured_image,category_id,tags,author,views,created_at",
+        "status": "in.(published,processed)",
+        "order": "id.asc",
+    })
+    products = supabase_client.get_all("products", {
+        "select": "id,slug,name,image,category_id,tags",
+        "order": "id.asc",
+    })
+    categories = supabase_client.get_all("categories", {
+        "select": "id,name,slug",
+        "order": "name.asc",
+    })
+    return articles, products, categories
+
+
+def build_docs(articles, products, categories, chunk_size=DOC_CHUNK_SIZE):
+    """
+    Returns (docs, fields): the result card of every doc, and its weighted
+    terms as {term: weight}. Doc ids are list positions; products start on
+    a fresh chunk (the gap is None), so publishing an article leaves the
+    product chunks and postings untouched.
+    """
+    by_id = {c["id"]: c for c in categories}
+    docs, fields = [], []
+
+    def add(doc, weighted, category, tags):
+        terms = {}
+        for weight, text in weighted:
+            for token in tokenize(text):
+                terms[token] = max(terms.get(token, 0), weight)
+        if category:
+            for token in tokenize(category["name"]):
+                terms[token] = max(terms.get(token, 0), WEIGHT_BRAND)
+            terms[facet("cat", category["slug"])] = WEIGHT_BRAND
+        for tag in tags:
+            for token in tokenize(tag):
+                terms.setdefault(token, WEIGHT_TAG)
+            terms[facet("tag", tag)] = WEIGHT_TAG
+        docs.append(doc)
+        fields.append(terms)
+
+    for article in articles:
+        if not article.get("slug"):
+            continue
+        category = by_id.get(article.get("category_id"))
+        tags = as_list(article.get("tags"))
+        excerpt = (article.get("excerpt") or "").strip()
+        if len(excerpt) > EXCERPT_CHARS:
+            excerpt = excerpt[:EXCERPT_CHARS].rsplit(" ", 1)[0] + "…"
+        add({
+            "k": "a",
+            "slug": article["slug"],
+            "title": article["title"],
+            "excerpt": excerpt,
+            "image": article.get("featured_image"),
+            "category": category and category["name"],
+            "tags": tags,
+            "author": article.get("author"),
+            "views": article.get("views") or 0,
+            "created_at": article.get("created_at"),
+        }, [(WEIGHT_NAME, article["title"])], category, tags)
+
+    if products:
+        padding = -len(docs) % chunk_size
+        docs += [None] * padding
+        fields += [{}] * padding
+
+    for product in products:
+        if not product.get("name"):
+            continue
+        category = by_id.get(product.get("category_id"))
+        # There is no brand column; listings lead with the brand
+        brand = product["name"].split(None, 1)[0]
+        rollup = price_analytics.rollup_for(product["id"]) or {}
+        add({
+            "k": "p",
+            "slug": product.get("slug") or product["id"],
+            "title": product["name"],
+            "brand": brand,
+            "image": product.get("image"),
+            "category": category and category["name"],
+            "price": rollup.get("current"),
+        }, [(WEIGHT_NAME, product["name"]), (WEIGHT_BRAND, brand)], category, as_list(product.get("tags")))
+
+    return docs, fields
+
+
+def invert(fields):
+    """{term: encoded postings}, terms in sorted order."""
+    postings = {}
+    for doc_id, terms in enumerate(fields):
+        for term, weight in terms.items():
+            postings.setdefault(term, []).append((doc_id, weight))
+
+    encoded = {}
+    for term in sorted(postings):
+        previous, values = 0, []
+        for doc_id, weight in postings[term]:
+            values.append(((doc_id - previous) << 2) | weight)
+            previous = doc_id
+        encoded[term] = values
+    return encoded
+
+
+def dumps(data):
+    return json.dumps(data, ensure_ascii=False, separators=(",", ":"))
+
+
+def split_shards(encoded, shard_bytes=SHARD_BYTES):
+    """Cuts the sorted terms into contiguous shards of about `shard_bytes` each."""
+    shards, terms, postings, size = [], [], [], 0
+    for term, values in encoded.items():
+        entry = len(dumps(term)) + len(dumps(values)) + 2
+        if terms and size + entry > shard_bytes:
+            shards.append({"terms": terms, "postings": postings})
+            terms, postings, size = [], [], 0
+        terms.append(term)
+        postings.append(values)
+        size += entry
+    if terms:
+        shards.append({"terms": terms, "postings": postings})
+    return shards
+
+
+def doc_range(docs, kind):
+    ids = [i for i, doc in enumerate(docs) if doc and doc["k"] == kind]
+    return [ids[0], ids[-1] + 1] if ids else [0, 0]
+
+
+def write_file(prefix, data):
+    """Writes content-addressed JSON; returns its filename (existing files are left alone)."""
+    text = dumps(data)
+    filename = f"{prefix}-{hashlib.sha1(text.encode('utf-8')).hexdigest()[:12]}.json"
+    path = os.path.join(SEARCH_DIR, filename)
+    if not os.path.exists(path):
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            f.write(text)
+        os.replace(tmp_path, path)
+    return filename
+
+
+def load_manifest():
+    if not os.path.exists(MANIFEST_PATH):
+        return None
+    with open(MANIFEST_PATH, "r", encoding="utf-8") as f:
+        return json.load(f)
+
+
+def manifest_files(manifest):
+    if not manifest:
+        return set()
+    return {s["file"] for s in manifest["shards"]} | set(manifest["docs"])
+
+
+def remove_stale(keep):
+    """
+    Deletes shard/chunk files (and .gz/.br) no manifest in `keep` refers
+    to, and their precompress cache entries. Returns how many files went.
+    """
+    stale = [
+        f for f in os.listdir(SEARCH_DIR)
+        if SHARD_FILE_PATTERN.match(f) and f.split(".json")[0] + ".json" not in keep
+    ]
+    for filename in stale:
+        os.remove(os.path.join(SEARCH_DIR, filename))
+    cache = precompress.load_cache()
+    keys = [os.path.relpath(os.path.join(SEARCH_DIR, f), precompress.PUBLIC_DIR) for f in stale]
+    if any(key in cache for key in keys):
+        for key in keys:
+            cache.pop(key, None)
+        precompress.save_cache(cache)
+    return len([f for f in stale if f.endswith(".json")])
+
+
+def size_line(label, sizes):
+    brotli = [s[2] for s in sizes]
+    return (f"   {label}: {len(sizes)} files, raw {kb(sum(s[0] for s in sizes))}, "
+            f"brotli {kb(sum(brotli))} (min {kb(min(brotli))}, median {kb(statistics.median(brotli))}, "
+            f"max {kb(max(brotli))})")
+
+
+def build():
+    """Fetches, indexes and writes public/search/. Returns the new manifest."""
+    started = time.perf_counter()
+    os.makedirs(SEARCH_DIR, exist_ok=True)
+
+    articles, products, categories = fetch_rows()
+    fetched = time.perf_counter()
+    docs, fields = build_docs(articles, products, categories)
+    shards = split_shards(invert(fields))
+    indexed = time.perf_counter()
+
+    previous = load_manifest()
+    manifest = {
+        "version": INDEX_VERSION,
+        "built_at": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime()),
+        "doc_chunk": DOC_CHUNK_SIZE,
+        # [first, end) doc ids of each kind
+        "ranges": {kind: doc_range(docs, kind) for kind in ("a", "p")},
+        "categories": [{"name": c["name"], "slug": c["slug"]} for c in categories if c["name"] != "Uncategorized"],
+        "shards": [{"file": write_file("t", shard), "first": shard["terms"][0], "terms": len(shard["terms"])}
+                   for shard in shards],
+        "docs": [write_file("d", docs[i:i + DOC_CHUNK_SIZE]) for i in range(0, len(docs), DOC_CHUNK_SIZE)],
+    }
+    tmp_path = f"{MANIFEST_PATH}.tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        f.write(dumps(manifest))
+    os.replace(tmp_path, MANIFEST_PATH)
+    # Clients holding the previous manifest can still fetch its files
+    removed = remove_stale(manifest_files(manifest) | manifest_files(previous))
+
+    files = [s["file"] for s in manifest["shards"]] + manifest["docs"]
+    sizes = precompress.precompress([MANIFEST_PATH] + [os.path.join(SEARCH_DIR, f) for f in files])
+    elapsed = time.perf_counter() - started
+
+    shard_sizes = [sizes[os.path.join(SEARCH_DIR, s["file"])] for s in manifest["shards"]]
+    doc_sizes = [sizes[os.path.join(SEARCH_DIR, f)] for f in manifest["docs"]]
+    for kind, group in (("terms", shard_sizes), ("docs", doc_sizes)):
+        for raw, gz, br in group:
+            metrics.observe("search_shard_bytes", br, kind=kind)
+    metrics.observe("search_index_seconds", fetched - started, step="fetch")
+    metrics.observe("search_index_seconds", indexed - fetched, step="index")
+    metrics.observe("search_index_seconds", elapsed - (indexed - started), step="write")
+
+    terms = sum(s["terms"] for s in manifest["shards"])
+    counts = {kind: end - first for kind, (first, end) in manifest["ranges"].items()}
+    print(f"🔎 Search index: {counts['a']} articles + {counts['p']} products, "
+          f"{terms:,} terms → public/search/")
+    if shard_sizes:
+        print(size_line("term shards", shard_sizes))
+    if doc_sizes:
+        print(size_line("doc chunks ", doc_sizes))
+    print(f"   manifest: {kb(sizes[MANIFEST_PATH][2])} brotli; {removed} stale shard(s)/chunk(s) removed")
+    print(f"   built in {elapsed:.2f}s (fetch {fetched - started:.2f}s, index {(indexed - fetched) * 1000:.0f} ms)")
+    return manifest
+
+
+def main():
+    argparse.ArgumentParser(description="Build the static search index in public/search/").parse_args()
+    metrics.start("build_search_index")
+    status = "error"
+    try:
+        build()
+        status = "ok"
+    finally:
+        metrics.finish(status)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,716 @@
+"""
+Outbound link and image health checker for the static article pages.
+
+Every external <a href> and <img src> in public/articles/*.html is checked
+with a HEAD request (falling back to GET for servers that reject or
+mishandle HEAD), following redirects. Results live in .build/links.sqlite:
+
+  links       url → status, state, ETag/Last-Modified, consecutive failures,
+              and when the entry expires
+  page_links  which page uses which URL, re-extracted only for files whose
+              size or mtime changed (like article_index.sync())
+
+Only URLs with no entry or an expired one are re-checked, and a re-check
+sends If-None-Match / If-Modified-Since, so an unchanged target answers 304
+without a body. Each URL ends up in one of three states:
+
+  ok      2xx/3xx/304; re-checked after LINK_TTL_HOURS (jittered)
+  dead    404/410, or unreachable CONFIRM_FAILS checks in a row
+  flaky   401/403/429/5xx or a first network error: bot walls and rate
+          limits look like this, so these are never treated as dead
+
+Checks run on an asyncio loop: a global semaphore bounds the requests in
+flight (and the session's connection pool is sized to match), and each host
+gets its own semaphore so one retailer is never hit by more than
+LINK_CHECK_PER_HOST requests at once.
+
+A per-article report is written to .build/link_report.json. With --fix, the
+pages using dead URLs go through postprocess.py's `dead-links` transform
+(see fix_dead_links()), which replaces dead images with the placeholder and
+either points dead buy links at a store search for the product, keeping
+their affiliate parameters (DEAD_PRODUCT_ACTION=replace), or drops product
+cards whose every buy link is dead (DEAD_PRODUCT_ACTION=drop). Re-rendered pages get the same fix from
+postprocess.py.
+
+`--stub N` checks N synthetic URLs (ok, 404, 403, HEAD-refusing,
+unreachable) on pages in a temp dir against a local stub server, then
+re-runs to check caching, 304 revalidation, the per-host limit and the
+dead-link fix.
+
+Usage: python scripts/check_links.py [--all] [--fix] [--stub [N]] [files...]
+"""
+import os
+import re
+import sys
+import json
+import time
+import random
+import shutil
+import socket
+import asyncio
+import sqlite3
+import argparse
+import tempfile
+import threading
+from html import escape, unescape
+from urllib.parse import quote_plus, urlsplit, parse_qsl, urlencode
+from collections import Counter, defaultdict
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta, timezone
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+import metrics
+import postprocess
+import supabase_client
+
+PROJECT_ROOT = os.path.abspath(os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+ARTICLES_DIR = os.path.join(PROJECT_ROOT, "public", "articles")
+CACHE_PATH = os.path.join(PROJECT_ROOT, ".build", "links.sqlite")
+REPORT_PATH = os.path.join(PROJECT_ROOT, ".build", "link_report.json")
+SITE_URL = "https://www.apnilist.co.in"
+PLACEHOLDER_IMAGE = "/placeholder.svg"
+
+CONCURRENCY = int(os.environ.get("LINK_CHECK_CONCURRENCY", "64"))
+PER_HOST = int(os.environ.get("LINK_CHECK_PER_HOST", "8"))
+LINK_TTL_HOURS = float(os.environ.get("LINK_TTL_HOURS", "168"))
+DEAD_TTL_HOURS = 24
+FLAKY_TTL_HOURS = 6
+# Unreachable this many checks in a row counts as dead
+CONFIRM_FAILS = 2
+DEAD_PRODUCT_ACTION = os.environ.get("DEAD_PRODUCT_ACTION", "replace")
+REQUEST_TIMEOUT = (5, 15)
+USER_AGENT = "Mozilla/5.0 (compatible; ApniListLinkChecker/1.0; +https://www.apnilist.co.in)"
+# Results are committed every this many checks, so a killed run keeps its progress
+COMMIT_EVERY = 200
+
+OK = "ok"
+DEAD = "dead"
+FLAKY = "flaky"
+DEAD_STATUSES = (404, 410)
+
+LINK = "link"
+IMAGE = "image"
+LINK_PATTERN = re.compile(r'<a\b[^>]*?\shref="(https?://[^"]+)"')
+IMAGE_PATTERN = re.compile(r'<img\b[^>]*?\ssrc="(https?://[^"]+)"')
+ANCHOR_PATTERN = re.compile(r'<a\b[^>]*?\shref="(https?://[^"]+)"[^>]*>.*?</a>', re.DOTALL)
+IMAGE_SRC_PATTERN = re.compile(r'(<img\b[^>]*?\ssrc=")(https?://[^"]+)(")')
+# Product cards: the React page's (border-t-4) and http_renderer.py's (data-product-card)
+CARD_START_PATTERN = re.compile(r'<div class="rounded-lg border bg-card[^"]*?(?:border-t-4[^"]*"|"\s*data-product-card="")[^>]*>')
+DIV_PATTERN = re.compile(r"<(/?)div\b[^>]*>")
+CARD_NAME_PATTERN = re.compile(r"<h3[^>]*>([^<]+)</h3>")
+LD_JSON_PATTERN = re.compile(r'<script type="application/ld\+json">(.*?)</script>', re.DOTALL)
+
+# Where a dead buy link is sent instead: the store's search for the product
+STORE_SEARCH = {
+    "amazon.in": "https://www.amazon.in/s?k={}",
+    "amzn.to": "https://www.amazon.in/s?k={}",
+    "amzn.in": "https://www.amazon.in/s?k={}",
+    "flipkart.com": "https://www.flipkart.com/search?q={}",
+    "fkrt.it": "https://www.flipkart.com/search?q={}",
+}
+# Query parameters that attribute the click to us (Amazon Associates, Flipkart
+# Affiliate, campaign tags); carried over from a dead buy link to its search
+AFFILIATE_PARAMS = {"tag", "linkCode", "linkId", "ascsubtag", "affid", "affExtParam1", "affExtParam2"}
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS links (
+    url TEXT PRIMARY KEY,
+    state TEXT NOT NULL,
+    status INTEGER,
+    error TEXT,
+    final_url TEXT,
+    etag TEXT,
+    last_modified TEXT,
+    fails INTEGER NOT NULL DEFAULT 0,
+    checked_at TEXT NOT NULL,
+    expires_at TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS pages (
+    slug TEXT PRIMARY KEY,
+    bytes INTEGER NOT NULL,
+    mtime_ns INTEGER NOT NULL
+);
+CREATE TABLE IF NOT EXISTS page_links (
+    slug TEXT NOT NULL,
+    url TEXT NOT NULL,
+    kind TEXT NOT NULL,
+    PRIMARY KEY (slug, url, kind)
+);
+CREATE INDEX IF NOT EXISTS page_links_url ON page_links (url);
+"""
+
+
+def now():
+    return datetime.now(timezone.utc).isoformat(timespec="seconds")
+
+
+def host_of(url):
+    return urlsplit(url).netloc.lower()
+
+
+def is_external(url):
+    return host_of(url) not in ("apnilist.co.in", "www.apnilist.co.in")
+
+
+def extract_links(page_html):
+    """{(url, kind)} of every external link and image on a page."""
+    found = set()
+    for pattern, kind in ((LINK_PATTERN, LINK), (IMAGE_PATTERN, IMAGE)):
+        for match in pattern.finditer(page_html):
+            url = unescape(match.group(1))
+            if is_external(url):
+                found.add((url, kind))
+    return found
+
+
+class LinkCache:
+    """Check results and page → URL usage. Safe to share between threads."""
+
+    def __init__(self, path=CACHE_PATH):
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        self.conn = sqlite3.connect(path, check_same_thread=False, timeout=30)
+        self.conn.row_factory = sqlite3.Row
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        self.conn.executescript(SCHEMA)
+        self.lock = threading.Lock()
+
+    def query(self, sql, params=()):
+        with self.lock:
+            return self.conn.execute(sql, params).fetchall()
+
+    def executemany(self, sql, rows):
+        with self.lock:
+            self.conn.executemany(sql, rows)
+            self.conn.commit()
+
+    def sync(self, articles_dir=ARTICLES_DIR):
+        """Re-extracts the links of pages whose size or mtime changed. Returns (reextracted, removed)."""
+        known = {row["slug"]: (row["bytes"], row["mtime_ns"]) for row in self.query("SELECT * FROM pages")}
+        stale = []
+        present = set()
+        for filename in os.listdir(articles_dir):
+            if not filename.endswith(".html"):
+                continue
+            slug = filename[:-5]
+            present.add(slug)
+            stat = os.stat(os.path.join(articles_dir, filename))
+            if known.get(slug) != (stat.st_size, stat.st_mtime_ns):
+                stale.append((slug, stat))
+
+        for slug, stat in stale:
+            with open(os.path.join(articles_dir, f"{slug}.html"), encoding="utf-8") as f:
+                links = extract_links(f.read())
+            with self.lock:
+                self.conn.execute("DELETE FROM page_links WHERE slug = ?", (slug,))
+                self.conn.executemany("INSERT INTO page_links VALUES (?, ?, ?)",
+                                      [(slug, url, kind) for url, kind in links])
+                self.conn.execute("INSERT OR REPLACE INTO pages VALUES (?, ?, ?)",
+                                  (slug, stat.st_size, stat.st_mtime_ns))
+                self.conn.commit()
+
+        removed = [(slug,) for slug in set(known) - present]
+        self.executemany("DELETE FROM page_links WHERE slug = ?", removed)
+        self.executemany("DELETE FROM pages WHERE slug = ?", removed)
+        return len(stale), len(removed)
+
+    def due(self, slugs=None, recheck_all=False):
+        """{url: cached row or None} for the URLs (of `slugs`) with no entry or an expired one."""
+        sql = ("SELECT DISTINCT page_links.url AS page_url, links.* FROM page_links "
+               "LEFT JOIN links ON links.url = page_links.url")
+        rows = self.query(sql)
+        if slugs is not None:
+            wanted = {row["url"] for row in self.page_links(slugs)}
+            rows = [row for row in rows if row["page_url"] in wanted]
+        stamp = now()
+        return {
+            row["page_url"]: row if row["url"] else None
+            for row in rows
+            if recheck_all or not row["url"] or row["expires_at"] <= stamp
+        }
+
+    def page_links(self, slugs=None):
+        rows = self.query("SELECT * FROM page_links ORDER BY slug, kind, url")
+        if slugs is None:
+            return rows
+        wanted = set(slugs)
+        return [row for row in rows if row["slug"] in wanted]
+
+    def record(self, results):
+        self.executemany(
+            "INSERT OR REPLACE INTO links (url, state, status, error, final_url, etag, last_modified, fails, "
+            "checked_at, expires_at) VALUES (:url, :state, :status, :error, :final_url, :etag, :last_modified, "
+            ":fails, :checked_at, :expires_at)",
+            results,
+        )
+
+    def links(self):
+        """{url: row} for every checked URL."""
+        return {row["url"]: row for row in self.query("SELECT * FROM links")}
+
+    def dead(self):
+        """{url: kinds} of every URL currently dead, with how pages use it."""
+        dead = defaultdict(set)
+        for url, kind in self.query(
+                "SELECT DISTINCT links.url, page_links.kind FROM links "
+                "JOIN page_links ON page_links.url = links.url WHERE links.state = ?", (DEAD,)):
+            dead[url].add(kind)
+        return dict(dead)
+
+    def close(self):
+        with self.lock:
+            self.conn.close()
+
+
+# --- Checking ---
+
+def build_session(pool_size=CONCURRENCY):
+    """Connections for every check, sized to the concurrency; one quick retry on connect errors and 502-504."""
+    session = requests.Session()
+    retry = Retry(total=1, backoff_factor=0.2, status_forcelist=(502, 503, 504),
+                  allowed_methods=frozenset({"HEAD", "GET"}), respect_retry_after_header=False,
+                  raise_on_status=False)
+    adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size, max_retries=retry)
+    session.mount("http://", adapter)
+    session.mount("https://", adapter)
+    session.headers["User-Agent"] = USER_AGENT
+    session.hooks["response"].append(supabase_client.record_response)
+    return session
+
+
+def fetch(session, url, cached):
+    """HEAD (GET if HEAD is refused or fails), conditional on the cached validators."""
+    headers = {}
+    if cached and cached["etag"]:
+        headers["If-None-Match"] = cached["etag"]
+    if cached and cached["last_modified"]:
+        headers["If-Modified-Since"] = cached["last_modified"]
+    response = session.head(url, headers=headers, allow_redirects=True, timeout=REQUEST_TIMEOUT)
+    if response.status_code >= 400:
+        # Plenty of servers answer HEAD with 403/405/404 but serve GET fine;
+        # stream so only the headers are read
+        response = session.get(url, headers=headers, allow_redirects=True, timeout=REQUEST_TIMEOUT, stream=True)
+        response.close()
+    return response
+
+
+def expiry(state):
+    hours = {OK: LINK_TTL_HOURS * random.uniform(0.8, 1.2), DEAD: DEAD_TTL_HOURS, FLAKY: FLAKY_TTL_HOURS}[state]
+    return (datetime.now(timezone.utc) + timedelta(hours=hours)).isoformat(timespec="seconds")
+
+
+def check_url(session, url, cached):
+    """Checks one URL. Returns its new links row."""
+    result = {"url": url, "status": None, "error": None, "final_url": None, "checked_at": now(),
+              "etag": cached["etag"] if cached else None,
+              "last_modified": cached["last_modified"] if cached else None}
+    try:
+        response = fetch(session, url, cached)
+    except requests.RequestException as e:
+        result["error"] = f"{type(e).__name__}: {e}"[:300]
+    else:
+        result["status"] = response.status_code
+        if response.status_code == 304:
+            result["final_url"] = cached["final_url"]
+        else:
+            result["final_url"] = response.url if response.url != url else None
+            result["etag"] = response.headers.get("ETag")
+            result["last_modified"] = response.headers.get("Last-Modified")
+
+    status = result["status"]
+    ok = status is not None and status < 400
+    result["fails"] = 0 if ok else (cached["fails"] if cached else 0) + 1
+    if ok:
+        result["state"] = OK
+    elif status in DEAD_STATUSES or (status is None and result["fails"] >= CONFIRM_FAILS):
+        result["state"] = DEAD
+    else:
+        result["state"] = FLAKY
+    result["expires_at"] = expiry(result["state"])
+    return result
+
+
+async def check_urls(due, cache, concurrency=CONCURRENCY, per_host=PER_HOST):
+    """Checks {url: cached row or None} and records the results as they arrive. Returns the states seen."""
+    loop = asyncio.get_running_loop()
+    session = build_session(concurrency)
+    in_flight = asyncio.Semaphore(concurrency)
+    hosts = defaultdict(lambda: asyncio.Semaphore(per_host))
+    states = Counter()
+    pending = []
+
+    async def check(url, cached, executor):
+        # Host slot first, so one slow host can't hold every global slot
+        async with hosts[host_of(url)], in_flight:
+            return await loop.run_in_executor(executor, check_url, session, url, cached)
+
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        tasks = [check(url, cached, executor) for url, cached in due.items()]
+        for done, future in enumerate(asyncio.as_completed(tasks), 1):
+            result = await future
+            states[result["state"]] += 1
+            metrics.incr("links_checked", state=result["state"])
+            pending.append(result)
+            if len(pending) >= COMMIT_EVERY:
+                cache.record(pending)
+                pending = []
+                print(f"   {done}/{len(tasks)} checked")
+    cache.record(pending)
+    session.close()
+    return states
+
+
+# --- Report ---
+
+def build_report(cache, slugs=None):
+    """{slug: {links, images, ok, dead, flaky, unchecked, problems: [...]}} for every page."""
+    links = cache.links()
+    report = {}
+    for row in cache.page_links(slugs):
+        page = report.setdefault(row["slug"], {"links": 0, "images": 0, OK: 0, DEAD: 0, FLAKY: 0,
+                                               "unchecked": 0, "problems": []})
+        page["links" if row["kind"] == LINK else "images"] += 1
+        link = links.get(row["url"])
+        if link is None:
+            page["unchecked"] += 1
+            continue
+        page[link["state"]] += 1
+        if link["state"] != OK:
+            page["problems"].append({"url": row["url"], "kind": row["kind"], "state": link["state"],
+                                     "status": link["status"], "error": link["error"],
+                                     "checked_at": link["checked_at"]})
+    return report
+
+
+def write_report(report, path=REPORT_PATH):
+    totals = Counter()
+    for page in report.values():
+        totals.update({key: page[key] for key in ("links", "images", OK, DEAD, FLAKY, "unchecked")})
+    data = {"generated_at": now(), "totals": dict(totals), "pages": report}
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(data, f, indent=1, ensure_ascii=False)
+    os.replace(tmp_path, path)
+    return totals
+
+
+def print_report(report, totals):
+    broken = {slug: page for slug, page in report.items() if page[DEAD]}
+    print(f"\n🔗 {totals['links']} link(s) and {totals['images']} image(s) on {len(report)} page(s): "
+          f"{totals[OK]} ok, {totals[DEAD]} dead, {totals[FLAKY]} flaky, {totals['unchecked']} unchecked")
+    for slug, page in sorted(broken.items()):
+        print(f"❌ {slug}: {page[DEAD]} dead of {page['links'] + page['images']}")
+        for problem in page["problems"]:
+            if problem["state"] == DEAD:
+                print(f"   • {problem['kind']} {problem['url']} ({problem['status'] or problem['error']})")
+    print(f"📝 Per-article report: {os.path.relpath(REPORT_PATH, PROJECT_ROOT)}")
+    return sorted(broken)
+
+
+# --- Fixing ---
+
+def element_end(page_html, start):
+    """End offset of the <div> opened at `start`, or None if it never closes."""
+    depth = 0
+    for match in DIV_PATTERN.finditer(page_html, start):
+        depth += -1 if match.group(1) else 1
+        if depth == 0:
+            return match.end()
+    return None
+
+
+def product_cards(page_html):
+    """[(start, end)] of every product card on a page."""
+    cards = []
+    position = 0
+    while True:
+        match = CARD_START_PATTERN.search(page_html, position)
+        if not match:
+            return cards
+        end = element_end(page_html, match.start())
+        if end is None:
+            return cards
+        cards.append((match.start(), end))
+        position = end
+
+
+def store_search_url(url, name):
+    """The store's search for `name`, keeping the dead link's affiliate parameters."""
+    host = host_of(url)
+    for domain, template in STORE_SEARCH.items():
+        if host == domain or host.endswith(f".{domain}"):
+            search = template.format(quote_plus(name))
+            kept = [(key, value) for key, value in parse_qsl(urlsplit(url).query, keep_blank_values=True)
+                    if key in AFFILIATE_PARAMS or key.startswith("utm_")]
+            return f"{search}&{urlencode(kept)}" if kept else search
+    return None
+
+
+def fix_item_list(page_html, dropped_names, dead):
+    """Drops the products of removed cards from the ItemList JSON-LD, and dead offer URLs/images from the rest."""
+    def rewrite(match):
+        try:
+            data = json.loads(match.group(1))
+        except json.JSONDecodeError:
+            return match.group(0)
+        if not isinstance(data, dict) or data.get("@type") != "ItemList":
+            return match.group(0)
+        items = data.get("itemListElement") or []
+        # Only the products list, not e.g. the related guides
+        if not items or not isinstance(items[0].get("item"), dict) or items[0]["item"].get("@type") != "Product":
+            return match.group(0)
+        kept = []
+        for entry in items:
+            product = entry.get("item") or {}
+            if product.get("name") in dropped_names:
+                continue
+            offers = product.get("offers")
+            for offer in offers if isinstance(offers, list) else [offers]:
+                if isinstance(offer, dict) and offer.get("url") in dead:
+                    del offer["url"]
+            if product.get("image") in dead:
+                product["image"] = SITE_URL + PLACEHOLDER_IMAGE
+            kept.append(dict(entry, position=len(kept) + 1))
+        data["itemListElement"] = kept
+        data["numberOfItems"] = len(kept)
+        return f'<script type="application/ld+json">{json.dumps(data, ensure_ascii=False)}</script>'
+
+    return LD_JSON_PATTERN.sub(rewrite, page_html)
+
+
+def fix_dead_links(page_html, dead, action=DEAD_PRODUCT_ACTION):
+    """
+    Applies `dead` ({url: kinds}, see LinkCache.dead()) to a page. Dead
+    images become the placeholder; in each product card, dead buy links point
+    at a store search for the product ("replace") or, once every buy link of
+    a card is dead, the card is dropped ("drop"). Dead buy links with no
+    store search to fall back on are removed. Returns (html, change or None).
+    """
+    page_urls = extract_links(page_html)
+    if not any(url in dead for url, _ in page_urls):
+        return page_html, None
+
+    counts = Counter()
+    dropped_names = set()
+    parts = []
+    position = 0
+    for start, end in product_cards(page_html):
+        card = page_html[start:end]
+        buy_links = {unescape(url) for url in LINK_PATTERN.findall(card)}
+        dead_links = {url for url in buy_links if LINK in dead.get(url, ())}
+        if not dead_links:
+            continue
+        name_match = CARD_NAME_PATTERN.search(card)
+        name = unescape(name_match.group(1)).strip() if name_match else ""
+        parts.append(page_html[position:start])
+        position = end
+        if action == "drop" and dead_links == buy_links:
+            dropped_names.add(name)
+            counts["cards dropped"] += 1
+            continue
+
+        def replace_anchor(match):
+            url = unescape(match.group(1))
+            if url not in dead_links:
+                return match.group(0)
+            replacement = store_search_url(url, name) if action == "replace" and name else None
+            if replacement is None:
+                counts["links removed"] += 1
+                return ""
+            counts["links → search"] += 1
+            return match.group(0).replace(f'href="{match.group(1)}"', f'href="{escape(replacement)}"', 1)
+
+        parts.append(ANCHOR_PATTERN.sub(replace_anchor, card))
+    parts.append(page_html[position:])
+    page_html = "".join(parts)
+
+    def replace_image(match):
+        if IMAGE not in dead.get(unescape(match.group(2)), ()):
+            return match.group(0)
+        counts["images → placeholder"] += 1
+        return f"{match.group(1)}{PLACEHOLDER_IMAGE}{match.group(3)}"
+
+    page_html = IMAGE_SRC_PATTERN.sub(replace_image, page_html)
+    if "application/ld+json" in page_html:
+        page_html = fix_item_list(page_html, dropped_names, dead)
+
+    if not counts:
+        return page_html, None
+    return page_html, ", ".join(f"{n} {what}" for what, n in counts.items())
+
+
+# --- Local stub ---
+
+STUB_KINDS = ("ok", "dead", "flaky", "nohead")
+STUB_ETAG = '"stub-v1"'
+
+
+def make_stub_handler(traffic):
+    """ok: 200 with an ETag (304 when it matches), dead: 404, flaky: 403, nohead: 405 to HEAD only."""
+    class StubHandler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+
+        def log_message(self, format, *args):
+            pass
+
+        def answer(self, method):
+            with traffic["lock"]:
+                traffic["requests"] += 1
+                traffic["in_flight"] += 1
+                traffic["max_in_flight"] = max(traffic["max_in_flight"], traffic["in_flight"])
+            time.sleep(0.005)
+            kind = self.path.strip("/").split("/")[0]
+            status = {"ok": 200, "dead": 404, "flaky": 403, "nohead": 405 if method == "HEAD" else 200}[kind]
+            if kind == "ok" and self.headers.get("If-None-Match") == STUB_ETAG:
+                status = 304
+            with traffic["lock"]:
+                traffic["in_flight"] -= 1
+                traffic[status] = traffic.get(status, 0) + 1
+            self.send_response(status)
+            if kind == "ok":
+                self.send_header("ETag", STUB_ETAG)
+            self.send_header("Content-Length", "0")
+            self.end_headers()
+
+        def do_HEAD(self):
+            self.answer("HEAD")
+
+        def do_GET(self):
+            self.answer("GET")
+
+    return StubHandler
+
+
+def closed_port():
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def run_stub(url_count=200):
+    """Checks synthetic pages against a local stub server. Returns 0 if all checks pass."""
+    traffic = {"lock": threading.Lock(), "requests": 0, "in_flight": 0, "max_in_flight": 0}
+    server = ThreadingHTTPServer(("127.0.0.1", 0), make_stub_handler(traffic))
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, name="stub-server", daemon=True).start()
+    stub_url = f"http://127.0.0.1:{server.server_address[1]}"
+    print(f"🧪 Stub server at {stub_url} ({url_count:,} URLs)\n")
+
+    urls = {kind: [f"{stub_url}/{kind}/{i}" for i in range(url_count // len(STUB_KINDS))] for kind in STUB_KINDS}
+    unreachable = f"http://127.0.0.1:{closed_port()}/gone"
+    every_url = [url for group in urls.values() for url in group] + [unreachable]
+
+    workdir = tempfile.mkdtemp(prefix="apnilist-links-")
+    articles_dir = os.path.join(workdir, "articles")
+    os.makedirs(articles_dir)
+    for n, start in enumerate(range(0, len(every_url), 10)):
+        anchors = "".join(f'<a href="{escape(url)}">x</a><img src="{escape(url)}">' for url in every_url[start:start + 10])
+        with open(os.path.join(articles_dir, f"page-{n}.html"), "w", encoding="utf-8") as f:
+            f.write(f"<html><body>{anchors}</body></html>")
+    cache = LinkCache(os.path.join(workdir, "links.sqlite"))
+    results = []
+
+    def check(name, ok, detail):
+        results.append(ok)
+        print(f"{'✅' if ok else '❌'} {name}: {detail}")
+
+    cache.sync(articles_dir)
+    due = cache.due()
+    states = asyncio.run(check_urls(due, cache, per_host=PER_HOST))
+    group = len(urls["ok"])
+    check("states", states == Counter({OK: 2 * group, DEAD: group, FLAKY: group + 1}),
+          f"{dict(states)} (HEAD-refusing URLs ok via GET, unreachable flaky on its first failure)")
+    check("per-host", traffic["max_in_flight"] <= PER_HOST,
+          f"at most {traffic['max_in_flight']} requests in flight to one host (limit {PER_HOST})")
+
+    requests_before = traffic["requests"]
+    due = cache.due()
+    check("cache", not due and traffic["requests"] == requests_before, "nothing due on a second run")
+
+    states = asyncio.run(check_urls(cache.due(recheck_all=True), cache, per_host=PER_HOST))
+    dead = cache.dead()
+    check("recheck", traffic.get(304, 0) == group and unreachable in dead and states[OK] == 2 * group,
+          f"{traffic.get(304, 0)} answered 304, unreachable now dead after {CONFIRM_FAILS} failures")
+
+    product = ('<div class="rounded-lg border bg-card shadow-sm" data-product-card="" id="product-1">'
+               '<h3 class="text-2xl">Stub Phone</h3><img src="{image}">'
+               '<a href="https://www.amazon.in/dp/B0STUB?tag=apnilist-21&amp;th=1">Amazon</a></div>')
+    page_html = product.format(image=escape(urls["dead"][0]))
+    fixed, change = fix_dead_links(page_html, dict(dead, **{
+        "https://www.amazon.in/dp/B0STUB?tag=apnilist-21&th=1": {LINK}}), action="replace")
+    check("fix", 'href="https://www.amazon.in/s?k=Stub+Phone&amp;tag=apnilist-21"' in fixed
+          and PLACEHOLDER_IMAGE in fixed, change or "no change")
+
+    server.shutdown()
+    cache.close()
+    shutil.rmtree(workdir, ignore_errors=True)
+    print(f"\n🧪 {traffic['requests']:,} requests; {'all checks passed' if all(results) else 'FAILED'}")
+    return 0 if all(results) else 1
+
+
+# --- Main ---
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Check outbound links and images of the static article pages")
+    parser.add_argument("files", nargs="*", help="article files (default: all of public/articles)")
+    parser.add_argument("--all", action="store_true", help="Re-check every URL, not just expired ones")
+    parser.add_argument("--fix", action="store_true",
+                        help=f"Rewrite pages with dead URLs (DEAD_PRODUCT_ACTION={DEAD_PRODUCT_ACTION})")
+    parser.add_argument("--stub", type=int, nargs="?", const=200, metavar="N",
+                        help="Check N synthetic URLs against a local stub server")
+    return parser.parse_args()
+
+
+def run(args):
+    cache = LinkCache()
+    slugs = [os.path.basename(path)[:-5] for path in args.files] or None
+
+    with metrics.phase("extract"):
+        reextracted, removed = cache.sync()
+    print(f"🔍 Links re-extracted from {reextracted} page(s), {removed} removed page(s) dropped")
+
+    due = cache.due(slugs, recheck_all=args.all)
+    print(f"🌐 Checking {len(due)} URL(s) across {len({host_of(url) for url in due})} host(s) "
+          f"({CONCURRENCY} in flight, {PER_HOST} per host)...")
+    started = time.perf_counter()
+    with metrics.phase("check"):
+        states = asyncio.run(check_urls(due, cache)) if due else Counter()
+    elapsed = time.perf_counter() - started
+    if due:
+        print(f"   {dict(states)} in {elapsed:.1f}s ({len(due) / max(elapsed, 1e-9):.0f} URLs/s)")
+
+    report = build_report(cache, slugs)
+    totals = write_report(report)
+    broken = print_report(report, totals)
+
+    if args.fix and broken:
+        print(f"\n🩹 Fixing {len(broken)} page(s) ({DEAD_PRODUCT_ACTION} dead product links)...")
+        with metrics.phase("fix"):
+            paths = [os.path.join(ARTICLES_DIR, f"{slug}.html") for slug in broken]
+            postprocess.process_files(paths, only={"dead-links"}, workers=1 if len(paths) < 4 else None)
+    elif broken:
+        print("   👉 Rewrite them with --fix")
+
+
+def main():
+    args = parse_args()
+    if args.stub:
+        sys.exit(run_stub(args.stub))
+    if DEAD_PRODUCT_ACTION not in ("replace", "drop"):
+        print(f"❌ DEAD_PRODUCT_ACTION must be replace or drop, not {DEAD_PRODUCT_ACTION!r}")
+        sys.exit(1)
+    metrics.start("check_links")
+    status = "error"
+    try:
+        run(args)
+        status = "ok"
+    finally:
+        metrics.finish(status)
+
+
+if __name__ == "__main__":
+    main()
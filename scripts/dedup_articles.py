@@ -0,0 +1,257 @@
+"""
+Content-addressed dedup for public/articles.
+
+Every article is hashed after normalising canonical/og:url references to
+its own slug, so two files that differ only in their canonical URL share a
+hash. The hashes come from the article index (article_index.py), so only
+pages that changed since they were indexed are read. Each dated original that the slug store (src/lib/slugRedirects.json)
+already redirects to a clean copy is a candidate: middleware.ts redirects
+its URL, so the file is never served. Pairs are classified as
+
+  identical       byte-for-byte the same
+  canonical-only  the same apart from canonical/og:url
+  diverged        the clean copy was re-rendered since the migration
+
+Identical and canonical-only originals are pruned. Diverged ones hold
+content the clean copy no longer has, so they are only reported unless
+`--include-diverged` is given (generate_html.py's automatic prune never
+passes it).
+
+Pruned files (and their .gz/.br siblings) are deleted and recorded in the
+version-controlled scripts/pruned_manifest.json with the commit and git blob
+they can be recovered from, so `--restore` can put them back on any checkout
+via `git show`. Only pages whose committed copy matches the file on disk are
+pruned. Their URLs are dropped from the sitemap shards.
+Duplicate groups that are not redirected are only reported.
+
+Usage: python scripts/dedup_articles.py [--dry-run] [--include-diverged] [--restore [slug ...]]
+"""
+import os
+import sys
+import json
+import hashlib
+import argparse
+import subprocess
+from datetime import datetime, timezone
+
+import article_index
+import precompress
+import sitemap_writer
+import slug_redirects
+from migrate_to_clean_urls import BASE_URL
+from optimize_html import kb
+
+PROJECT_ROOT = os.path.abspath(os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+ARTICLES_DIR = os.path.join(PROJECT_ROOT, "public", "articles")
+PRUNED_MANIFEST_PATH = os.path.join(PROJECT_ROOT, "scripts", "pruned_manifest.json")
+
+SIBLING_EXTENSIONS = ("", ".gz", ".br")
+
+
+def sha256(data):
+    return hashlib.sha256(data).hexdigest()
+
+
+def article_files():
+    return {
+        f[:-5]: os.path.join(ARTICLES_DIR, f)
+        for f in sorted(os.listdir(ARTICLES_DIR))
+        if f.endswith(".html")
+    }
+
+
+def git(*args, text=True):
+    return subprocess.run(
+        ["git", *args], cwd=PROJECT_ROOT, capture_output=True, text=text, check=True,
+    ).stdout
+
+
+def committed_blob(path):
+    """(HEAD commit, blob) for `path` if the file on disk is what HEAD has, else None."""
+    rel = os.path.relpath(path, PROJECT_ROOT).replace(os.sep, "/")
+    try:
+        commit = git("rev-parse", "HEAD").strip()
+        blob = git("rev-parse", f"{commit}:{rel}").strip()
+        on_disk = git("hash-object", "--", rel).strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+    return (commit, blob) if blob == on_disk else None
+
+
+def deploy_bytes(paths):
+    """Bytes of each page plus its precompressed siblings."""
+    return sum(
+        os.path.getsize(path + ext)
+        for path in paths
+        for ext in SIBLING_EXTENSIONS
+        if os.path.exists(path + ext)
+    )
+
+
+def load_pruned_manifest():
+    if not os.path.exists(PRUNED_MANIFEST_PATH):
+        return {"pages": {}}
+    with open(PRUNED_MANIFEST_PATH, "r", encoding="utf-8") as f:
+        return json.load(f)
+
+
+def save_pruned_manifest(manifest):
+    tmp_path = f"{PRUNED_MANIFEST_PATH}.tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(manifest, f, indent=2, sort_keys=True)
+        f.write("\n")
+    os.replace(tmp_path, PRUNED_MANIFEST_PATH)
+
+
+def find_duplicates(pages, slug_map):
+    """
+    `pages` are article_index rows by slug (see article_index.content_hash).
+    Returns (prunable, unredirected_groups): prunable is a list of
+    (old_slug, new_slug, classification); unredirected_groups lists slugs
+    sharing a content hash where none of them is redirected.
+    """
+    hashes = {slug: page["content_hash"] for slug, page in pages.items()}
+
+    prunable = []
+    for old_slug, new_slug in sorted(slug_map.items()):
+        if old_slug not in pages or new_slug not in pages:
+            continue
+        if pages[old_slug]["output_hash"] == pages[new_slug]["output_hash"]:
+            classification = "identical"
+        elif hashes[old_slug] == hashes[new_slug]:
+            classification = "canonical-only"
+        else:
+            classification = "diverged"
+        prunable.append((old_slug, new_slug, classification))
+
+    groups = {}
+    for slug, digest in hashes.items():
+        groups.setdefault(digest, []).append(slug)
+    unredirected_groups = [
+        slugs for slugs in groups.values()
+        if len(slugs) > 1 and not any(s in slug_map for s in slugs)
+    ]
+    return prunable, unredirected_groups
+
+
+def prune(dry_run=False, include_diverged=False):
+    """
+    Deletes redirected originals from public/articles; diverged ones only
+    with `include_diverged`. Returns bytes saved.
+    """
+    slug_map = slug_redirects.load_slug_map()
+    files = article_files()
+    before = deploy_bytes(files.values())
+    index = article_index.default_index()
+    index.sync()
+    pages = index.pages()
+    prunable, unredirected_groups = find_duplicates(pages, slug_map)
+
+    manifest = load_pruned_manifest()
+    counts = {}
+    pruned_paths = []
+    pruned_slugs = []
+    kept = []
+    for old_slug, new_slug, classification in prunable:
+        path = files[old_slug]
+        if classification == "diverged" and not include_diverged:
+            kept.append(old_slug)
+            continue
+        recoverable = committed_blob(path)
+        if recoverable is None:
+            print(f"   ⚠ {old_slug} differs from its committed copy — commit it first so it can be restored")
+            continue
+        counts[classification] = counts.get(classification, 0) + 1
+        pruned_paths.append(path)
+        pruned_slugs.append(old_slug)
+        print(f"   🗑  {old_slug} → {new_slug} ({classification}, {kb(deploy_bytes([path]))})")
+        if dry_run:
+            continue
+
+        commit, blob = recoverable
+        for ext in SIBLING_EXTENSIONS:
+            if os.path.exists(path + ext):
+                os.remove(path + ext)
+        manifest["pages"][old_slug] = {
+            "redirect_to": new_slug,
+            "classification": classification,
+            "sha256": pages[old_slug]["output_hash"],
+            "commit": commit,
+            "blob": blob,
+            "pruned_at": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+        }
+
+    if not dry_run and pruned_slugs:
+        save_pruned_manifest(manifest)
+        index.remove(pruned_slugs)
+        removed = sitemap_writer.remove_urls(f"{BASE_URL}/articles/{slug}" for slug in pruned_slugs)
+        if removed:
+            print(f"   🗺️  Removed {removed} pruned URLs from the sitemap")
+
+    saved = deploy_bytes(pruned_paths) if dry_run else before - deploy_bytes(article_files().values())
+    summary = ", ".join(f"{count} {name}" for name, count in sorted(counts.items())) or "nothing to prune"
+    verb = "Would prune" if dry_run else "Pruned"
+    print(f"✂️  {verb} {len(pruned_slugs)} redirected originals ({summary})")
+    if before:
+        print(f"   public/articles: {kb(before)} → {kb(before - saved)} "
+              f"(saved {kb(saved)}, {saved / before:.1%})")
+    if kept:
+        print(f"   ℹ Kept {len(kept)} diverged originals (pass --include-diverged to prune them): "
+              f"{', '.join(kept)}")
+    for slugs in unredirected_groups:
+        print(f"   ℹ Same content, not redirected: {', '.join(sorted(slugs))}")
+    return saved
+
+
+def restore(slugs=None):
+    """
+    Writes pruned pages back into public/articles from the git blobs the
+    manifest records, then precompresses them. Returns the number restored.
+    """
+    manifest = load_pruned_manifest()
+    restored_paths = []
+    for slug in list(slugs or manifest["pages"]):
+        entry = manifest["pages"].get(slug)
+        if entry is None:
+            print(f"   ⚠ {slug} is not in the pruned manifest")
+            continue
+        try:
+            data = git("show", entry["blob"], text=False)
+        except (OSError, subprocess.CalledProcessError):
+            print(f"   ⚠ {slug}: blob {entry['blob'][:12]} (commit {entry['commit'][:12]}) is not in this clone "
+                  f"— run `git fetch --unshallow` and retry")
+            continue
+        if sha256(data) != entry["sha256"]:
+            print(f"   ⚠ {slug}: blob {entry['blob'][:12]} does not match its recorded hash — skipping")
+            continue
+        path = os.path.join(ARTICLES_DIR, f"{slug}.html")
+        precompress.write_atomic(path, data)
+        restored_paths.append(path)
+        del manifest["pages"][slug]
+        print(f"   ↩️  {slug} restored from {entry['commit'][:12]}")
+    if restored_paths:
+        save_pruned_manifest(manifest)
+        precompress.precompress(restored_paths)
+    print(f"Restored {len(restored_paths)} page(s).")
+    return len(restored_paths)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Prune redirected duplicate article pages")
+    parser.add_argument("--dry-run", action="store_true", help="report what would be pruned without deleting files")
+    parser.add_argument("--restore", nargs="*", metavar="SLUG",
+                        help="restore pruned pages from git (default: all of them)")
+    parser.add_argument("--include-diverged", action="store_true",
+                        help="also prune originals whose content differs from their clean copy")
+    args = parser.parse_args()
+
+    if args.restore is not None:
+        restore(args.restore)
+        return 0
+    print(f"Deduplicating {ARTICLES_DIR} against the slug store...\n")
+    prune(args.dry_run, args.include_diverged)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
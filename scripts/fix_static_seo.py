@@ -3,10 +3,16 @@ Post-processes existing static article HTML files to fix:
 1. og:image placeholder (lovable.dev) → first real product image from the page
 2. Removes duplicate generic OG/Twitter tags at the top of <head> (non data-rh ones)
 3. Fixes apnilist.in references in JSON-LD that weren't caught by the domain migration
+
+Usage: python scripts/fix_static_seo.py [--profile]
 """
 import os
 import re
-import json
+import argparse
+
+import metrics
+import precompress
+from html_utils import parse_ld_json, ld_json_schemas
 
 ARTICLES_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "public", "articles")
 PLACEHOLDER_IMAGE = "https://lovable.dev/opengraph-image-p98pqg.png"
@@ -26,22 +32,35 @@ GENERIC_OG_PATTERN = re.compile(
     re.MULTILINE
 )
 
-def extract_first_product_image(html):
-    """Extract the first product image from embedded Product JSON-LD schemas."""
-    ld_json_blocks = re.findall(r'<script type="application/ld\+json">(.*?)</script>', html, re.DOTALL)
-    for block in ld_json_blocks:
-        try:
-            data = json.loads(block)
-            schemas = data if isinstance(data, list) else [data]
-            for schema in schemas:
-                if schema.get("@type") == "Product":
-                    img = schema.get("image")
-                    if img and isinstance(img, str) and img.startswith("http") and "logo" not in img:
-                        return img
-        except (json.JSONDecodeError, AttributeError):
-            continue
+def extract_first_product_image(html, ld_blocks=None):
+    """
+    Extract the first product image from embedded Product JSON-LD schemas.
+    Pass already-parsed `ld_blocks` to avoid re-scanning the page.
+    """
+    if ld_blocks is None:
+        ld_blocks = parse_ld_json(html)
+    for schema in ld_json_schemas(ld_blocks):
+        if schema.get("@type") == "Product":
+            img = schema.get("image")
+            if img and isinstance(img, str) and img.startswith("http") and "logo" not in img:
+                return img
     return None
 
+def fix_og_image(html, ld_blocks=None):
+    """Replace lovable.dev placeholder with real product image (or logo fallback)."""
+    if PLACEHOLDER_IMAGE not in html:
+        return html, None
+    product_image = extract_first_product_image(html, ld_blocks)
+    replacement = product_image if product_image else FALLBACK_IMAGE
+    return html.replace(PLACEHOLDER_IMAGE, replacement), f"og:image → {replacement[:60]}..."
+
+def remove_generic_og(html):
+    """Remove duplicate generic top-level OG/Twitter block."""
+    html_cleaned, count = GENERIC_OG_PATTERN.subn("", html)
+    if count > 0:
+        return html_cleaned, "removed duplicate generic OG/Twitter tags"
+    return html, None
+
 def fix_file(path):
     with open(path, "r", encoding="utf-8") as f:
         html = f.read()
@@ -50,17 +69,14 @@ def fix_file(path):
     changes = []
 
     # 1. Replace lovable.dev placeholder with real product image (or logo fallback)
-    if PLACEHOLDER_IMAGE in html:
-        product_image = extract_first_product_image(html)
-        replacement = product_image if product_image else FALLBACK_IMAGE
-        html = html.replace(PLACEHOLDER_IMAGE, replacement)
-        changes.append(f"og:image → {replacement[:60]}...")
+    html, change = fix_og_image(html)
+    if change:
+        changes.append(change)
 
     # 2. Remove duplicate generic top-level OG/Twitter block
-    html_cleaned, count = GENERIC_OG_PATTERN.subn("", html)
-    if count > 0:
-        html = html_cleaned
-        changes.append("removed duplicate generic OG/Twitter tags")
+    html, change = remove_generic_og(html)
+    if change:
+        changes.append(change)
 
     if html != original:
         with open(path, "w", encoding="utf-8") as f:
@@ -69,21 +85,36 @@ def fix_file(path):
     return []
 
 def main():
-    files = sorted(f for f in os.listdir(ARTICLES_DIR) if f.endswith(".html"))
-    print(f"Processing {len(files)} static article files...\n")
-    total_changed = 0
-    for filename in files:
-        path = os.path.join(ARTICLES_DIR, filename)
-        changes = fix_file(path)
-        if changes:
-            print(f"✅ {filename}")
-            for c in changes:
-                print(f"   • {c}")
-            total_changed += 1
-        else:
-            print(f"   {filename} — no changes needed")
-
-    print(f"\nDone. {total_changed}/{len(files)} files updated.")
+    parser = argparse.ArgumentParser(description="Fix og:image, duplicate OG tags and old-domain JSON-LD in static articles")
+    parser.add_argument("--profile", action="store_true", help="cProfile the run into .build/metrics/")
+    args = parser.parse_args()
+
+    metrics.start("fix_static_seo", profile=args.profile)
+    status = "error"
+    try:
+        files = sorted(f for f in os.listdir(ARTICLES_DIR) if f.endswith(".html"))
+        print(f"Processing {len(files)} static article files...\n")
+        changed_paths = []
+        with metrics.phase("fix"):
+            for filename in files:
+                path = os.path.join(ARTICLES_DIR, filename)
+                changes = fix_file(path)
+                if changes:
+                    print(f"✅ {filename}")
+                    for c in changes:
+                        print(f"   • {c}")
+                    changed_paths.append(path)
+                else:
+                    print(f"   {filename} — no changes needed")
+        metrics.incr("files_updated", len(changed_paths))
+        if changed_paths:
+            with metrics.phase("precompress"):
+                precompress.precompress(changed_paths)
+
+        print(f"\nDone. {len(changed_paths)}/{len(files)} files updated.")
+        status = "ok"
+    finally:
+        metrics.finish(status)
 
 if __name__ == "__main__":
     main()
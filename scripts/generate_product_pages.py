@@ -0,0 +1,427 @@
+"""
+Static product pages.
+Renders public/product/<slug>.html for every product from three bulk
+Supabase queries (products, product_price_history, product_details), with
+Product + BreadcrumbList JSON-LD, a downsampled price-history series and
+the product's rollup from price_analytics.py.
+
+The page data is also embedded as JSON in <script id="product-data">, which
+ProductDetail.tsx reads instead of querying Supabase. Like the article
+pages, a product is only re-rendered when its inputs (row, details or
+downsampled prices) change — see build_manifest.py; the manifest is kept
+in .build/product_manifest.json.
+
+Usage: python scripts/generate_product_pages.py [--force]
+"""
+import os
+import json
+import argparse
+from html import escape
+
+import requests
+
+import build_manifest
+import http_renderer
+import metrics
+import precompress
+import price_analytics
+import supabase_client
+from http_renderer import SITE_URL, LOGO_URL, ld_json, best_price
+from optimize_html import kb
+
+PROJECT_ROOT = os.path.abspath(os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+PRODUCTS_DIR = os.path.join(PROJECT_ROOT, "public", "product")
+MANIFEST_PATH = os.path.join(PROJECT_ROOT, ".build", "product_manifest.json")
+LEGACY_MANIFEST_PATH = os.path.join(PRODUCTS_DIR, ".manifest.json")
+
+# Bump when the page markup changes, so every product is re-rendered
+RENDERER_VERSION = "product-1"
+
+# Same ceiling as the chart on ProductDetail.tsx
+MAX_HISTORY_POINTS = 90
+
+DATA_SCRIPT_ID = "product-data"
+
+PRODUCT_COLUMNS = "id,name,slug,image,amazon_link,flipkart_link,rating,pros,cons,short_description,badge"
+HISTORY_COLUMNS = "product_id,created_at,amazon_price,flipkart_price,amazon_discount,flipkart_discount"
+
+
+def downsample(rows, max_points=MAX_HISTORY_POINTS):
+    """
+    Reduces ascending price rows to the last reading of each day, then to at
+    most `max_points` evenly spaced days. The newest reading and the all-time
+    low are always kept.
+    """
+    daily = {}
+    for row in rows:
+        daily[row["created_at"][:10]] = row
+    series = list(daily.values())
+    if len(series) <= max_points:
+        return series
+
+    step = (len(series) - 1) / (max_points - 1)
+    keep = {round(i * step) for i in range(max_points)}
+    priced = [i for i, row in enumerate(series) if best_price(row) > 0]
+    if priced:
+        low = min(priced, key=lambda i: best_price(series[i]))
+        if low not in keep:
+            # Swap out the nearest sampled day, never the first or the newest
+            nearest = min((i for i in keep if 0 < i < len(series) - 1), key=lambda i: abs(i - low))
+            keep.discard(nearest)
+            keep.add(low)
+    return [series[i] for i in sorted(keep)]
+
+
+def page_slug(product):
+    """ProductDetail accepts either the slug or the product id."""
+    return product.get("slug") or product["id"]
+
+
+def fetch_product_bundles():
+    """
+    Three bulk queries for every product. product_details is optional (it is
+    filled in by the enrich function) and skipped if the table is missing.
+    Returns {slug: bundle}.
+    """
+    products = supabase_client.get_all("products", {"select": PRODUCT_COLUMNS, "order": "id.asc"})
+    history = supabase_client.get_all("product_price_history", {
+        "select": HISTORY_COLUMNS,
+        "order": "created_at.asc,id.asc",
+    })
+    try:
+        details = supabase_client.get_all("product_details", {"select": "*"})
+    except requests.HTTPError as e:
+        print(f"⚠ Could not fetch product_details ({e.response.status_code}); rendering without them")
+        details = []
+
+    history_by_product = http_renderer.group_history(history)
+    details_by_product = {row["product_id"]: row for row in details}
+
+    bundles = {}
+    for product in products:
+        rows = [
+            {k: v for k, v in row.items() if k != "product_id"}
+            for row in history_by_product.get(product["id"], [])
+        ]
+        bundles[page_slug(product)] = {
+            "product": product,
+            "history": downsample(rows),
+            "details": details_by_product.get(product["id"]),
+            "analytics": price_analytics.rollup_for(product["id"]),
+        }
+    return bundles
+
+
+def input_hash(bundle):
+    details = {k: v for k, v in (bundle["details"] or {}).items() if k not in ("updated_at", "created_at")}
+    payload = json.dumps({**bundle, "details": details}, sort_keys=True, default=str)
+    return build_manifest.hash_bytes(payload.encode("utf-8"))
+
+
+def to_list(value):
+    if isinstance(value, list):
+        return value
+    return [value] if isinstance(value, str) else []
+
+
+def current_prices(history):
+    """Mirrors ProductDetail: the newest row holds the current prices."""
+    latest = history[-1] if history else {}
+    return {
+        "amazon_price": latest.get("amazon_price"),
+        "flipkart_price": latest.get("flipkart_price"),
+        "amazon_discount": latest.get("amazon_discount"),
+        "flipkart_discount": latest.get("flipkart_discount"),
+    }
+
+
+def build_structured_data(bundle, canonical):
+    product = bundle["product"]
+    details = bundle["details"] or {}
+    prices = current_prices(bundle["history"])
+    gallery = to_list(details.get("gallery"))
+
+    data = {
+        "@context": "https://schema.org",
+        "@type": "Product",
+        "name": product["name"],
+        "image": gallery or [product.get("image") or LOGO_URL],
+        "description": details.get("description") or product.get("short_description") or product["name"],
+        "sku": product["id"],
+        "url": canonical,
+    }
+    rating = details.get("avg_rating") or product.get("rating")
+    if rating:
+        data["aggregateRating"] = {
+            "@type": "AggregateRating",
+            "ratingValue": rating,
+            "bestRating": 5,
+            "worstRating": 1,
+            "ratingCount": details.get("total_ratings") or 1,
+        }
+
+    offers = []
+    for vendor, seller in (("amazon", "Amazon"), ("flipkart", "Flipkart")):
+        price = prices.get(f"{vendor}_price")
+        link = product.get(f"{vendor}_link")
+        if link and price and price > 0:
+            offers.append({
+                "@type": "Offer",
+                "priceCurrency": "INR",
+                "price": price,
+                "availability": "https://schema.org/InStock",
+                "url": link,
+                "seller": {"@type": "Organization", "name": seller},
+            })
+    if offers:
+        amounts = [o["price"] for o in offers]
+        data["offers"] = {
+            "@type": "AggregateOffer",
+            "priceCurrency": "INR",
+            "lowPrice": min(amounts),
+            "highPrice": max(amounts),
+            "offerCount": len(offers),
+            "offers": offers,
+        }
+
+    breadcrumbs = {
+        "@context": "https://schema.org",
+        "@type": "BreadcrumbList",
+        "itemListElement": [
+            {"@type": "ListItem", "position": 1, "name": "Home", "item": SITE_URL},
+            {"@type": "ListItem", "position": 2, "name": "Products", "item": f"{SITE_URL}/products"},
+            {"@type": "ListItem", "position": 3, "name": product["name"], "item": canonical},
+        ],
+    }
+    return [data, breadcrumbs]
+
+
+def render_head(bundle, canonical):
+    product = bundle["product"]
+    title = escape(f"{product['name']} - Price in India | ApniList")
+    description = escape(
+        product.get("short_description")
+        or f"Compare prices of {product['name']} on Amazon and Flipkart. Track price drops and set alerts."
+    )
+    image = escape(product.get("image") or LOGO_URL)
+    url = escape(canonical)
+
+    tags = [
+        f"<title>{title}</title>",
+        f'<meta name="description" content="{description}">',
+        f'<link rel="canonical" href="{url}">',
+        '<meta property="og:type" content="product">',
+        f'<meta property="og:url" content="{url}">',
+        f'<meta property="og:title" content="{title}">',
+        f'<meta property="og:description" content="{description}">',
+        f'<meta property="og:image" content="{image}">',
+        '<meta property="og:site_name" content="ApniList">',
+        '<meta name="twitter:card" content="summary_large_image">',
+        f'<meta name="twitter:title" content="{title}">',
+        f'<meta name="twitter:description" content="{description}">',
+        f'<meta name="twitter:image" content="{image}">',
+    ]
+    tags += [ld_json(block) for block in build_structured_data(bundle, canonical)]
+    return "\n    ".join(tags)
+
+
+def price_summary(analytics):
+    """One line from the price_analytics rollup, e.g. for the price block."""
+    parts = []
+    if analytics["all_time_low"]:
+        parts.append("Lowest price ever tracked")
+    elif analytics["lowest_in_days"] >= 7:
+        parts.append(f"Lowest price in {analytics['lowest_in_days']} days")
+    if analytics.get("min"):
+        parts.append(f"All-time low: ₹{analytics['min']:,.0f}")
+    if analytics.get("avg_30d"):
+        parts.append(f"30-day average: ₹{analytics['avg_30d']:,.0f}")
+    return " · ".join(parts)
+
+
+def render_history_table(history):
+    def price(value):
+        return f"₹{value:,.0f}" if value else "—"
+
+    rows = "".join(
+        f"<tr><td>{escape(row['created_at'][:10])}</td>"
+        f"<td>{price(row.get('amazon_price'))}</td><td>{price(row.get('flipkart_price'))}</td></tr>"
+        for row in reversed(history)
+    )
+    return (
+        '<table class="w-full text-sm"><thead><tr><th>Date</th><th>Amazon</th><th>Flipkart</th></tr></thead>'
+        f"<tbody>{rows}</tbody></table>"
+    )
+
+
+def render_main(bundle):
+    product = bundle["product"]
+    details = bundle["details"] or {}
+    history = bundle["history"]
+    prices = current_prices(history)
+    name = escape(product["name"])
+    lowest = best_price(prices)
+
+    parts = [
+        '<main class="flex-1 py-8"><div class="container mx-auto px-4">',
+        '<div class="grid grid-cols-1 lg:grid-cols-2 gap-8">',
+        f'<div><img src="{escape(product.get("image") or "/placeholder.svg")}" alt="{name}" '
+        'class="max-h-[450px] w-auto object-contain"></div>',
+        '<div class="space-y-5">',
+    ]
+    if product.get("badge"):
+        parts.append(f'<span class="inline-flex items-center rounded-full border px-2.5 py-0.5 text-xs font-semibold">{escape(product["badge"])}</span>')
+    parts.append(f'<h1 class="text-3xl font-bold mb-2">{name}</h1>')
+    if lowest:
+        parts.append(f'<p class="text-sm text-muted-foreground">Best Price</p><p class="text-4xl font-bold text-primary">₹{lowest:,.0f}</p>')
+    analytics = bundle.get("analytics")
+    if analytics:
+        parts.append(f'<p class="text-xs text-muted-foreground mt-1">{escape(price_summary(analytics))}</p>')
+
+    for vendor, label in (("amazon", "Amazon"), ("flipkart", "Flipkart")):
+        link = product.get(f"{vendor}_link")
+        price = prices.get(f"{vendor}_price")
+        if link and price and price > 0:
+            parts.append(
+                f'<a href="{escape(link)}" target="_blank" rel="noopener noreferrer sponsored" '
+                f'class="flex items-center justify-between p-3 border rounded-lg">Buy on {label} ₹{price:,.0f}</a>'
+            )
+
+    highlights = to_list(details.get("highlights"))
+    if highlights:
+        items = "".join(f"<li>{escape(str(h))}</li>" for h in highlights)
+        parts.append(f'<div><h3 class="font-semibold mb-2">Highlights</h3><ul class="space-y-1.5">{items}</ul></div>')
+    description = details.get("description") or product.get("short_description")
+    if description:
+        parts.append(f'<p class="text-sm text-muted-foreground">{escape(description)}</p>')
+    parts.append("</div></div>")
+
+    specs = details.get("specs") or {}
+    if isinstance(specs, dict) and specs:
+        rows = "".join(f"<div><dt>{escape(str(k))}</dt><dd>{escape(str(v))}</dd></div>" for k, v in specs.items())
+        parts.append(f'<section class="mt-8"><h2 class="text-xl font-bold mb-4">Specifications</h2><dl>{rows}</dl></section>')
+
+    if len(history) > 1:
+        parts.append(f'<section class="mt-8"><h2 class="text-xl font-bold mb-2">Price History</h2>{render_history_table(history)}</section>')
+
+    for key, label in (("pros", "✓ Pros"), ("cons", "✗ Cons")):
+        values = to_list(product.get(key))
+        if values:
+            items = "".join(f"<li>{escape(str(v))}</li>" for v in values)
+            parts.append(f'<section class="mt-8"><h3 class="font-semibold mb-3">{label}</h3><ul class="space-y-2">{items}</ul></section>')
+
+    parts.append("</div></main>")
+    return "".join(parts)
+
+
+def render_data_script(bundle):
+    """The page data for ProductDetail.tsx; `</` is escaped so it cannot close the script."""
+    data = json.dumps(bundle, ensure_ascii=False, default=str).replace("</", "<\\/")
+    return f'<script type="application/json" id="{DATA_SCRIPT_ID}">{data}</script>'
+
+
+def render_product(template, bundle, slug):
+    """Returns the full static HTML for one product bundle."""
+    canonical = f"{SITE_URL}/product/{slug}"
+    head = render_head(bundle, canonical)
+    body = (
+        '<div id="root"><div class="min-h-screen flex flex-col">'
+        f'{render_main(bundle)}'
+        '</div></div>'
+        f'{render_data_script(bundle)}'
+    )
+    html = template.replace("</head>", f"    {head}\n  </head>", 1)
+    return http_renderer.ROOT_PATTERN.sub(lambda _: body, html, count=1)
+
+
+def remove_orphans(bundles, manifest):
+    """Deletes pages (and their .gz/.br) for products that no longer exist."""
+    removed = 0
+    for filename in os.listdir(PRODUCTS_DIR):
+        if not filename.endswith(".html") or filename[:-5] in bundles:
+            continue
+        for ext in ("", ".gz", ".br"):
+            path = os.path.join(PRODUCTS_DIR, filename + ext)
+            if os.path.exists(path):
+                os.remove(path)
+        manifest["pages"].pop(filename[:-5], None)
+        removed += 1
+    return removed
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Generate static product pages with embedded price history")
+    parser.add_argument("--force", action="store_true", help="re-render every product")
+    parser.add_argument("--profile", action="store_true",
+                        help="cProfile every phase and dump the slowest one to .build/metrics/")
+    return parser.parse_args()
+
+
+def main():
+    args = parse_args()
+    metrics.start("generate_product_pages", profile=args.profile)
+    status = "error"
+    try:
+        generate(args)
+        status = "ok"
+    finally:
+        metrics.finish(status)
+
+
+def generate(args):
+    os.makedirs(PRODUCTS_DIR, exist_ok=True)
+
+    template = http_renderer.load_template()
+    with metrics.phase("price_analytics"):
+        price_analytics.refresh()
+    print("🔍 Fetching products, price history and details from Supabase...")
+    with metrics.phase("supabase_fetch"):
+        bundles = fetch_product_bundles()
+    manifest = build_manifest.load_manifest(MANIFEST_PATH, LEGACY_MANIFEST_PATH)
+
+    stale = {}
+    reasons = {}
+    for slug, bundle in bundles.items():
+        page_input_hash = input_hash(bundle)
+        reason = "forced" if args.force else build_manifest.stale_reason(
+            manifest, slug, page_input_hash, RENDERER_VERSION, PRODUCTS_DIR)
+        if reason:
+            stale[slug] = page_input_hash
+            reasons[reason] = reasons.get(reason, 0) + 1
+
+    print(f"🧮 {len(bundles)} products: {len(stale)} to render, {len(bundles) - len(stale)} up to date")
+    for reason, count in sorted(reasons.items()):
+        print(f"   • {reason}: {count}")
+
+    written = []
+    try:
+        with metrics.phase("render", renderer="product"):
+            for slug, page_input_hash in stale.items():
+                path = os.path.join(PRODUCTS_DIR, f"{slug}.html")
+                try:
+                    html = render_product(template, bundles[slug], slug)
+                except Exception as e:
+                    print(f"❌ Failed to render {slug}: {e}")
+                    metrics.incr("render_failures", renderer="product", cause=e.__class__.__name__)
+                    continue
+                data = html.encode("utf-8")
+                with open(path, "wb") as f:
+                    f.write(data)
+                metrics.incr("pages_written")
+                metrics.incr("bytes_written", len(data))
+                build_manifest.record_page(manifest, slug, page_input_hash, RENDERER_VERSION, PRODUCTS_DIR)
+                written.append(path)
+                print(f"✅ Generated: {path} ({kb(len(data))}, {len(bundles[slug]['history'])} price points)")
+        removed = remove_orphans(bundles, manifest)
+    finally:
+        build_manifest.save_manifest(manifest, MANIFEST_PATH, LEGACY_MANIFEST_PATH)
+
+    print(f"\n✨ Product pages: {len(written)} rendered, {len(stale) - len(written)} failed, "
+          f"{removed} removed, {len(bundles) - len(stale)} unchanged")
+    if written:
+        with metrics.phase("precompress"):
+            precompress.precompress(written)
+
+
+if __name__ == "__main__":
+    main()
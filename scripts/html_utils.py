@@ -0,0 +1,26 @@
+"""
+Helpers shared by the static-article post-processors.
+"""
+import re
+import json
+
+LD_JSON_PATTERN = re.compile(r'<script type="application/ld\+json">(.*?)</script>', re.DOTALL)
+
+
+def parse_ld_json(html):
+    """Returns every ld+json block in the page as parsed JSON (invalid blocks are skipped)."""
+    blocks = []
+    for raw in LD_JSON_PATTERN.findall(html):
+        try:
+            blocks.append(json.loads(raw))
+        except json.JSONDecodeError:
+            continue
+    return blocks
+
+
+def ld_json_schemas(blocks):
+    """Flattens top-level lists so each item is a single schema dict."""
+    for data in blocks:
+        for schema in (data if isinstance(data, list) else [data]):
+            if isinstance(schema, dict):
+                yield schema
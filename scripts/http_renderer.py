@@ -0,0 +1,370 @@
+"""
+Browser-free article renderer.
+Builds public/articles/<slug>.html straight from Supabase rows and the built
+Vite template (dist/index.html), mirroring the head tags, JSON-LD and <main>
+markup that ArticleDetail.tsx produces on the /draft/<slug> route.
+
+Used by generate_html.py when run with --renderer http.
+"""
+import os
+import re
+import json
+from html import escape
+
+import price_analytics
+import supabase_client
+from inject_faq_schema import build_faq_schema
+
+SITE_URL = "https://www.apnilist.co.in"
+LOGO_URL = f"{SITE_URL}/logo.png"
+PROJECT_ROOT = os.path.abspath(os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+TEMPLATE_PATH = os.environ.get("TEMPLATE_PATH", os.path.join(PROJECT_ROOT, "dist", "index.html"))
+
+# Generic site-wide tags in index.html that the page-specific ones replace
+TEMPLATE_SEO_PATTERN = re.compile(
+    r'\s*<title>.*?</title>'
+    r'|\s*<meta name="description"[^>]*>'
+    r'|\s*<meta property="og:[^"]*"[^>]*>'
+    r'|\s*<meta name="twitter:[^"]*"[^>]*>',
+    re.DOTALL
+)
+ROOT_PATTERN = re.compile(r'<div id="root">\s*</div>')
+
+# The price history columns latest_prices() reads, plus the one it groups by
+HISTORY_COLUMNS = "product_id,amazon_price,amazon_discount,flipkart_price,flipkart_discount,original_price"
+HISTORY_BATCH_SIZE = 100  # product ids per in.(...) filter
+
+
+def load_template(path=TEMPLATE_PATH):
+    """Reads the built index.html. Run `npm run build` first."""
+    if not os.path.exists(path):
+        raise FileNotFoundError(f"Template not found: {path} (run 'npm run build' first)")
+    with open(path, "r", encoding="utf-8") as f:
+        template = f.read()
+    if not ROOT_PATTERN.search(template):
+        raise ValueError(f"Template has no empty <div id=\"root\"></div>: {path}")
+    return TEMPLATE_SEO_PATTERN.sub("", template)
+
+
+def latest_prices(history):
+    """
+    Mirrors ArticleDetail's composite latest price: newest non-empty price per
+    vendor, independently. `history` must be ordered newest first.
+    """
+    amazon = next((h for h in history if h.get("amazon_price") and h["amazon_price"] > 0), None)
+    flipkart = next((h for h in history if h.get("flipkart_price") and h["flipkart_price"] > 0), None)
+    original = next((h["original_price"] for h in history if h.get("original_price") and h["original_price"] > 0), None)
+    return {
+        "amazon_price": amazon["amazon_price"] if amazon else None,
+        "amazon_discount": amazon.get("amazon_discount") if amazon else None,
+        "flipkart_price": flipkart["flipkart_price"] if flipkart else None,
+        "flipkart_discount": flipkart.get("flipkart_discount") if flipkart else None,
+        "original_price": original,
+    }
+
+
+def best_price(prices):
+    candidates = [p for p in (prices.get("amazon_price"), prices.get("flipkart_price")) if p and p > 0]
+    return min(candidates) if candidates else 0
+
+
+def normalise_product(product):
+    product = dict(product or {})
+    for key in ("pros", "cons", "tags"):
+        if not isinstance(product.get(key), list):
+            product[key] = []
+    return product
+
+
+def assemble_bundle(article, article_products, history_by_product):
+    """Combines an article row, its ranked products and their price history."""
+    products = [{
+        "rank": ap["rank"],
+        "product": normalise_product(ap.get("products")),
+        "prices": latest_prices(history_by_product.get(ap["product_id"], [])),
+    } for ap in sorted(article_products, key=lambda ap: ap["rank"])]
+    return {"article": article, "products": products}
+
+
+def group_history(rows):
+    history_by_product = {}
+    for row in rows:
+        history_by_product.setdefault(row["product_id"], []).append(row)
+    return history_by_product
+
+
+def fetch_history(product_ids):
+    """
+    Price history of `product_ids`, newest first, one in.(...) query per
+    batch of ids and only the columns latest_prices() reads.
+    """
+    product_ids = sorted(set(product_ids))
+    history = []
+    for i in range(0, len(product_ids), HISTORY_BATCH_SIZE):
+        history.extend(supabase_client.get_all("product_price_history", {
+            "select": HISTORY_COLUMNS,
+            "product_id": supabase_client.in_filter(product_ids[i:i + HISTORY_BATCH_SIZE]),
+            "order": "created_at.desc,id.asc",
+        }))
+    return history
+
+
+def fetch_article_bundle(slug):
+    """
+    Fetches everything a page needs in three queries: the article, its ranked
+    products, and the products' price history.
+    Returns None if the article does not exist.
+    """
+    articles = supabase_client.get("articles", {
+        "select": "*,categories(id,name,slug)",
+        "slug": f"eq.{slug}",
+        "limit": "1",
+    })
+    if not articles:
+        return None
+    article = articles[0]
+
+    article_products = supabase_client.get_all("article_products", {
+        "select": "rank,product_id,products(*)",
+        "article_id": f"eq.{article['id']}",
+        "order": "rank.asc",
+    })
+    history = fetch_history(ap["product_id"] for ap in article_products)
+    return assemble_bundle(article, article_products, group_history(history))
+
+
+def fetch_all_bundles():
+    """
+    Bulk variant of fetch_article_bundle(): the same three queries for every
+    article, fetching history only for products some article ranks.
+    Returns {slug: bundle}.
+    """
+    articles = supabase_client.get_all("articles", {
+        "select": "*,categories(id,name,slug)",
+        "order": "id.asc",
+    })
+    article_products = supabase_client.get_all("article_products", {
+        "select": "article_id,rank,product_id,products(*)",
+        "order": "id.asc",
+    })
+    history = fetch_history(ap["product_id"] for ap in article_products)
+
+    products_by_article = {}
+    for ap in article_products:
+        products_by_article.setdefault(ap["article_id"], []).append(ap)
+    history_by_product = group_history(history)
+
+    return {
+        article["slug"]: assemble_bundle(article, products_by_article.get(article["id"], []), history_by_product)
+        for article in articles if article.get("slug")
+    }
+
+
+def date_modified(article):
+    """One source for the JSON-LD dateModified and the article:modified_time meta tag."""
+    return article.get("updated_at") or article["created_at"]
+
+
+def ld_json(data):
+    return f'<script type="application/ld+json">{json.dumps(data, ensure_ascii=False)}</script>'
+
+
+def build_structured_data(article, products, canonical):
+    blocks = [{
+        "@context": "https://schema.org",
+        "@type": "Article",
+        "headline": article["title"],
+        "description": article.get("excerpt") or article["title"],
+        "image": article.get("featured_image") or LOGO_URL,
+        "author": {"@type": "Person", "name": article.get("author") or "ApniList Team"},
+        "publisher": {
+            "@type": "Organization",
+            "name": "ApniList",
+            "logo": {"@type": "ImageObject", "url": LOGO_URL},
+        },
+        "datePublished": article["created_at"],
+        "dateModified": date_modified(article),
+        "mainEntityOfPage": {"@type": "WebPage", "@id": canonical},
+        **({"keywords": ", ".join(article["tags"])} if article.get("tags") else {}),
+    }, {
+        "@context": "https://schema.org",
+        "@type": "BreadcrumbList",
+        "itemListElement": [
+            {"@type": "ListItem", "position": 1, "name": "Home", "item": SITE_URL},
+            {"@type": "ListItem", "position": 2, "name": "Articles", "item": f"{SITE_URL}/articles"},
+            {"@type": "ListItem", "position": 3, "name": article["title"], "item": canonical},
+        ],
+    }]
+
+    if products:
+        items = []
+        for index, entry in enumerate(products):
+            product = entry["product"]
+            price = best_price(entry["prices"])
+            item = {
+                "@type": "Product",
+                "name": product.get("name", ""),
+                "image": product.get("image") or LOGO_URL,
+                "description": product.get("short_description") or product.get("name", ""),
+            }
+            if product.get("rating"):
+                item["aggregateRating"] = {
+                    "@type": "AggregateRating",
+                    "ratingValue": product["rating"],
+                    "bestRating": 5,
+                    "worstRating": 1,
+                    "ratingCount": 1,
+                }
+            if price > 0:
+                item["offers"] = {
+                    "@type": "Offer",
+                    "priceCurrency": "INR",
+                    "price": price,
+                    "availability": "https://schema.org/InStock",
+                    "url": product.get("flipkart_link") or product.get("amazon_link") or canonical,
+                }
+            items.append({"@type": "ListItem", "position": index + 1, "item": item})
+
+        blocks.append({
+            "@context": "https://schema.org",
+            "@type": "ItemList",
+            "name": article["title"],
+            "numberOfItems": len(products),
+            "itemListElement": items,
+        })
+
+        faq_products = [{
+            "name": e["product"].get("name", ""),
+            "description": e["product"].get("short_description") or "",
+            "price": best_price(e["prices"]),
+            "rollup": price_analytics.rollup_for(e["product"].get("id")),
+        } for e in products]
+        blocks.append(build_faq_schema(article["title"], article.get("excerpt") or "", faq_products))
+
+    return blocks
+
+
+def render_head(article, products, canonical):
+    title = escape(f"{article['title']} | ApniList")
+    description = escape(article.get("excerpt") or article["title"])
+    first_image = products[0]["product"].get("image") if products else None
+    image = escape(article.get("featured_image") or first_image or LOGO_URL)
+    url = escape(canonical)
+
+    tags = [
+        f"<title>{title}</title>",
+        f'<meta name="description" content="{description}">',
+        f'<link rel="canonical" href="{url}">',
+        f'<meta name="title" content="{title}">',
+        '<meta property="og:type" content="article">',
+        f'<meta property="og:url" content="{url}">',
+        f'<meta property="og:title" content="{title}">',
+        f'<meta property="og:description" content="{description}">',
+        f'<meta property="og:image" content="{image}">',
+        '<meta property="og:site_name" content="ApniList">',
+        f'<meta property="article:published_time" content="{escape(article["created_at"])}">',
+        f'<meta property="article:modified_time" content="{escape(date_modified(article))}">',
+    ]
+    if article.get("author"):
+        tags.append(f'<meta property="article:author" content="{escape(article["author"])}">')
+    for tag in article.get("tags") or []:
+        tags.append(f'<meta property="article:tag" content="{escape(tag)}">')
+    tags += [
+        '<meta name="twitter:card" content="summary_large_image">',
+        f'<meta name="twitter:url" content="{url}">',
+        f'<meta name="twitter:title" content="{title}">',
+        f'<meta name="twitter:description" content="{description}">',
+        f'<meta name="twitter:image" content="{image}">',
+        '<meta name="robots" content="index, follow, max-image-preview:large, max-snippet:-1, max-video-preview:-1">',
+    ]
+    tags += [ld_json(block) for block in build_structured_data(article, products, canonical)]
+    return "\n    ".join(tags)
+
+
+def render_product_card(entry):
+    product = entry["product"]
+    prices = entry["prices"]
+    name = escape(product.get("name", ""))
+    parts = [
+        f'<div class="rounded-lg border bg-card shadow-sm" data-product-card="" id="product-{entry["rank"]}">',
+        '<div class="p-6 flex flex-col md:flex-row gap-6">',
+        '<div class="md:w-1/3 lg:w-1/4 flex flex-col gap-4">',
+        '<div class="rounded-lg overflow-hidden bg-white aspect-square relative border">',
+        f'<img src="{escape(product.get("image") or "/placeholder.svg")}" alt="{name}" '
+        'class="absolute inset-0 w-full h-full object-contain p-4">',
+        f'<div class="absolute top-2 left-2 bg-black text-white text-xs font-bold py-1 px-2 rounded shadow-md">#{entry["rank"]}</div>',
+        '</div></div>',
+        '<div class="flex-1 space-y-4">',
+    ]
+    if product.get("badge"):
+        parts.append(f'<span class="inline-flex items-center rounded-full border px-2.5 py-0.5 text-xs font-semibold">{escape(product["badge"])}</span>')
+    parts.append(f'<h3 class="text-2xl font-bold leading-tight">{name}</h3>')
+    if product.get("short_description"):
+        parts.append(f'<p class="text-muted-foreground">{escape(product["short_description"])}</p>')
+
+    for key, label in (("pros", "Pros"), ("cons", "Cons")):
+        if product[key]:
+            items = "".join(f"<li>{escape(str(p))}</li>" for p in product[key])
+            parts.append(f'<div><h4 class="font-semibold">{label}</h4><ul class="space-y-1 text-sm">{items}</ul></div>')
+
+    links = []
+    for vendor, label in (("amazon", "Amazon"), ("flipkart", "Flipkart")):
+        link = product.get(f"{vendor}_link")
+        price = prices.get(f"{vendor}_price")
+        if link and price and price > 0:
+            links.append(
+                f'<a href="{escape(link)}" target="_blank" rel="noopener noreferrer sponsored" '
+                f'class="inline-flex items-center justify-center rounded-md text-sm font-medium">'
+                f'Buy on {label} ₹{price:,.0f}</a>'
+            )
+    if links:
+        parts.append(f'<div class="flex flex-wrap gap-3">{"".join(links)}</div>')
+
+    parts.append("</div></div></div>")
+    return "".join(parts)
+
+
+def render_main(article, products):
+    meta = [f"<span>By {escape(article.get('author') or 'Our Team')}</span>"]
+    if article.get("created_at"):
+        meta.append(f"<span>{escape(article['created_at'][:10])}</span>")
+    tags = "".join(
+        f'<div class="inline-flex items-center rounded-full border px-2.5 py-0.5 font-semibold text-sm">{escape(t)}</div>'
+        for t in article.get("tags") or []
+    )
+    cards = "".join(render_product_card(entry) for entry in products)
+
+    return (
+        '<main class="flex-1 py-12">'
+        '<div class="container mx-auto px-4 grid grid-cols-12 gap-8">'
+        '<div class="col-span-12 md:col-span-8 space-y-8">'
+        '<header class="bg-gradient-to-r from-primary to-primary/80 text-primary-foreground p-6 rounded-lg shadow-md">'
+        f'<h1 class="text-3xl md:text-4xl font-bold mb-2">{escape(article["title"])}</h1>'
+        f'<div class="flex flex-wrap gap-4 text-sm">{"".join(meta)}</div>'
+        f'<p class="mt-4 text-white/90">{escape(article.get("excerpt") or "")}</p>'
+        f'<div class="flex flex-wrap gap-2">{tags}</div>'
+        '</header>'
+        '<h2 class="text-3xl font-bold">Overall Summary</h2>'
+        f'<div class="prose prose-orange max-w-none">{article.get("content") or ""}</div>'
+        '<section class="space-y-8">'
+        '<h2 class="text-3xl font-bold">Detailed Reviews</h2>'
+        f'{cards}'
+        '</section>'
+        '</div></div></main>'
+    )
+
+
+def render_article(template, bundle, slug):
+    """Returns the full static HTML for one article bundle."""
+    article = bundle["article"]
+    products = bundle["products"]
+    canonical = f"{SITE_URL}/articles/{slug}"
+
+    head = render_head(article, products, canonical)
+    body = (
+        '<div id="root"><div class="min-h-screen bg-background flex flex-col">'
+        f'{render_main(article, products)}'
+        '</div></div>'
+    )
+    html = template.replace("</head>", f"    {head}\n  </head>", 1)
+    return ROOT_PATTERN.sub(lambda _: body, html, count=1)
@@ -0,0 +1,547 @@
+"""
+Delta change notification over IndexNow (https://www.indexnow.org).
+
+Every public page (public/articles/*.html, public/product/*.html) has a row in
+.build/indexnow.sqlite with the hash of its rendered bytes and the time that
+hash last changed:
+
+  scan()     re-hashes only the files whose size or mtime moved; a page whose
+             hash differs (or that appeared or disappeared) gets a new
+             changed_at and becomes pending
+  lastmods() changed_at per URL, so sitemap lastmod is the day the content
+             actually changed rather than the day it was last re-rendered
+  submit()   POSTs the pending URLs in batches of up to 10,000 and marks each
+             one submitted for the exact hash it was sent with
+
+A page is pending while submitted_hash differs from content_hash, so a failed
+or interrupted run (429, timeout, crash) just leaves its URLs pending for the
+next one, and a URL already submitted is never sent again until its content
+changes. The very first scan adopts every page as already submitted, dated
+by the article's JSON-LD dateModified (via article_index.py) or else the
+last git commit that touched the file, so adoption doesn't move every
+sitemap lastmod to the day of the first scan.
+
+Run it after the deploy is live, so crawlers fetch the new content:
+
+Usage: python scripts/indexnow.py [--dry-run] [--scan-only] [--status] [--stub [N]]
+
+`--stub N` runs scan and submit over N synthetic pages in a temp dir against
+a local IndexNow stub that answers one batch with 429, and checks adoption
+dates, change detection, the retry and that nothing is sent twice.
+
+INDEXNOW_ENDPOINT overrides the endpoint (e.g. a local stub), INDEXNOW_KEY the
+key; without one a key is generated once and written to public/<key>.txt,
+which must be deployed for the key to verify.
+"""
+import os
+import re
+import sys
+import json
+import shutil
+import secrets
+import sqlite3
+import hashlib
+import argparse
+import threading
+import tempfile
+import subprocess
+from datetime import datetime, timezone
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import requests
+
+import article_index
+import metrics
+import supabase_client
+from sitemap_writer import PUBLIC_DIR, SITE_URL
+
+PROJECT_ROOT = os.path.abspath(os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+STATE_PATH = os.path.join(PROJECT_ROOT, ".build", "indexnow.sqlite")
+
+ENDPOINT = os.environ.get("INDEXNOW_ENDPOINT", "https://api.indexnow.org/indexnow")
+# The protocol's maximum URLs per request
+BATCH_SIZE = int(os.environ.get("INDEXNOW_BATCH_SIZE", 10000))
+KEY_PATTERN = re.compile(r"^[A-Za-z0-9-]{8,128}$")
+# 202: accepted, key validation pending
+ACCEPTED = (200, 202)
+
+# (directory, URL prefix) of every page tracked
+PAGE_DIRS = (
+    (os.path.join(PUBLIC_DIR, "articles"), f"{SITE_URL}/articles/"),
+    (os.path.join(PUBLIC_DIR, "product"), f"{SITE_URL}/product/"),
+)
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS urls (
+    loc TEXT PRIMARY KEY,
+    bytes INTEGER,
+    mtime_ns INTEGER,
+    content_hash TEXT,
+    changed_at TEXT NOT NULL,
+    submitted_hash TEXT,
+    submitted_at TEXT,
+    attempts INTEGER NOT NULL DEFAULT 0,
+    last_error TEXT
+);
+CREATE TABLE IF NOT EXISTS meta (
+    key TEXT PRIMARY KEY,
+    value TEXT NOT NULL
+);
+"""
+
+PENDING = "content_hash IS NOT submitted_hash"
+
+
+def now():
+    return datetime.now(timezone.utc).isoformat(timespec="seconds")
+
+
+def file_hash(path):
+    with open(path, "rb") as f:
+        return hashlib.sha256(f.read()).hexdigest()
+
+
+def page_files():
+    """{loc: path} for every page on disk."""
+    files = {}
+    for directory, prefix in PAGE_DIRS:
+        if not os.path.isdir(directory):
+            continue
+        for filename in os.listdir(directory):
+            if filename.endswith(".html"):
+                files[prefix + filename[:-5]] = os.path.join(directory, filename)
+    return files
+
+
+def to_utc(value):
+    """ISO-8601 date or timestamp → UTC timestamp like now(); None if unparseable."""
+    if not value:
+        return None
+    try:
+        parsed = datetime.fromisoformat(value.replace("Z", "+00:00"))
+    except ValueError:
+        return None
+    if parsed.tzinfo is None:
+        parsed = parsed.replace(tzinfo=timezone.utc)
+    return parsed.astimezone(timezone.utc).isoformat(timespec="seconds")
+
+
+def commit_dates():
+    """{absolute path: committer date} of the last commit touching each tracked page."""
+    try:
+        log = subprocess.run(
+            ["git", "log", "--format=%x00%cI", "--name-only", "--relative", "--",
+             *(directory for directory, _ in PAGE_DIRS)],
+            cwd=PROJECT_ROOT, capture_output=True, text=True, check=True,
+        ).stdout
+    except (OSError, subprocess.CalledProcessError):
+        return {}
+    dates = {}
+    date = None
+    for line in log.splitlines():
+        if line.startswith("\0"):
+            date = line[1:]
+        elif line and date:
+            dates.setdefault(os.path.join(PROJECT_ROOT, line), date)
+    return dates
+
+
+def seed_dates(files):
+    """
+    changed_at for the pages adopted by the first scan: an article's
+    dateModified, else its last commit date. Pages with neither are left
+    out (the caller falls back to their mtime).
+    """
+    index = article_index.default_index()
+    index.sync(article_index.ARTICLES_DIR)
+    modified = dict(index.query("SELECT slug, date_modified FROM pages WHERE date_modified IS NOT NULL"))
+    committed = commit_dates()
+    dates = {}
+    for loc, path in files.items():
+        slug = os.path.basename(path)[:-5]
+        seed = to_utc(modified.get(slug)) if article_index.is_article_path(path) else None
+        seed = seed or to_utc(committed.get(os.path.abspath(path)))
+        if seed:
+            dates[loc] = seed
+    return dates
+
+
+def loc_for(path):
+    path = os.path.abspath(path)
+    for directory, prefix in PAGE_DIRS:
+        if os.path.dirname(path) == directory and path.endswith(".html"):
+            return prefix + os.path.basename(path)[:-5]
+    return None
+
+
+class ChangeLog:
+    """Content hashes and submission state per URL. Safe to share between threads."""
+
+    def __init__(self, path=STATE_PATH):
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        self.conn = sqlite3.connect(path, check_same_thread=False, timeout=30)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        self.conn.executescript(SCHEMA)
+        self.lock = threading.Lock()
+
+    def query(self, sql, params=()):
+        with self.lock:
+            return self.conn.execute(sql, params).fetchall()
+
+    def executemany(self, sql, rows):
+        with self.lock:
+            self.conn.executemany(sql, rows)
+            self.conn.commit()
+
+    def meta(self, key):
+        rows = self.query("SELECT value FROM meta WHERE key = ?", (key,))
+        return rows[0][0] if rows else None
+
+    def set_meta(self, key, value):
+        self.executemany("INSERT OR REPLACE INTO meta VALUES (?, ?)", [(key, value)])
+
+    # --- Changes ---
+
+    def scan(self, paths=None):
+        """
+        Re-hashes the pages whose size or mtime changed (only `paths`, if
+        given; otherwise every page, and pages gone from disk count as
+        changed). Returns the URLs whose content changed.
+        """
+        files = page_files() if paths is None else {loc_for(p): p for p in paths if loc_for(p)}
+        known = {loc: (size, mtime, digest) for loc, size, mtime, digest
+                 in self.query("SELECT loc, bytes, mtime_ns, content_hash FROM urls")}
+        adopting = not known and paths is None
+        seeds = seed_dates(files) if adopting else {}
+        stamp = now()
+
+        changed = []
+        touched = []
+        adopted = []
+        for loc, path in files.items():
+            try:
+                stat = os.stat(path)
+            except FileNotFoundError:
+                stat = None
+            row = known.get(loc)
+            if stat is None:
+                if row and row[2] is not None:
+                    changed.append((loc, None, None, None))
+                continue
+            if row and row[:2] == (stat.st_size, stat.st_mtime_ns):
+                continue
+            digest = file_hash(path)
+            if adopting:
+                changed_at = seeds.get(loc) or datetime.fromtimestamp(
+                    stat.st_mtime, tz=timezone.utc).isoformat(timespec="seconds")
+                adopted.append((loc, stat.st_size, stat.st_mtime_ns, digest, changed_at, digest))
+            elif row and row[2] == digest:
+                touched.append((stat.st_size, stat.st_mtime_ns, loc))
+            else:
+                changed.append((loc, stat.st_size, stat.st_mtime_ns, digest))
+        if paths is None:
+            changed += [(loc, None, None, None) for loc, row in known.items()
+                        if loc not in files and row[2] is not None]
+
+        self.executemany(
+            "INSERT INTO urls (loc, bytes, mtime_ns, content_hash, changed_at, submitted_hash) "
+            "VALUES (?, ?, ?, ?, ?, ?)",
+            adopted,
+        )
+        self.executemany("UPDATE urls SET bytes = ?, mtime_ns = ? WHERE loc = ?", touched)
+        self.executemany(
+            "INSERT INTO urls (loc, bytes, mtime_ns, content_hash, changed_at) VALUES (?, ?, ?, ?, ?) "
+            "ON CONFLICT(loc) DO UPDATE SET bytes = excluded.bytes, mtime_ns = excluded.mtime_ns, "
+            "content_hash = excluded.content_hash, changed_at = excluded.changed_at",
+            [row + (stamp,) for row in changed],
+        )
+        return sorted(loc for loc, *_ in changed)
+
+    def lastmods(self):
+        """{loc: YYYY-MM-DD} of the last content change of every page on disk."""
+        rows = self.query("SELECT loc, changed_at FROM urls WHERE content_hash IS NOT NULL")
+        return {loc: changed_at[:10] for loc, changed_at in rows}
+
+    # --- Submission ---
+
+    def pending(self):
+        """[(loc, content_hash)] not yet submitted at their current hash."""
+        return self.query(f"SELECT loc, content_hash FROM urls WHERE {PENDING} ORDER BY changed_at, loc")
+
+    def submitted(self, batch):
+        """Marks each URL submitted at the hash it was sent with (a page changed since stays pending)."""
+        stamp = now()
+        self.executemany(
+            "UPDATE urls SET submitted_hash = ?, submitted_at = ?, attempts = 0, last_error = NULL "
+            "WHERE loc = ? AND content_hash IS ?",
+            [(digest, stamp, loc, digest) for loc, digest in batch],
+        )
+
+    def failed(self, batch, reason):
+        self.executemany(
+            "UPDATE urls SET attempts = attempts + 1, last_error = ? WHERE loc = ?",
+            [(str(reason)[:500], loc) for loc, _ in batch],
+        )
+
+    def counts(self):
+        (total, pending, failing), = self.query(
+            f"SELECT COUNT(*), COALESCE(SUM({PENDING}), 0), COALESCE(SUM(last_error IS NOT NULL), 0) FROM urls"
+        )
+        return {"total": total, "pending": pending, "failing": failing}
+
+    def close(self):
+        with self.lock:
+            self.conn.close()
+
+
+_log = None
+_log_lock = threading.Lock()
+
+
+def default_log():
+    """The process-wide ChangeLog on STATE_PATH, opened on first use."""
+    global _log
+    with _log_lock:
+        if _log is None:
+            _log = ChangeLog()
+        return _log
+
+
+def scan(paths=None):
+    return default_log().scan(paths)
+
+
+def lastmods(paths=None):
+    """Scans (all pages, or just `paths`) and returns {loc: YYYY-MM-DD} for sitemap lastmod."""
+    scan(paths)
+    return default_log().lastmods()
+
+
+# --- IndexNow ---
+
+def ensure_key(log):
+    """INDEXNOW_KEY, else the key generated on the first run; keeps public/<key>.txt in place."""
+    key = os.environ.get("INDEXNOW_KEY") or log.meta("key")
+    if not key:
+        key = secrets.token_hex(16)
+        log.set_meta("key", key)
+        print(f"🔑 Generated IndexNow key {key}")
+    if not KEY_PATTERN.match(key):
+        raise ValueError(f"IndexNow key must be 8-128 characters of a-z, A-Z, 0-9 or '-': {key!r}")
+    path = os.path.join(PUBLIC_DIR, f"{key}.txt")
+    if not os.path.exists(path):
+        with open(path, "w", encoding="utf-8") as f:
+            f.write(key)
+        print(f"🔑 Wrote {os.path.relpath(path, PROJECT_ROOT)} (deploy it before submitting)")
+    return key
+
+
+def post_batch(urls, key, endpoint=ENDPOINT):
+    payload = {
+        "host": SITE_URL.split("://", 1)[1],
+        "key": key,
+        "keyLocation": f"{SITE_URL}/{key}.txt",
+        "urlList": urls,
+    }
+    return supabase_client.get_session().post(
+        endpoint, json=payload, headers={"Content-Type": "application/json; charset=utf-8"},
+        timeout=supabase_client.REQUEST_TIMEOUT,
+    )
+
+
+def submit(log=None, endpoint=ENDPOINT, batch_size=BATCH_SIZE, dry_run=False):
+    """
+    Sends every pending URL. Stops at the first rejected batch (the rest would
+    fail the same way, and 429 asks us to back off); its URLs stay pending.
+    Returns the number of URLs accepted.
+    """
+    log = log or default_log()
+    pending = log.pending()
+    if not pending:
+        print("✨ IndexNow: nothing changed since the last submission.")
+        return 0
+    if dry_run:
+        print(f"🔎 IndexNow: {len(pending)} URL(s) would be submitted:")
+        for loc, _ in pending[:20]:
+            print(f"   • {loc}")
+        if len(pending) > 20:
+            print(f"   … and {len(pending) - 20} more")
+        return 0
+
+    key = ensure_key(log)
+    sent = 0
+    for start in range(0, len(pending), batch_size):
+        batch = pending[start:start + batch_size]
+        try:
+            response = post_batch([loc for loc, _ in batch], key, endpoint)
+        except requests.RequestException as e:
+            reason = f"{type(e).__name__}: {e}"
+        else:
+            if response.status_code in ACCEPTED:
+                log.submitted(batch)
+                sent += len(batch)
+                metrics.incr("indexnow_urls_submitted", len(batch))
+                print(f"📣 IndexNow: {len(batch)} URL(s) accepted (HTTP {response.status_code})")
+                continue
+            reason = f"HTTP {response.status_code}: {response.text[:200]}"
+        log.failed(batch, reason)
+        metrics.incr("indexnow_failures", cause=reason.split(":", 1)[0])
+        remaining = len(pending) - start
+        print(f"❌ IndexNow: batch rejected ({reason}); {remaining} URL(s) left pending for the next run")
+        break
+    return sent
+
+
+# --- Local stub ---
+
+STUB_DATE_MODIFIED = "2025-03-04T05:06:07Z"
+STUB_MTIME = datetime(2025, 1, 1, tzinfo=timezone.utc).timestamp()
+
+
+def stub_page(i, kind, revision=0):
+    if kind == "articles":
+        ld = {"@context": "https://schema.org", "@type": "Article", "headline": f"Guide {i}",
+              "dateModified": STUB_DATE_MODIFIED}
+        head = f'<title>Guide {i}</title><script type="application/ld+json">{json.dumps(ld)}</script>'
+    else:
+        head = f"<title>Product {i}</title>"
+    return f"<html><head>{head}</head><body>{kind} {i} r{revision}</body></html>"
+
+
+def make_stub_handler(received, faults):
+    class StubHandler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+
+        def log_message(self, format, *args):
+            pass
+
+        def do_POST(self):
+            body = json.loads(self.rfile.read(int(self.headers.get("Content-Length") or 0)))
+            status = faults.pop(0) if faults else 200
+            if status in ACCEPTED:
+                received.extend(body["urlList"])
+            self.send_response(status)
+            self.send_header("Content-Length", "0")
+            self.end_headers()
+
+    return StubHandler
+
+
+def run_stub(page_count=200):
+    """Scans and submits synthetic pages against a local IndexNow stub. Returns 0 if all checks pass."""
+    global PAGE_DIRS, PUBLIC_DIR
+    received, faults = [], []
+    server = ThreadingHTTPServer(("127.0.0.1", 0), make_stub_handler(received, faults))
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, name="stub-server", daemon=True).start()
+    endpoint = f"http://127.0.0.1:{server.server_address[1]}/indexnow"
+    print(f"🧪 Stub server at {endpoint} ({page_count:,} pages)\n")
+
+    # Pages, state, key file and article index all live in a temp dir
+    workdir = tempfile.mkdtemp(prefix="apnilist-indexnow-")
+    PUBLIC_DIR = workdir
+    PAGE_DIRS = tuple((os.path.join(workdir, kind), f"{SITE_URL}/{prefix}/")
+                      for kind, prefix in (("articles", "articles"), ("product", "product")))
+    article_index.ARTICLES_DIR = PAGE_DIRS[0][0]
+    article_index._index = article_index.ArticleIndex(os.path.join(workdir, "article_index.sqlite"))
+    paths = {}
+    for directory, _ in PAGE_DIRS:
+        os.makedirs(directory)
+        kind = os.path.basename(directory)
+        for i in range(page_count // 2):
+            path = os.path.join(directory, f"{kind}-{i}.html")
+            with open(path, "w", encoding="utf-8") as f:
+                f.write(stub_page(i, kind))
+            os.utime(path, (STUB_MTIME, STUB_MTIME))
+            paths[path] = (kind, i)
+    log = ChangeLog(os.path.join(workdir, "indexnow.sqlite"))
+    results = []
+
+    def check(name, ok, detail):
+        results.append(ok)
+        print(f"{'✅' if ok else '❌'} {name}: {detail}")
+
+    # First scan: everything adopted, dated by dateModified (articles) or mtime (products)
+    log.scan()
+    dates = dict(log.query("SELECT loc, changed_at FROM urls"))
+    articles = [d for loc, d in dates.items() if "/articles/" in loc]
+    products = [d for loc, d in dates.items() if "/product/" in loc]
+    check("adopt", not log.pending() and set(articles) == {to_utc(STUB_DATE_MODIFIED)}
+          and set(products) == {to_utc(datetime.fromtimestamp(STUB_MTIME, tz=timezone.utc).isoformat())},
+          f"{len(dates)} pages adopted, none pending, articles dated by dateModified")
+
+    # Three pages edited, two re-written with identical bytes, one deleted
+    edited, rewritten, deleted = list(paths)[:3], list(paths)[3:5], list(paths)[-1]
+    for path in edited + rewritten:
+        kind, i = paths[path]
+        with open(path, "w", encoding="utf-8") as f:
+            f.write(stub_page(i, kind, revision=1 if path in edited else 0))
+    os.remove(deleted)
+    changed = log.scan()
+    expected = sorted(loc_for(path) for path in edited + [deleted])
+    check("scan", changed == expected, f"{len(changed)} changed (3 edited, 1 deleted; 2 rewritten unchanged)")
+
+    # Second batch answered with 429: the first is marked submitted, the rest stay pending
+    faults.append(200)
+    faults.append(429)
+    sent = submit(log, endpoint=endpoint, batch_size=2)
+    counts = log.counts()
+    check("429", sent == 2 and counts["pending"] == 2 and counts["failing"] == 2,
+          f"{sent} accepted, {counts['pending']} left pending")
+
+    sent = submit(log, endpoint=endpoint, batch_size=2)
+    sent_again = submit(log, endpoint=endpoint, batch_size=2)
+    check("retry", sent == 2 and sent_again == 0 and sorted(received) == expected
+          and len(received) == len(set(received)),
+          f"{len(received)} URLs received in total, none twice")
+
+    server.shutdown()
+    log.close()
+    article_index._index.close()
+    shutil.rmtree(workdir, ignore_errors=True)
+    print(f"\n🧪 {'all checks passed' if all(results) else 'FAILED'}")
+    return 0 if all(results) else 1
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Submit the pages whose content changed to IndexNow.")
+    parser.add_argument("--dry-run", action="store_true", help="Scan and list the pending URLs without submitting")
+    parser.add_argument("--scan-only", action="store_true", help="Record content changes without submitting")
+    parser.add_argument("--status", action="store_true", help="Print the submission state and exit")
+    parser.add_argument("--stub", type=int, nargs="?", const=200, metavar="N",
+                        help="Exercise scan/submit over N synthetic pages against a local stub")
+    return parser.parse_args()
+
+
+def main():
+    args = parse_args()
+    if args.stub:
+        sys.exit(run_stub(args.stub))
+    log = default_log()
+    if args.status:
+        counts = log.counts()
+        print(f"📊 {counts['total']} URL(s) tracked, {counts['pending']} pending, {counts['failing']} failing")
+        for loc, attempts, error in log.query(
+                "SELECT loc, attempts, last_error FROM urls WHERE last_error IS NOT NULL ORDER BY loc LIMIT 20"):
+            print(f"   • {loc}: {error} (attempt {attempts})")
+        return
+
+    metrics.start("indexnow")
+    status = "error"
+    try:
+        with metrics.phase("scan"):
+            changed = log.scan()
+        print(f"🔍 {len(changed)} page(s) changed since the last scan")
+        if not args.scan_only:
+            with metrics.phase("submit"):
+                submit(log, dry_run=args.dry_run)
+        status = "ok" if not log.counts()["failing"] else "partial"
+    finally:
+        metrics.finish(status)
+    if status == "partial":
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
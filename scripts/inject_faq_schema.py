@@ -1,16 +1,40 @@
 """
 Phase 4: Injects FAQPage JSON-LD schema into existing clean-URL static article files.
-Generates 4-5 questions per article from embedded Product schema data.
+Generates 4-5 questions per article from embedded Product schema data, using
+current prices and lows from price_analytics.py when its cache is available.
+A FAQPage this script (or the HTTP renderer) wrote earlier is regenerated
+and replaced when its answers change; one from the SPA is left alone.
+
+Usage: python scripts/inject_faq_schema.py [--profile]
 """
 import os
 import re
 import json
+import argparse
+
+import metrics
+import precompress
+import price_analytics
+from html_utils import parse_ld_json, ld_json_schemas
 
 ARTICLES_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "public", "articles")
 BASE_URL = "https://www.apnilist.co.in"
 
-def extract_article_data(html):
-    """Extract title, description, and product list from embedded JSON-LD."""
+# A current price that is the lowest in at least this many days counts as a deal
+GOOD_DEAL_DAYS = 30
+
+# A FAQPage block as json.dumps writes build_faq_schema()'s output. The SPA's
+# own FAQPage is compact JSON.stringify output and never matches.
+GENERATED_FAQ_PATTERN = re.compile(
+    r'<script type="application/ld\+json">(\{"@context": "https://schema\.org", "@type": "FAQPage".*?)</script>',
+    re.DOTALL,
+)
+
+def extract_article_data(html, ld_blocks=None):
+    """
+    Extract title, description, and product list from embedded JSON-LD.
+    Pass already-parsed `ld_blocks` to avoid re-scanning the page.
+    """
     title = ""
     description = ""
     products = []
@@ -20,13 +44,9 @@ def extract_article_data(html):
         raw = title_match.group(1)
         title = re.sub(r'\s*\|\s*ApniList\s*$', '', raw).strip()
 
-    ld_blocks = re.findall(r'<script type="application/ld\+json">(.*?)</script>', html, re.DOTALL)
-    for block in ld_blocks:
-        try:
-            data = json.loads(block)
-        except json.JSONDecodeError:
-            continue
-
+    if ld_blocks is None:
+        ld_blocks = parse_ld_json(html)
+    for data in ld_json_schemas(ld_blocks):
         if data.get("@type") == "Article":
             description = data.get("description", "")
 
@@ -35,13 +55,16 @@ def extract_article_data(html):
                 product = item.get("item", {})
                 if product.get("@type") == "Product":
                     price = 0
+                    url = None
                     offers = product.get("offers", {})
                     if isinstance(offers, dict):
                         price = offers.get("price", 0)
+                        url = offers.get("url")
                     products.append({
                         "name": product.get("name", ""),
                         "description": product.get("description", ""),
                         "price": price,
+                        "url": url,
                     })
 
     return title, description, products
@@ -52,7 +75,26 @@ def clean_topic(title):
     return re.sub(r'^Top\s+\d+\s+', '', title, flags=re.IGNORECASE).strip()
 
 
+def current_price(product):
+    """Tracked current price from the product's rollup, else the page's frozen price."""
+    rollup = product.get("rollup")
+    if rollup and rollup.get("current"):
+        return rollup["current"]
+    return product.get("price", 0) or 0
+
+
+def deal_phrase(rollup):
+    if rollup["all_time_low"]:
+        return "lowest price ever tracked"
+    return f"lowest price in {rollup['lowest_in_days']} days"
+
+
 def build_faq_schema(title, description, products):
+    """
+    `products` are {name, description, price} dicts, optionally with a
+    "rollup" from price_analytics — which adds current prices, the lowest
+    tracked price and a "good time to buy" question.
+    """
     topic = clean_topic(title)
     questions = []
 
@@ -68,16 +110,20 @@ def build_faq_schema(title, description, products):
         "acceptedAnswer": {"@type": "Answer", "text": answer1.strip()},
     })
 
-    # Q2: Price range
-    prices = [p["price"] for p in products if p.get("price", 0) > 0]
+    # Q2: Price range (current tracked prices where we have them)
+    rollups = [(p["name"], p["rollup"]) for p in products if p.get("rollup")]
+    prices = [current_price(p) for p in products if current_price(p) > 0]
     if prices:
         lo = min(prices)
         hi = max(prices)
         answer2 = (
             f"Prices for {topic} in India range from "
             f"₹{lo:,.0f} to ₹{hi:,.0f} on Amazon and Flipkart. "
-            f"Use ApniList to track price drops and set alerts to get the best deal."
         )
+        if rollups:
+            name, low = min(rollups, key=lambda r: r[1]["min"])
+            answer2 += f"The lowest price we have tracked is ₹{low['min']:,.0f} for {name}. "
+        answer2 += "Use ApniList to track price drops and set alerts to get the best deal."
     else:
         answer2 = f"Prices for {topic} vary by model and brand. Check Amazon and Flipkart for current pricing, and use ApniList to track price drops."
     questions.append({
@@ -112,6 +158,25 @@ def build_faq_schema(title, description, products):
         },
     })
 
+    # Q5: Timing, from the price-history rollups
+    if rollups:
+        deals = sorted(
+            (r for r in rollups if r[1]["lowest_in_days"] >= GOOD_DEAL_DAYS or r[1]["all_time_low"]),
+            key=lambda r: -r[1]["lowest_in_days"],
+        )
+        if deals:
+            answer5 = " ".join(f"{name} is at its {deal_phrase(r)} (₹{r['current']:,.0f})." for name, r in deals[:3])
+        else:
+            answer5 = (
+                f"None of our {topic} picks are near their lowest tracked prices right now. "
+                f"Set a price alert on ApniList to be notified when they drop."
+            )
+        questions.append({
+            "@type": "Question",
+            "name": f"Is now a good time to buy a {topic}?",
+            "acceptedAnswer": {"@type": "Answer", "text": answer5},
+        })
+
     return {
         "@context": "https://schema.org",
         "@type": "FAQPage",
@@ -119,44 +184,89 @@ def build_faq_schema(title, description, products):
     }
 
 
-def inject_faq(path):
-    with open(path, "r", encoding="utf-8") as f:
-        html = f.read()
+def has_faq_schema(html):
+    return '"@type":"FAQPage"' in html or '"@type": "FAQPage"' in html
+
 
-    if '"@type":"FAQPage"' in html or '"@type": "FAQPage"' in html:
-        return "already has FAQ schema — skipped"
+def inject_faq_html(html, ld_blocks=None):
+    """
+    Returns (html, schema, message). `schema` is None when nothing was
+    injected or refreshed.
+    """
+    generated = GENERATED_FAQ_PATTERN.search(html)
+    if generated is None and has_faq_schema(html):
+        return html, None, "already has FAQ schema — skipped"
 
-    title, description, products = extract_article_data(html)
+    title, description, products = extract_article_data(html, ld_blocks)
     if not title:
-        return "could not extract title — skipped"
+        return html, None, "could not extract title — skipped"
+    for product in products:
+        product["rollup"] = price_analytics.rollup_for(name=product["name"], url=product["url"])
 
     schema = build_faq_schema(title, description, products)
-    script_tag = f'\n<script type="application/ld+json">{json.dumps(schema, ensure_ascii=False)}</script>'
+    block = json.dumps(schema, ensure_ascii=False)
+
+    if generated is not None:
+        if generated.group(1) == block:
+            return html, None, "FAQ schema up to date — skipped"
+        html = html[:generated.start(1)] + block + html[generated.end(1):]
+        return html, schema, f"refreshed FAQ with {len(schema['mainEntity'])} questions"
 
     # Inject before </head>
     if "</head>" not in html:
-        return "no </head> tag found — skipped"
+        return html, None, "no </head> tag found — skipped"
 
+    script_tag = f'\n<script type="application/ld+json">{block}</script>'
     html = html.replace("</head>", f"{script_tag}\n</head>", 1)
+    return html, schema, f"injected FAQ with {len(schema['mainEntity'])} questions"
+
+
+def inject_faq(path):
+    with open(path, "r", encoding="utf-8") as f:
+        html = f.read()
+
+    html, schema, message = inject_faq_html(html)
+    if schema is None:
+        return message
 
     with open(path, "w", encoding="utf-8") as f:
         f.write(html)
 
-    return f"injected FAQ with {len(schema['mainEntity'])} questions"
+    return message
 
 
 def main():
-    # Only process clean-URL files (best-*)
-    files = sorted(
-        f for f in os.listdir(ARTICLES_DIR)
-        if f.startswith("best-") and f.endswith(".html")
-    )
-    print(f"Injecting FAQ schema into {len(files)} clean-URL article files...\n")
-    for filename in files:
-        result = inject_faq(os.path.join(ARTICLES_DIR, filename))
-        icon = "✅" if result.startswith("injected") else "ℹ"
-        print(f"   {icon} {filename[:-5]}: {result}")
-    print("\nDone.")
+    parser = argparse.ArgumentParser(description="Inject FAQPage JSON-LD into clean-URL articles")
+    parser.add_argument("--profile", action="store_true", help="cProfile the run into .build/metrics/")
+    args = parser.parse_args()
+
+    metrics.start("inject_faq_schema", profile=args.profile)
+    status = "error"
+    try:
+        # Only process clean-URL files (best-*)
+        files = sorted(
+            f for f in os.listdir(ARTICLES_DIR)
+            if f.startswith("best-") and f.endswith(".html")
+        )
+        print(f"Injecting FAQ schema into {len(files)} clean-URL article files...\n")
+        changed_paths = []
+        with metrics.phase("inject"):
+            for filename in files:
+                path = os.path.join(ARTICLES_DIR, filename)
+                result = inject_faq(path)
+                changed = result.startswith(("injected", "refreshed"))
+                if changed:
+                    changed_paths.append(path)
+                icon = "✅" if changed else "ℹ"
+                print(f"   {icon} {filename[:-5]}: {result}")
+        metrics.incr("files_updated", len(changed_paths))
+        if changed_paths:
+            with metrics.phase("precompress"):
+                precompress.precompress(changed_paths)
+        print("\nDone.")
+        status = "ok"
+    finally:
+        metrics.finish(status)
 
 
 if __name__ == "__main__":
@@ -0,0 +1,218 @@
+"""
+Persistent job ledger and run lock for generate_html.py.
+
+Every slug a run picks up is tracked in .build/jobs.sqlite through
+
+  queued → rendering → written → marked
+                     ↘ failed   (with the reason and attempt count)
+
+and each transition is committed as it happens, so a crashed or killed run
+leaves an exact checkpoint:
+
+  - `--resume` renders only the slugs left queued/rendering, without
+    re-querying Supabase or re-planning against the build manifest
+  - `--retry-failed` re-renders only the failed ones
+  - pages that were written but whose PATCH never landed are marked
+    processed at the start of the next run instead of being forgotten
+
+The run lock (.build/generate.lock) is an OS-level file lock, so two
+overlapping runs cannot fight over the same slugs, and a killed run never
+leaves a stale lock behind.
+"""
+import os
+import sqlite3
+import threading
+from datetime import datetime, timezone
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+    import msvcrt
+
+PROJECT_ROOT = os.path.abspath(os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+LEDGER_PATH = os.path.join(PROJECT_ROOT, ".build", "jobs.sqlite")
+LOCK_PATH = os.path.join(PROJECT_ROOT, ".build", "generate.lock")
+
+QUEUED = "queued"
+RENDERING = "rendering"
+WRITTEN = "written"
+MARKED = "marked"
+FAILED = "failed"
+STATES = (QUEUED, RENDERING, WRITTEN, MARKED, FAILED)
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS runs (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    pid INTEGER NOT NULL,
+    mode TEXT NOT NULL,
+    renderer TEXT NOT NULL,
+    status TEXT NOT NULL,
+    started_at TEXT NOT NULL,
+    finished_at TEXT
+);
+CREATE TABLE IF NOT EXISTS jobs (
+    slug TEXT PRIMARY KEY,
+    state TEXT NOT NULL,
+    run_id INTEGER,
+    attempts INTEGER NOT NULL DEFAULT 0,
+    error TEXT,
+    input_hash TEXT,
+    updated_at TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS jobs_state ON jobs (state);
+"""
+
+
+def now():
+    return datetime.now(timezone.utc).isoformat(timespec="seconds")
+
+
+class RunLocked(RuntimeError):
+    """Another generation run holds the lock."""
+
+
+class RunLock:
+    """Exclusive, non-blocking lock on LOCK_PATH; released when the process exits."""
+
+    def __init__(self, path=LOCK_PATH):
+        self.path = path
+        self.file = None
+
+    def acquire(self):
+        os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        f = open(self.path, "a+")
+        try:
+            if fcntl:
+                fcntl.flock(f.fileno(), fcntl.LOCK_EX | fcntl.LOCK_NB)
+            else:
+                f.seek(0)
+                msvcrt.locking(f.fileno(), msvcrt.LK_NBLCK, 1)
+        except OSError:
+            f.seek(0)
+            holder = f.read().strip() or "unknown"
+            f.close()
+            raise RunLocked(f"Another generation run (pid {holder}) is in progress ({self.path})")
+        f.seek(0)
+        f.truncate()
+        f.write(str(os.getpid()))
+        f.flush()
+        self.file = f
+        return self
+
+    def release(self):
+        if self.file is None:
+            return
+        if fcntl:
+            fcntl.flock(self.file.fileno(), fcntl.LOCK_UN)
+        else:
+            self.file.seek(0)
+            msvcrt.locking(self.file.fileno(), msvcrt.LK_UNLCK, 1)
+        self.file.close()
+        self.file = None
+
+    def __enter__(self):
+        return self.acquire()
+
+    def __exit__(self, *exc):
+        self.release()
+
+
+class JobLedger:
+    """Per-slug job states for generation runs. Safe to share between render threads."""
+
+    def __init__(self, path=LEDGER_PATH):
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        self.conn = sqlite3.connect(path, check_same_thread=False)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        self.conn.executescript(SCHEMA)
+        self.lock = threading.Lock()
+        self.run_id = None
+
+    def execute(self, sql, params=()):
+        with self.lock:
+            self.conn.execute(sql, params)
+            self.conn.commit()
+
+    def executemany(self, sql, rows):
+        with self.lock:
+            self.conn.executemany(sql, rows)
+            self.conn.commit()
+
+    def query(self, sql, params=()):
+        with self.lock:
+            return self.conn.execute(sql, params).fetchall()
+
+    # --- Runs ---
+
+    def start_run(self, mode, renderer):
+        with self.lock:
+            cursor = self.conn.execute(
+                "INSERT INTO runs (pid, mode, renderer, status, started_at) VALUES (?, ?, ?, 'running', ?)",
+                (os.getpid(), mode, renderer, now()),
+            )
+            self.conn.commit()
+            self.run_id = cursor.lastrowid
+        return self.run_id
+
+    def finish_run(self, status):
+        self.execute("UPDATE runs SET status = ?, finished_at = ? WHERE id = ?", (status, now(), self.run_id))
+
+    # --- Jobs ---
+
+    def queue(self, slugs, input_hashes=None):
+        """Queues slugs for this run, keeping their attempt counts."""
+        input_hashes = input_hashes or {}
+        self.executemany(
+            "INSERT INTO jobs (slug, state, run_id, input_hash, updated_at) VALUES (?, ?, ?, ?, ?) "
+            "ON CONFLICT(slug) DO UPDATE SET state = excluded.state, run_id = excluded.run_id, "
+            "input_hash = COALESCE(excluded.input_hash, jobs.input_hash), error = NULL, "
+            "updated_at = excluded.updated_at",
+            [(slug, QUEUED, self.run_id, input_hashes.get(slug), now()) for slug in slugs],
+        )
+
+    def started(self, slug):
+        self.execute(
+            "UPDATE jobs SET state = ?, run_id = ?, attempts = attempts + 1, updated_at = ? WHERE slug = ?",
+            (RENDERING, self.run_id, now(), slug),
+        )
+
+    def written(self, slug):
+        self.execute("UPDATE jobs SET state = ?, error = NULL, updated_at = ? WHERE slug = ?", (WRITTEN, now(), slug))
+
+    def failed(self, slug, reason):
+        self.execute(
+            "UPDATE jobs SET state = ?, error = ?, updated_at = ? WHERE slug = ?",
+            (FAILED, str(reason)[:500], now(), slug),
+        )
+
+    def marked(self, slugs):
+        stamp = now()
+        self.executemany(
+            "UPDATE jobs SET state = ?, updated_at = ? WHERE slug = ?",
+            [(MARKED, stamp, slug) for slug in slugs],
+        )
+
+    def slugs(self, *states):
+        placeholders = ",".join("?" * len(states))
+        rows = self.query(f"SELECT slug FROM jobs WHERE state IN ({placeholders}) ORDER BY slug", states)
+        return [slug for (slug,) in rows]
+
+    def input_hashes(self, slugs):
+        wanted = set(slugs)
+        rows = self.query("SELECT slug, input_hash FROM jobs WHERE input_hash IS NOT NULL")
+        return {slug: digest for slug, digest in rows if slug in wanted}
+
+    def failures(self):
+        """[(slug, attempts, error)] for every failed job."""
+        return self.query("SELECT slug, attempts, error FROM jobs WHERE state = ? ORDER BY slug", (FAILED,))
+
+    def counts(self):
+        counts = dict.fromkeys(STATES, 0)
+        counts.update(self.query("SELECT state, COUNT(*) FROM jobs GROUP BY state"))
+        return counts
+
+    def close(self):
+        with self.lock:
+            self.conn.close()
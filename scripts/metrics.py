@@ -0,0 +1,248 @@
+"""
+Shared run instrumentation for the scripts: phase timers, counters and
+latency observations.
+
+    metrics.start("generate_html", profile=args.profile)
+    with metrics.phase("render"):
+        ...
+    metrics.incr("pages_rendered")
+    metrics.incr("render_failures", cause="not_ready")
+    metrics.observe("supabase_request_seconds", 0.12, table="articles")
+    metrics.finish()
+
+finish() writes
+
+  .build/metrics/events.jsonl   one JSON line per finished phase, plus a
+                                run summary with every counter/observation
+  apnilist_<script>.prom        Prometheus text format (0.0.4), which is what
+                                node-exporter's textfile collector parses, in
+                                METRICS_TEXTFILE_DIR (default
+                                .build/metrics/textfile)
+
+Calls made before start() (or from a script that never calls it) are only
+accumulated in memory. supabase_client records every request's latency and
+status through a session response hook.
+
+With profile=True every top-level phase runs under its own cProfile
+profiler (main thread only); finish() dumps the stats of the slowest one to
+.build/metrics/<script>-<phase>.prof and prints its top functions.
+"""
+import os
+import io
+import json
+import time
+import pstats
+import cProfile
+import threading
+from contextlib import contextmanager
+from datetime import datetime, timezone
+
+PROJECT_ROOT = os.path.abspath(os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+METRICS_DIR = os.path.join(PROJECT_ROOT, ".build", "metrics")
+EVENTS_PATH = os.path.join(METRICS_DIR, "events.jsonl")
+TEXTFILE_DIR = os.environ.get("METRICS_TEXTFILE_DIR", os.path.join(METRICS_DIR, "textfile"))
+
+PREFIX = "apnilist"
+PROFILE_TOP = 15
+
+_lock = threading.Lock()
+_local = threading.local()
+_state = {
+    "script": None,
+    "run_id": None,
+    "started": None,
+    "profile": False,
+    "counters": {},       # (name, labels) → value
+    "observations": {},   # (name, labels) → [count, sum, max]
+    "profilers": {},      # phase → cProfile.Profile
+    "events": [],
+}
+
+
+def labels_key(labels):
+    return tuple(sorted((k, str(v)) for k, v in labels.items()))
+
+
+def now_iso():
+    return datetime.now(timezone.utc).isoformat(timespec="milliseconds")
+
+
+def start(script, profile=False):
+    """Begins a run; resets anything recorded so far."""
+    with _lock:
+        _state.update(
+            script=script,
+            run_id=f"{script}-{datetime.now(timezone.utc).strftime('%Y%m%dT%H%M%SZ')}-{os.getpid()}",
+            started=time.perf_counter(),
+            profile=profile,
+            counters={},
+            observations={},
+            profilers={},
+            events=[],
+        )
+
+
+def incr(name, value=1, **labels):
+    key = (name, labels_key(labels))
+    with _lock:
+        _state["counters"][key] = _state["counters"].get(key, 0) + value
+
+
+def observe(name, value, **labels):
+    """Records one sample (e.g. a latency in seconds) into a count/sum/max summary."""
+    key = (name, labels_key(labels))
+    with _lock:
+        stats = _state["observations"].setdefault(key, [0, 0.0, 0.0])
+        stats[0] += 1
+        stats[1] += value
+        stats[2] = max(stats[2], value)
+
+
+def event(kind, **fields):
+    with _lock:
+        _state["events"].append({"ts": now_iso(), "run": _state["run_id"], "script": _state["script"],
+                                 "event": kind, **fields})
+
+
+@contextmanager
+def phase(name, **labels):
+    """Times a block as phase `name` (observed as phase_seconds{phase=name})."""
+    depth = getattr(_local, "depth", 0)
+    profiler = None
+    if _state["profile"] and depth == 0 and threading.current_thread() is threading.main_thread():
+        with _lock:
+            profiler = _state["profilers"].setdefault(name, cProfile.Profile())
+        profiler.enable()
+    _local.depth = depth + 1
+    started = time.perf_counter()
+    status = "error"
+    try:
+        yield
+        status = "ok"
+    finally:
+        elapsed = time.perf_counter() - started
+        _local.depth = depth
+        if profiler:
+            profiler.disable()
+        observe("phase_seconds", elapsed, phase=name, **labels)
+        event("phase", phase=name, seconds=round(elapsed, 4), status=status, **labels)
+
+
+def timed(name):
+    """Decorator form of phase()."""
+    def wrap(fn):
+        def inner(*args, **kwargs):
+            with phase(name):
+                return fn(*args, **kwargs)
+        inner.__name__ = fn.__name__
+        inner.__doc__ = fn.__doc__
+        return inner
+    return wrap
+
+
+def snapshot():
+    """{"counters": {...}, "observations": {...}} with flattened label keys."""
+    def flat(name, labels):
+        return name + ("{" + ",".join(f"{k}={v}" for k, v in labels) + "}" if labels else "")
+
+    with _lock:
+        return {
+            "counters": {flat(*key): value for key, value in _state["counters"].items()},
+            "observations": {
+                flat(*key): {"count": c, "sum": round(s, 4), "max": round(m, 4)}
+                for key, (c, s, m) in _state["observations"].items()
+            },
+        }
+
+
+# --- Output ---
+
+def escape_label(value):
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def format_labels(labels, script):
+    pairs = [("script", script)] + list(labels)
+    return "{" + ",".join(f'{k}="{escape_label(v)}"' for k, v in pairs) + "}"
+
+
+def prometheus_text():
+    script = _state["script"] or "unknown"
+    lines = []
+    with _lock:
+        counters = sorted(_state["counters"].items())
+        observations = sorted(_state["observations"].items())
+
+    # Samples of one metric family must be contiguous, so group by name first
+    families = {}
+    for (name, labels), value in counters:
+        families.setdefault((f"{PREFIX}_{name}_total", "counter"), []).append(f"{format_labels(labels, script)} {value}")
+    for (name, labels), (count, total, peak) in observations:
+        summary = families.setdefault((f"{PREFIX}_{name}", "summary"), [])
+        summary.append(f"_count{format_labels(labels, script)} {count}")
+        summary.append(f"_sum{format_labels(labels, script)} {total:.6f}")
+        families.setdefault((f"{PREFIX}_{name}_max", "gauge"), []).append(f"{format_labels(labels, script)} {peak:.6f}")
+    for (metric, kind), samples in families.items():
+        lines.append(f"# TYPE {metric} {kind}")
+        lines.extend(metric + sample for sample in samples)
+
+    run_labels = format_labels((), script)
+    lines.append(f"# TYPE {PREFIX}_last_run_timestamp_seconds gauge")
+    lines.append(f"{PREFIX}_last_run_timestamp_seconds{run_labels} {time.time():.0f}")
+    if _state["started"] is not None:
+        lines.append(f"# TYPE {PREFIX}_last_run_duration_seconds gauge")
+        lines.append(f"{PREFIX}_last_run_duration_seconds{run_labels} {time.perf_counter() - _state['started']:.3f}")
+    return "\n".join(lines) + "\n"
+
+
+def write_atomic(path, text):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        f.write(text)
+    os.replace(tmp_path, path)
+
+
+def dump_profile():
+    """Writes the slowest profiled phase's stats; returns (phase, path) or None."""
+    if not _state["profilers"]:
+        return None
+    totals = {
+        name: stats[1]
+        for (metric, labels), stats in _state["observations"].items()
+        if metric == "phase_seconds"
+        for key, name in labels if key == "phase"
+    }
+    hottest = max(_state["profilers"], key=lambda name: totals.get(name, 0))
+    path = os.path.join(METRICS_DIR, f"{_state['script']}-{hottest}.prof")
+    os.makedirs(METRICS_DIR, exist_ok=True)
+    profiler = _state["profilers"][hottest]
+    profiler.dump_stats(path)
+
+    out = io.StringIO()
+    pstats.Stats(profiler, stream=out).sort_stats("cumulative").print_stats(PROFILE_TOP)
+    print(f"\n🔬 Hottest phase: {hottest} ({totals.get(hottest, 0):.2f}s) — profile saved to {path}")
+    print(out.getvalue())
+    return hottest, path
+
+
+def finish(status="ok"):
+    """Writes the JSON-lines events and the Prometheus textfile for this run."""
+    if _state["script"] is None:
+        return
+    elapsed = time.perf_counter() - _state["started"]
+    event("run", status=status, seconds=round(elapsed, 3), **snapshot())
+
+    os.makedirs(METRICS_DIR, exist_ok=True)
+    with _lock:
+        events, _state["events"] = _state["events"], []
+    with open(EVENTS_PATH, "a", encoding="utf-8") as f:
+        for e in events:
+            f.write(json.dumps(e, default=str) + "\n")
+    textfile = os.path.join(TEXTFILE_DIR, f"{PREFIX}_{_state['script']}.prom")
+    write_atomic(textfile, prometheus_text())
+    print(f"📊 Metrics: {len(events)} events → {os.path.relpath(EVENTS_PATH, PROJECT_ROOT)}, "
+          f"{os.path.relpath(textfile, PROJECT_ROOT) if textfile.startswith(PROJECT_ROOT) else textfile}")
+
+    if _state["profile"]:
+        dump_profile()
@@ -2,56 +2,27 @@
 Phase 3: Migrates dated article URLs to clean, keyword-rich slugs.
 For each article:
   1. Creates a new HTML file at the clean slug with updated canonical/og:url
-  2. Adds 301 redirects (dated → clean) to vercel.json
-  3. Updates sitemap.xml to use only the clean URLs
+  2. Regenerates the dated → clean redirects from the slug store
+     (src/lib/slugRedirects.json, see slug_redirects.py)
+  3. Updates the sitemap shards to use only the clean URLs
+
+Usage: python scripts/migrate_to_clean_urls.py [--profile] [OLD=NEW ...]
 """
 import os
 import re
 import json
-import xml.etree.ElementTree as ET
-from datetime import datetime
+import argparse
+
+import metrics
+import sitemap_writer
+import slug_redirects
 
 ARTICLES_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "public", "articles")
 VERCEL_JSON_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "vercel.json")
-SITEMAP_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "public", "sitemap.xml")
 BASE_URL = "https://www.apnilist.co.in"
 
-SLUG_MAPPING = {
-    "air-purifier-19-12-2025":                  "best-hepa-air-purifier",
-    "air-purifier-20-12-2025":                  "best-car-air-purifier",
-    "airfrier-25-02-2026":                      "best-air-fryer",
-    "alkaline-water-purifier-29-01-2026":       "best-alkaline-water-purifier",
-    "chimney-19-12-2025":                       "best-auto-clean-chimney",
-    "chimney-20-12-2025":                       "best-filterless-chimney",
-    "coffee-maker-19-12-2025":                  "best-espresso-machine",
-    "coffee-maker-20-12-2025":                  "best-bean-to-cup-coffee-maker",
-    "dishwasher-06-02-2026":                    "best-dishwasher",
-    "foldable-mobile-20-12-2025":               "best-foldable-phone",
-    "juicer-19-12-2025":                        "best-cold-press-juicer",
-    "juicer-20-12-2025":                        "best-centrifugal-juicer",
-    "laptop-19-12-2025":                        "best-gaming-laptop",
-    "laptop-20-12-2025":                        "best-ultrabook-laptop",
-    "laptop-under-50k-21-12-2025":              "best-laptop-under-40000",
-    "lipstick-06-02-2026":                      "best-matte-lipstick",
-    "microwave-19-12-2025":                     "best-convection-microwave",
-    "microwave-20-12-2025":                     "best-microwave-oven",
-    "mobile-19-12-2025":                        "best-camera-phone",
-    "mobile-20-12-2025":                        "best-gaming-phone",
-    "projectors-21-12-2025":                    "best-smart-projector",
-    "refrigerator-19-12-2025":                  "best-convertible-refrigerator",
-    "refrigerator-20-12-2025":                  "best-side-by-side-refrigerator",
-    "semi-autonatic-washing-machine-21-12-2025":"best-semi-automatic-washing-machine",
-    "smart-washing-machine-21-12-2025":         "best-smart-washing-machine",
-    "tv-19-12-2025":                            "best-oled-qled-tv",
-    "tv-20-12-2025":                            "best-budget-4k-tv",
-    "vaccum-cleaner-19-12-2025":                "best-robot-vacuum-cleaner",
-    "vaccum-cleaner-20-12-2025":                "best-cordless-vacuum-cleaner",
-    "vaccum-cleaner-wet-dry-20-12-2025":        "best-wet-dry-vacuum-cleaner",
-    "washing-machine-20-12-2025":               "best-front-load-washing-machine",
-    "washing-machine-21-12-2025":               "best-fully-automatic-washing-machine",
-    "watch-07-02-2026":                         "best-automatic-watch",
-    "water-purifier-29-01-2026":                "best-water-purifier-under-15000",
-}
+# old dated slug → clean slug, from src/lib/slugRedirects.json
+SLUG_MAPPING = slug_redirects.load_slug_map()
 
 
 def update_canonical_in_html(html, old_slug, new_slug):
@@ -65,14 +36,16 @@ def create_clean_article(old_slug, new_slug):
     src = os.path.join(ARTICLES_DIR, f"{old_slug}.html")
     dst = os.path.join(ARTICLES_DIR, f"{new_slug}.html")
 
-    if not os.path.exists(src):
-        print(f"   ⚠ Source not found: {src}")
-        return False
-
+    # Checked first: once dedup_articles.py prunes the dated original, the
+    # clean copy is all that is left
     if os.path.exists(dst):
         print(f"   ℹ Already exists: {new_slug}.html — skipping copy")
         return True
 
+    if not os.path.exists(src):
+        print(f"   ⚠ Source not found: {src}")
+        return False
+
     with open(src, "r", encoding="utf-8") as f:
         html = f.read()
 
@@ -85,105 +58,116 @@ def create_clean_article(old_slug, new_slug):
 
 
 def update_vercel_json(slug_map):
+    """
+    Replaces per-slug article redirects with the collapsed group rules from
+    slug_redirects.collapse_rules(); everything else is left to middleware.ts.
+    Returns (rules_before, rules_after, map_only).
+    """
     with open(VERCEL_JSON_PATH, "r") as f:
         config = json.load(f)
 
     existing_redirects = config.get("redirects", [])
-    existing_sources = {r["source"] for r in existing_redirects}
-
-    new_redirects = []
-    for old_slug, new_slug in slug_map.items():
-        source = f"/articles/{old_slug}"
-        destination = f"/articles/{new_slug}"
-        if source not in existing_sources:
-            new_redirects.append({
-                "source": source,
-                "destination": destination,
-                "permanent": True
-            })
-
-    # Insert article slug redirects before domain redirects
-    config["redirects"] = new_redirects + existing_redirects
+    kept = [r for r in existing_redirects if not slug_redirects.is_generated_rule(r, slug_map)]
+    rules, map_only = slug_redirects.collapse_rules(slug_map)
+
+    # Article slug redirects go before domain redirects
+    config["redirects"] = rules + kept
 
     with open(VERCEL_JSON_PATH, "w") as f:
         json.dump(config, f, indent=2)
 
-    return len(new_redirects)
+    return len(existing_redirects), len(config["redirects"]), map_only
 
 
 def update_sitemap(slug_map):
-    xmlns = "http://www.sitemaps.org/schemas/sitemap/0.9"
-    ET.register_namespace("", xmlns)
-
-    tree = ET.parse(SITEMAP_PATH)
-    root = tree.getroot()
-    ns = {"ns": xmlns}
-    today = datetime.now().strftime("%Y-%m-%d")
-
-    # Build set of clean slugs already in sitemap
-    existing_locs = set()
-    for url_el in root.findall("ns:url", ns):
-        loc_el = url_el.find("ns:loc", ns)
-        if loc_el is not None:
-            existing_locs.add(loc_el.text)
-
-    added = 0
-    removed = 0
-
-    # Remove dated URL entries that have a clean replacement
-    dated_locs = {f"{BASE_URL}/articles/{old}" for old in slug_map}
-    for url_el in list(root.findall("ns:url", ns)):
-        loc_el = url_el.find("ns:loc", ns)
-        if loc_el is not None and loc_el.text in dated_locs:
-            root.remove(url_el)
-            removed += 1
-
-    # Add clean URL entries
-    for old_slug, new_slug in slug_map.items():
-        clean_loc = f"{BASE_URL}/articles/{new_slug}"
-        if clean_loc not in existing_locs:
-            url_el = ET.SubElement(root, "url")
-            ET.SubElement(url_el, "loc").text = clean_loc
-            ET.SubElement(url_el, "lastmod").text = today
-            ET.SubElement(url_el, "changefreq").text = "monthly"
-            ET.SubElement(url_el, "priority").text = "0.8"
-            added += 1
-
-    if hasattr(ET, "indent"):
-        ET.indent(root, space="  ", level=0)
-
-    tree.write(SITEMAP_PATH, encoding="utf-8", xml_declaration=True)
+    """
+    Swaps dated article URLs for their clean replacements in place, rewriting
+    only the sitemap shards that hold them. Clean URLs get the same entries,
+    lastmod included, as generate_html.py writes. Returns (added, removed).
+    """
+    import generate_html  # imports this module (via dedup_articles) for BASE_URL
+
+    dated_locs = [f"{BASE_URL}/articles/{old}" for old in slug_map]
+    removed = sitemap_writer.remove_urls(dated_locs)
+
+    # A full scan: on a fresh change log it adopts each page's dateModified
+    # instead of stamping every page it is handed as changed today
+    lastmods = generate_html.article_lastmods()
+    added, _ = sitemap_writer.upsert_urls(
+        generate_html.article_entry(new_slug, lastmods)
+        for new_slug in slug_map.values()
+        if os.path.exists(os.path.join(ARTICLES_DIR, f"{new_slug}.html"))
+    )
     return added, removed
 
 
+def parse_args():
+    parser = argparse.ArgumentParser(description="Migrate dated article URLs to clean slugs")
+    parser.add_argument(
+        "mappings",
+        nargs="*",
+        metavar="OLD=NEW",
+        help="new slug migrations to add to src/lib/slugRedirects.json before migrating",
+    )
+    parser.add_argument("--profile", action="store_true", help="cProfile the run into .build/metrics/")
+    args = parser.parse_args()
+    new_mappings = {}
+    for pair in args.mappings:
+        old_slug, sep, new_slug = pair.partition("=")
+        if not sep or not old_slug or not new_slug:
+            parser.error(f"expected OLD=NEW, got {pair!r}")
+        new_mappings[old_slug] = new_slug
+    return new_mappings, args.profile
+
+
 def main():
-    print(f"Migrating {len(SLUG_MAPPING)} articles to clean URLs...\n")
-
-    # Step 1: Create clean HTML files
-    print("── Step 1: Creating clean article files ──")
-    success = 0
-    for old_slug, new_slug in SLUG_MAPPING.items():
-        ok = create_clean_article(old_slug, new_slug)
-        status = "✅" if ok else "❌"
-        print(f"   {status} {old_slug} → {new_slug}")
-        if ok:
-            success += 1
-    print(f"   {success}/{len(SLUG_MAPPING)} files created\n")
-
-    # Step 2: Update vercel.json
-    print("── Step 2: Adding 301 redirects to vercel.json ──")
-    added_redirects = update_vercel_json(SLUG_MAPPING)
-    print(f"   ✅ Added {added_redirects} redirect rules\n")
-
-    # Step 3: Update sitemap.xml
-    print("── Step 3: Updating sitemap.xml ──")
-    added_urls, removed_urls = update_sitemap(SLUG_MAPPING)
-    print(f"   ✅ Removed {removed_urls} dated URLs, added {added_urls} clean URLs\n")
-
-    print("Done! Summary:")
-    print(f"  • {success} clean article files created in public/articles/")
-    print(f"  • {added_redirects} 301 redirects added to vercel.json")
-    print(f"  • sitemap.xml updated ({removed_urls} removed, {added_urls} added)")
+    global SLUG_MAPPING
+    new_mappings, profile = parse_args()
+    metrics.start("migrate_to_clean_urls", profile=profile)
+    status = "error"
+    try:
+        if new_mappings:
+            try:
+                SLUG_MAPPING, shortened = slug_redirects.add_mappings(new_mappings)
+            except ValueError as e:
+                print(f"❌ {e}")
+                return
+            print(f"📝 Added {len(new_mappings)} mapping(s) to the slug store; "
+                  f"{shortened} existing redirect chain(s) shortened\n")
+
+        print(f"Migrating {len(SLUG_MAPPING)} articles to clean URLs...\n")
+
+        # Step 1: Create clean HTML files
+        print("── Step 1: Creating clean article files ──")
+        success = 0
+        with metrics.phase("articles"):
+            for old_slug, new_slug in SLUG_MAPPING.items():
+                ok = create_clean_article(old_slug, new_slug)
+                print(f"   {'✅' if ok else '❌'} {old_slug} → {new_slug}")
+                if ok:
+                    success += 1
+        print(f"   {success}/{len(SLUG_MAPPING)} clean files in place\n")
+
+        # Step 2: Collapse redirects in vercel.json
+        print("── Step 2: Generating redirect rules ──")
+        with metrics.phase("redirects"):
+            rules_before, rules_after, map_only = update_vercel_json(SLUG_MAPPING)
+        print(f"   ✅ vercel.json redirect rules: {rules_before} → {rules_after}")
+        print(f"   ✅ {map_only} slugs served from the middleware.ts lookup map\n")
+
+        # Step 3: Update the sitemap shards
+        print("── Step 3: Updating sitemap shards ──")
+        with metrics.phase("sitemap"):
+            added_urls, removed_urls = update_sitemap(SLUG_MAPPING)
+        print(f"   ✅ Removed {removed_urls} dated URLs, added {added_urls} clean URLs\n")
+
+        print("Done! Summary:")
+        print(f"  • {success} clean article files in public/articles/")
+        print(f"  • vercel.json redirect rules {rules_before} → {rules_after}, {map_only} slugs in middleware.ts map")
+        print(f"  • sitemap updated ({removed_urls} removed, {added_urls} added)")
+        status = "ok"
+    finally:
+        metrics.finish(status)
 
 
 if __name__ == "__main__":
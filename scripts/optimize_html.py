@@ -0,0 +1,151 @@
+"""
+Size optimisations for captured article pages, run as postprocess.py transforms:
+
+  svg-sprite  — repeated inline lucide icons become one <symbol> each in a
+                hidden sprite inside <main>, referenced with <use>
+  shared-css  — large inline <style> blocks move to a content-hashed file
+                under public/static-assets/ shared by every page
+  minify      — collapse whitespace outside <pre>/<textarea>/<script>/<style>
+
+Each transform returns a short description including the bytes it saved.
+"""
+import os
+import re
+import hashlib
+
+PUBLIC_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "public")
+STATIC_ASSETS_DIR = os.path.join(PUBLIC_DIR, "static-assets")
+STATIC_ASSETS_URL = "/static-assets"
+
+SPRITE_ID = "apnilist-icons"
+MIN_EXTERNAL_STYLE_BYTES = 2048
+
+SVG_PATTERN = re.compile(r'<svg\b([^>]*)>(.*?)</svg>', re.DOTALL)
+LUCIDE_NAME_PATTERN = re.compile(r'\blucide-([a-z0-9-]+)')
+VIEWBOX_PATTERN = re.compile(r'\sviewBox="([^"]*)"')
+MAIN_OPEN_PATTERN = re.compile(r'<main\b[^>]*>')
+STYLE_PATTERN = re.compile(r'<style[^>]*>(.*?)</style>', re.DOTALL)
+PROTECTED_PATTERN = re.compile(r'(<(pre|textarea|script|style)\b.*?</\2>)', re.DOTALL | re.IGNORECASE)
+WHITESPACE_PATTERN = re.compile(r'\s{2,}')
+
+
+def kb(n):
+    return f"{n / 1024:.1f} KB"
+
+
+def hoist_svg_sprite(html):
+    """
+    Replaces every lucide icon used more than once with <use href="#...">
+    and adds one hidden sprite holding a <symbol> per icon.
+    Returns (html, description or None).
+    """
+    if f'id="{SPRITE_ID}"' in html:
+        return html, None
+    main_open = MAIN_OPEN_PATTERN.search(html)
+    if not main_open:
+        return html, None
+
+    icons = {}
+    counts = {}
+    for match in SVG_PATTERN.finditer(html):
+        attrs, inner = match.groups()
+        if "lucide" not in attrs or inner.lstrip().startswith("<use"):
+            continue
+        viewbox = VIEWBOX_PATTERN.search(attrs)
+        key = (viewbox.group(1) if viewbox else "0 0 24 24", inner)
+        counts[key] = counts.get(key, 0) + 1
+        if key not in icons:
+            name = LUCIDE_NAME_PATTERN.search(attrs)
+            base = name.group(1) if name else "icon"
+            icons[key] = f"i-{base}-{hashlib.sha1(inner.encode('utf-8')).hexdigest()[:6]}"
+
+    shared = {key: symbol_id for key, symbol_id in icons.items() if counts[key] > 1}
+    if not shared:
+        return html, None
+
+    def replace(match):
+        attrs, inner = match.groups()
+        viewbox = VIEWBOX_PATTERN.search(attrs)
+        key = (viewbox.group(1) if viewbox else "0 0 24 24", inner)
+        if "lucide" not in attrs or key not in shared:
+            return match.group(0)
+        return f'<svg{attrs}><use href="#{shared[key]}"></use></svg>'
+
+    before = len(html)
+    html = SVG_PATTERN.sub(replace, html)
+    symbols = "".join(
+        f'<symbol id="{symbol_id}" viewBox="{viewbox}">{inner}</symbol>'
+        for (viewbox, inner), symbol_id in shared.items()
+    )
+    sprite = (
+        f'<svg id="{SPRITE_ID}" xmlns="http://www.w3.org/2000/svg" '
+        f'style="display:none" aria-hidden="true">{symbols}</svg>'
+    )
+    main_open = MAIN_OPEN_PATTERN.search(html)
+    html = html[:main_open.end()] + sprite + html[main_open.end():]
+    uses = sum(counts[key] for key in shared)
+    return html, f"{uses} icons → {len(shared)} symbols, saved {kb(before - len(html))}"
+
+
+def write_static_asset(content, extension):
+    """Writes `content` to a content-hashed file once; returns its public URL."""
+    digest = hashlib.sha256(content.encode("utf-8")).hexdigest()[:12]
+    filename = f"{digest}.{extension}"
+    path = os.path.join(STATIC_ASSETS_DIR, filename)
+    if not os.path.exists(path):
+        os.makedirs(STATIC_ASSETS_DIR, exist_ok=True)
+        tmp_path = f"{path}.{os.getpid()}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            f.write(content)
+        os.replace(tmp_path, path)
+    return f"{STATIC_ASSETS_URL}/{filename}"
+
+
+def externalize_styles(html):
+    """
+    Moves large inline <style> blocks from <head> into shared hashed files.
+    Returns (html, description or None).
+    """
+    head_end = html.find("</head>")
+    if head_end == -1:
+        return html, None
+    head = html[:head_end]
+
+    moved = []
+
+    def replace(match):
+        css = match.group(1)
+        if len(css.encode("utf-8")) < MIN_EXTERNAL_STYLE_BYTES:
+            return match.group(0)
+        url = write_static_asset(css, "css")
+        moved.append(url)
+        return f'<link rel="stylesheet" href="{url}">'
+
+    new_head = STYLE_PATTERN.sub(replace, head)
+    if not moved:
+        return html, None
+    saved = len(head) - len(new_head)
+    return new_head + html[head_end:], f"{len(moved)} style block(s) → {', '.join(moved)}, saved {kb(saved)}"
+
+
+def collapse_whitespace(html):
+    """
+    Collapses runs of whitespace to a single space (or newline), leaving
+    <pre>, <textarea>, <script> and <style> contents untouched.
+    Returns (html, description or None).
+    """
+    def squeeze(text):
+        return WHITESPACE_PATTERN.sub(lambda m: "\n" if "\n" in m.group(0) else " ", text)
+
+    parts = PROTECTED_PATTERN.split(html)
+    # split() yields [text, protected, tag name, text, protected, tag name, ...]
+    out = []
+    for i in range(0, len(parts), 3):
+        out.append(squeeze(parts[i]))
+        if i + 1 < len(parts):
+            out.append(parts[i + 1])
+    minified = "".join(out)
+    saved = len(html) - len(minified)
+    if saved <= 0:
+        return html, None
+    return minified, f"saved {kb(saved)}"
@@ -0,0 +1,391 @@
+"""
+Responsive image variants for the static pages.
+Collects every image referenced by an <img src> in public/articles and
+public/product, plus everything in public/products/, and writes resized
+variants at WIDTHS (never upscaled) to public/img/<hash>-<width>.<format>:
+
+  webp   always
+  avif   when Pillow can encode it (Pillow >= 11.3, or pillow-avif-plugin)
+
+Variants are keyed by the source's content hash, so an image is encoded
+once however many pages or URLs use it, and re-encoded only if its bytes
+change. Remote images are downloaded once into .build/images/. The
+mapping (src → hash → intrinsic size and variant widths) is kept in
+.build/images.json, outside the deployed tree (a manifest at the old
+public/img/.images.json is picked up and removed on the next save);
+encoding runs across a process pool.
+
+The `images` transform in postprocess.py then rewrites each known <img> to
+a WebP srcset with sizes, explicit width/height and lazy loading, wrapped
+in a <picture> with an AVIF <source> when one exists. This script runs that
+transform over the article and product pages itself, then precompresses
+what changed.
+
+Usage: python scripts/optimize_images.py [--workers N] [--force] [--no-rewrite]
+"""
+import os
+import io
+import re
+import json
+import hashlib
+import argparse
+import importlib
+from html import unescape
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+
+import requests
+from PIL import Image, ImageOps
+
+import metrics
+import precompress
+from http_renderer import SITE_URL
+from optimize_html import kb
+
+try:
+    # Registers AVIF on Pillow < 11.3; imported for its side effect only
+    importlib.import_module("pillow_avif")
+except ImportError:
+    pass
+
+PROJECT_ROOT = os.path.abspath(os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+PUBLIC_DIR = os.path.join(PROJECT_ROOT, "public")
+PAGE_DIRS = [os.path.join(PUBLIC_DIR, "articles"), os.path.join(PUBLIC_DIR, "product")]
+PRODUCT_IMAGES_DIR = os.path.join(PUBLIC_DIR, "products")
+OUTPUT_DIR = os.path.join(PUBLIC_DIR, "img")
+MANIFEST_PATH = os.path.join(PROJECT_ROOT, ".build", "images.json")
+LEGACY_MANIFEST_PATH = os.path.join(OUTPUT_DIR, ".images.json")
+DOWNLOAD_DIR = os.path.join(PROJECT_ROOT, ".build", "images")
+
+OUTPUT_URL = "/img"
+WIDTHS = (160, 320, 480, 640, 960)
+QUALITY = {"webp": 78, "avif": 55}
+SOURCE_EXTENSIONS = (".jpg", ".jpeg", ".png", ".webp", ".gif", ".avif")
+DOWNLOAD_WORKERS = 8
+DOWNLOAD_TIMEOUT = (5, 20)
+
+IMG_TAG_PATTERN = re.compile(r'<img\b[^>]*>')
+SRC_PATTERN = re.compile(r'\ssrc="([^"]*)"')
+CLASS_PATTERN = re.compile(r'\sclass="([^"]*)"')
+
+# Layout slot of an <img> by its class list, for the `sizes` attribute
+SIZES_BY_CLASS = [
+    ("h-14 w-auto", "160px"),                                   # header logo
+    ("max-h-[450px]", "(min-width: 1024px) 50vw, 100vw"),       # product page hero
+]
+DEFAULT_SIZES = "(min-width: 1024px) 25vw, (min-width: 768px) 33vw, 100vw"   # product cards
+
+
+def formats():
+    Image.init()
+    return ["avif", "webp"] if "AVIF" in Image.SAVE else ["webp"]
+
+
+def sha256(data):
+    return hashlib.sha256(data).hexdigest()
+
+
+def load_manifest():
+    for path in (MANIFEST_PATH, LEGACY_MANIFEST_PATH):
+        if os.path.exists(path):
+            with open(path, "r", encoding="utf-8") as f:
+                return json.load(f)
+    return {"sources": {}, "images": {}}
+
+
+def save_manifest(manifest):
+    os.makedirs(os.path.dirname(MANIFEST_PATH), exist_ok=True)
+    tmp_path = f"{MANIFEST_PATH}.tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(manifest, f, indent=2, sort_keys=True)
+    os.replace(tmp_path, MANIFEST_PATH)
+    if os.path.exists(LEGACY_MANIFEST_PATH):
+        os.remove(LEGACY_MANIFEST_PATH)
+
+
+# --- Sources ---
+
+def page_paths():
+    return [
+        os.path.join(directory, f)
+        for directory in PAGE_DIRS if os.path.isdir(directory)
+        for f in sorted(os.listdir(directory))
+        if f.endswith(".html")
+    ]
+
+
+def referenced_sources(paths):
+    """Every distinct <img src> in the pages, plus the files in public/products."""
+    sources = set()
+    for path in paths:
+        with open(path, "r", encoding="utf-8") as f:
+            html = f.read()
+        for tag in IMG_TAG_PATTERN.findall(html):
+            match = SRC_PATTERN.search(tag)
+            if match:
+                sources.add(unescape(match.group(1)))
+    if os.path.isdir(PRODUCT_IMAGES_DIR):
+        sources.update(f"/products/{f}" for f in os.listdir(PRODUCT_IMAGES_DIR) if f.lower().endswith(SOURCE_EXTENSIONS))
+    return sorted(s for s in sources if is_optimisable(s))
+
+
+def is_optimisable(src):
+    if src.startswith(("data:", f"{OUTPUT_URL}/")):
+        return False
+    return src.split("?", 1)[0].lower().endswith(SOURCE_EXTENSIONS) or src.startswith("http")
+
+
+def local_path(src):
+    """public/ path for a site-relative (or own-domain) src, or None."""
+    if src.startswith(SITE_URL):
+        src = src[len(SITE_URL):]
+    if not src.startswith("/"):
+        return None
+    path = os.path.normpath(os.path.join(PUBLIC_DIR, src.split("?", 1)[0].lstrip("/")))
+    return path if path.startswith(PUBLIC_DIR) and os.path.isfile(path) else None
+
+
+def download(src):
+    """Fetches a remote image once into .build/images/. Returns the path or None."""
+    path = os.path.join(DOWNLOAD_DIR, sha256(src.encode("utf-8"))[:32])
+    if os.path.exists(path):
+        return path
+    try:
+        response = requests.get(src, timeout=DOWNLOAD_TIMEOUT, headers={"User-Agent": "Mozilla/5.0 ApniList image optimiser"})
+        response.raise_for_status()
+    except requests.RequestException as e:
+        print(f"   ⚠ {src}: {e.__class__.__name__}")
+        return None
+    if not response.headers.get("Content-Type", "image/").startswith("image/"):
+        print(f"   ⚠ {src}: not an image ({response.headers.get('Content-Type')})")
+        return None
+    os.makedirs(DOWNLOAD_DIR, exist_ok=True)
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "wb") as f:
+        f.write(response.content)
+    os.replace(tmp_path, path)
+    return path
+
+
+def resolve_sources(sources):
+    """{src: file path} for every source that is on disk or could be downloaded."""
+    resolved = {}
+    remote = []
+    for src in sources:
+        path = local_path(src)
+        if path:
+            resolved[src] = path
+        elif src.startswith("http"):
+            remote.append(src)
+    with ThreadPoolExecutor(max_workers=DOWNLOAD_WORKERS) as pool:
+        for src, path in zip(remote, pool.map(download, remote)):
+            if path:
+                resolved[src] = path
+    return resolved
+
+
+# --- Encoding ---
+
+def variant_widths(width):
+    widths = [w for w in WIDTHS if w < width]
+    return widths + [min(width, WIDTHS[-1])]
+
+
+def variant_path(digest, width, fmt):
+    return os.path.join(OUTPUT_DIR, f"{digest}-{width}.{fmt}")
+
+
+def encode_image(job):
+    """
+    Writes every variant of one source image (runs in a worker process).
+    Returns (digest, entry or None, source bytes, variant bytes).
+    """
+    path, digest, fmts = job
+    try:
+        with open(path, "rb") as f:
+            data = f.read()
+        image = ImageOps.exif_transpose(Image.open(io.BytesIO(data)))
+        image = image.convert("RGBA" if image.mode in ("RGBA", "LA", "P") else "RGB")
+    except Exception as e:
+        return digest, None, 0, f"{os.path.basename(path)}: {e}"
+
+    width, height = image.size
+    entry = {"width": width, "height": height, "variants": {}}
+    written = 0
+    for fmt in fmts:
+        entry["variants"][fmt] = []
+        for w in variant_widths(width):
+            resized = image if w == width else image.resize((w, round(height * w / width)), Image.LANCZOS)
+            out = io.BytesIO()
+            if fmt == "webp":
+                resized.save(out, "WEBP", quality=QUALITY[fmt], method=6)
+            else:
+                resized.save(out, "AVIF", quality=QUALITY[fmt])
+            target = variant_path(digest, w, fmt)
+            with open(f"{target}.tmp", "wb") as f:
+                f.write(out.getvalue())
+            os.replace(f"{target}.tmp", target)
+            entry["variants"][fmt].append(w)
+            written += out.tell()
+    return digest, entry, len(data), written
+
+
+def has_outputs(digest, entry):
+    return entry is not None and all(
+        os.path.exists(variant_path(digest, w, fmt))
+        for fmt, widths in entry["variants"].items()
+        for w in widths
+    )
+
+
+def build_variants(resolved, manifest, workers=None, force=False):
+    """Encodes every new or changed source. Returns (encoded, reused, failed)."""
+    fmts = formats()
+    digests = {}
+    for src, path in resolved.items():
+        with open(path, "rb") as f:
+            digests[src] = sha256(f.read())[:16]
+
+    jobs = {}
+    for src, digest in digests.items():
+        entry = manifest["images"].get(digest)
+        fresh = has_outputs(digest, entry) and set(entry["variants"]) == set(fmts)
+        if force or not fresh:
+            jobs.setdefault(digest, (resolved[src], digest, fmts))
+
+    os.makedirs(OUTPUT_DIR, exist_ok=True)
+    failed = set()
+    source_bytes = variant_bytes = 0
+    if jobs:
+        print(f"🖼  Encoding {len(jobs)} images as {'/'.join(fmts)} at up to {len(WIDTHS)} widths...")
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            for digest, entry, size, result in pool.map(encode_image, jobs.values()):
+                if entry is None:
+                    print(f"   ⚠ {result}")
+                    failed.add(digest)
+                    continue
+                manifest["images"][digest] = entry
+                source_bytes += size
+                variant_bytes += result
+                metrics.incr("images_encoded")
+                metrics.incr("bytes_written", result)
+        if source_bytes:
+            print(f"   {kb(source_bytes)} of sources → {kb(variant_bytes)} across all variants")
+
+    for src, digest in digests.items():
+        if digest not in failed:
+            manifest["sources"][src] = digest
+    return len(jobs) - len(failed), len(set(digests.values())) - len(jobs), len(failed)
+
+
+# --- Rewriting ---
+
+def sizes_for(tag):
+    match = CLASS_PATTERN.search(tag)
+    classes = match.group(1) if match else ""
+    for marker, sizes in SIZES_BY_CLASS:
+        if marker in classes:
+            return sizes
+    return DEFAULT_SIZES
+
+
+def srcset(digest, fmt, widths):
+    return ", ".join(f"{OUTPUT_URL}/{digest}-{w}.{fmt} {w}w" for w in widths)
+
+
+def responsive_img(html, manifest):
+    """
+    Rewrites every <img> whose src has variants. The first image on the
+    page (the header logo) stays eager; the rest load lazily.
+    Returns (html, rewritten count).
+    """
+    sources, images = manifest["sources"], manifest["images"]
+    count = 0
+    first = True
+
+    def rewrite(match):
+        nonlocal count, first
+        tag = match.group(0)
+        eager, first = first, False
+        src_match = SRC_PATTERN.search(tag)
+        if "srcset=" in tag or not src_match:
+            return tag
+        digest = sources.get(unescape(src_match.group(1)))
+        entry = images.get(digest)
+        if not entry:
+            return tag
+
+        variants = entry["variants"]
+        widths = variants["webp"]
+        sizes = sizes_for(tag)
+        attrs = (f' src="{OUTPUT_URL}/{digest}-{widths[-1]}.webp" srcset="{srcset(digest, "webp", widths)}" '
+                 f'sizes="{sizes}"')
+        if " width=" not in tag:
+            attrs += f' width="{entry["width"]}" height="{entry["height"]}"'
+        if not eager and " loading=" not in tag:
+            attrs += ' loading="lazy"'
+        if " decoding=" not in tag:
+            attrs += ' decoding="async"'
+        new_tag = tag[:src_match.start()] + attrs + tag[src_match.end():]
+        count += 1
+        if "avif" in variants:
+            return (f'<picture><source type="image/avif" srcset="{srcset(digest, "avif", variants["avif"])}" '
+                    f'sizes="{sizes}">{new_tag}</picture>')
+        return new_tag
+
+    html = IMG_TAG_PATTERN.sub(rewrite, html)
+    return html, count
+
+
+def rewrite_pages(paths, workers=None):
+    """Runs postprocess.py's `images` transform over the pages. Returns the paths it changed."""
+    import postprocess  # imports this module for the transform
+
+    before = {path: os.path.getmtime(path) for path in paths}
+    postprocess.process_files(paths, only={"images"}, workers=workers)
+    return [path for path in paths if os.path.getmtime(path) != before[path]]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Build responsive WebP/AVIF variants for page images")
+    parser.add_argument("--workers", type=int, default=None, help="process pool size (default: CPU count)")
+    parser.add_argument("--force", action="store_true", help="re-encode every image")
+    parser.add_argument("--no-rewrite", action="store_true", help="only build variants; leave the pages alone")
+    parser.add_argument("--profile", action="store_true",
+                        help="cProfile every phase and dump the slowest one to .build/metrics/")
+    args = parser.parse_args()
+
+    metrics.start("optimize_images", profile=args.profile)
+    status = "error"
+    try:
+        optimize(args)
+        status = "ok"
+    finally:
+        metrics.finish(status)
+
+
+def optimize(args):
+    paths = page_paths()
+    with metrics.phase("collect"):
+        sources = referenced_sources(paths)
+        print(f"🔍 {len(sources)} images referenced by {len(paths)} pages and public/products")
+        resolved = resolve_sources(sources)
+
+    manifest = load_manifest()
+    with metrics.phase("encode"):
+        encoded, reused, failed = build_variants(resolved, manifest, args.workers, args.force)
+    save_manifest(manifest)
+    metrics.incr("image_failures", failed, cause="decode")
+    metrics.incr("image_failures", len(sources) - len(resolved), cause="unavailable")
+    print(f"✨ Images: {encoded} encoded, {reused} unchanged, {failed} failed, "
+          f"{len(sources) - len(resolved)} unavailable")
+
+    if not args.no_rewrite and paths:
+        with metrics.phase("rewrite"):
+            changed = rewrite_pages(paths, args.workers)
+        if changed:
+            with metrics.phase("precompress"):
+                precompress.precompress(changed)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,315 @@
+"""
+Single-pass post-processing pipeline for static article files.
+Each file in public/articles is read once, its ld+json blocks are parsed
+once, and every registered transform runs over it in order:
+
+  canonical     — point canonical/og:url of clean-URL copies at the clean slug
+  og-image      — replace the lovable.dev og:image placeholder
+  duplicate-og  — drop the generic OG/Twitter block from index.html
+  faq           — inject (or refresh) FAQPage JSON-LD in clean-URL (best-*) articles
+  related       — "Related guides" list + ItemList JSON-LD from related_articles.py
+  dead-links    — placeholder images / store-search or dropped product cards for
+                  the URLs check_links.py found dead
+  images        — responsive WebP/AVIF srcset from optimize_images.py's variants
+  svg-sprite    — hoist repeated lucide icons into one <symbol> sprite
+  shared-css    — move large inline <style> blocks to hashed shared files
+  minify        — collapse whitespace
+
+A file is written back only if its bytes changed. Files are spread across a
+process pool; bytes saved per page and per-transform timings are reported.
+
+Usage: python scripts/postprocess.py [--only faq,og-image] [--workers N] [files...]
+"""
+import os
+import sys
+import time
+import argparse
+from contextlib import nullcontext
+from concurrent.futures import ProcessPoolExecutor
+
+import article_index
+import check_links
+import metrics
+import optimize_images
+import precompress
+import related_articles
+from html_utils import parse_ld_json
+from fix_static_seo import fix_og_image, remove_generic_og
+from inject_faq_schema import inject_faq_html
+from migrate_to_clean_urls import SLUG_MAPPING, update_canonical_in_html
+from optimize_html import hoist_svg_sprite, externalize_styles, collapse_whitespace, kb
+
+ARTICLES_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "public", "articles")
+
+CLEAN_TO_DATED = {new: old for old, new in SLUG_MAPPING.items()}
+
+_image_manifest = None
+_related_graph = None
+_dead_links = None
+
+
+class Page:
+    """One article file, with its ld+json blocks parsed lazily and cached."""
+
+    def __init__(self, path, html):
+        self.path = path
+        self.slug = os.path.basename(path)[:-5]
+        self._html = html
+        self._ld_blocks = None
+
+    @property
+    def html(self):
+        return self._html
+
+    @html.setter
+    def html(self, value):
+        if value != self._html:
+            self._html = value
+            self._ld_blocks = None
+
+    @property
+    def ld_blocks(self):
+        if self._ld_blocks is None:
+            self._ld_blocks = parse_ld_json(self._html)
+        return self._ld_blocks
+
+
+# name → (transform, applies_to)
+TRANSFORMS = {}
+
+
+def transform(name, applies_to=None):
+    """
+    Registers `fn(page) -> change description or None`. Transforms run in
+    registration order; `applies_to(page)` can limit which files they see.
+    """
+    def register(fn):
+        TRANSFORMS[name] = (fn, applies_to)
+        return fn
+    return register
+
+
+def is_clean_url(page):
+    return page.slug.startswith("best-")
+
+
+@transform("canonical", applies_to=lambda page: page.slug in CLEAN_TO_DATED)
+def canonical_transform(page):
+    html = update_canonical_in_html(page.html, CLEAN_TO_DATED[page.slug], page.slug)
+    if html == page.html:
+        return None
+    page.html = html
+    return "canonical → clean URL"
+
+
+@transform("og-image")
+def og_image_transform(page):
+    html, change = fix_og_image(page.html, page.ld_blocks)
+    page.html = html
+    return change
+
+
+@transform("duplicate-og")
+def duplicate_og_transform(page):
+    html, change = remove_generic_og(page.html)
+    page.html = html
+    return change
+
+
+@transform("faq", applies_to=is_clean_url)
+def faq_transform(page):
+    blocks = page.ld_blocks
+    html, schema, message = inject_faq_html(page.html, blocks)
+    if schema is None:
+        return None
+    page.html = html
+    if message.startswith("injected"):
+        page._ld_blocks = blocks + [schema]
+    return message
+
+
+@transform("related")
+def related_transform(page):
+    global _related_graph
+    if _related_graph is None:
+        _related_graph = related_articles.load_graph()
+    if page.slug not in _related_graph:
+        return None
+    page.html, change = related_articles.inject_related(page.html, _related_graph[page.slug])
+    return change
+
+
+@transform("dead-links")
+def dead_links_transform(page):
+    global _dead_links
+    if _dead_links is None:
+        _dead_links = check_links.LinkCache().dead()
+    if not _dead_links:
+        return None
+    page.html, change = check_links.fix_dead_links(page.html, _dead_links)
+    return change
+
+
+@transform("images")
+def images_transform(page):
+    global _image_manifest
+    if _image_manifest is None:
+        _image_manifest = optimize_images.load_manifest()
+    page.html, count = optimize_images.responsive_img(page.html, _image_manifest)
+    return f"{count} images → srcset" if count else None
+
+
+@transform("svg-sprite")
+def svg_sprite_transform(page):
+    page.html, change = hoist_svg_sprite(page.html)
+    return change
+
+
+@transform("shared-css")
+def shared_css_transform(page):
+    page.html, change = externalize_styles(page.html)
+    return change
+
+
+@transform("minify")
+def minify_transform(page):
+    page.html, change = collapse_whitespace(page.html)
+    return change
+
+
+def process_file(path, only=None):
+    """
+    Runs the pipeline over one file.
+    Returns (filename, changes, timings_ms, original_bytes, bytes_written, index_entry);
+    index_entry is the rewritten page's article_index entry, else None.
+    """
+    with open(path, "rb") as f:
+        original = f.read()
+    page = Page(path, original.decode("utf-8"))
+
+    changes = []
+    timings = {}
+    for name, (fn, applies_to) in TRANSFORMS.items():
+        if only and name not in only:
+            continue
+        if applies_to and not applies_to(page):
+            continue
+        started = time.perf_counter()
+        change = fn(page)
+        timings[name] = (time.perf_counter() - started) * 1000
+        if change:
+            changes.append(f"{name}: {change}")
+
+    output = page.html.encode("utf-8")
+    if output == original:
+        return os.path.basename(path), changes, timings, len(original), 0, None
+
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "wb") as f:
+        f.write(output)
+    os.replace(tmp_path, path)
+    entry = article_index.page_entry(path, output, page.ld_blocks) if article_index.is_article_path(path) else None
+    return os.path.basename(path), changes, timings, len(original), len(output), entry
+
+
+def process_files(paths, only=None, workers=None):
+    """
+    Runs the pipeline over `paths` across a process pool, refreshes the
+    .br/.gz siblings of the files it rewrote, and prints a report.
+    Returns the number of files rewritten.
+    """
+    global _related_graph, _dead_links
+    _related_graph = None  # pick up the latest related_articles.refresh()
+    _dead_links = None  # and check_links.py results
+    totals = {name: 0.0 for name in TRANSFORMS}
+    counts = {name: 0 for name in TRANSFORMS}
+    changed = 0
+    written_paths = []
+    bytes_before = bytes_after = 0
+    index_entries = []
+    started = time.perf_counter()
+
+    # --workers 1 runs in this process, e.g. so --profile sees the transforms
+    with ProcessPoolExecutor(max_workers=workers) if workers != 1 else nullcontext() as pool:
+        if pool:
+            results = pool.map(process_file, paths, [only] * len(paths), chunksize=4)
+        else:
+            results = map(process_file, paths, [only] * len(paths))
+        for path, (filename, changes, timings, original_size, written, entry) in zip(paths, results):
+            for name, ms in timings.items():
+                totals[name] += ms
+                counts[name] += 1
+                metrics.observe("transform_seconds", ms / 1000, transform=name)
+            bytes_before += original_size
+            bytes_after += written or original_size
+            if entry:
+                index_entries.append(entry)
+            if written:
+                changed += 1
+                written_paths.append(path)
+                metrics.incr("files_rewritten")
+                metrics.incr("bytes_saved", original_size - written)
+                print(f"✅ {filename} ({kb(original_size)} → {kb(written)}, saved {kb(original_size - written)})")
+                for c in changes:
+                    print(f"   • {c}")
+
+    if index_entries:
+        article_index.default_index().put(index_entries)
+    if written_paths:
+        # generate_html.py compressed the pages before this rewrite
+        with metrics.phase("precompress"):
+            precompress.precompress(written_paths, workers=workers)
+
+    elapsed = time.perf_counter() - started
+    print(f"\nDone. {changed}/{len(paths)} files updated in {elapsed:.2f}s.")
+    print(f"Total size: {kb(bytes_before)} → {kb(bytes_after)} (saved {kb(bytes_before - bytes_after)})")
+    print("Per-transform timings:")
+    for name in TRANSFORMS:
+        if counts[name]:
+            print(f"   {name:<14} {totals[name]:8.1f} ms total, "
+                  f"{totals[name] / counts[name]:6.2f} ms/file over {counts[name]} files")
+    return changed
+
+
+def article_paths():
+    return [
+        os.path.join(ARTICLES_DIR, f)
+        for f in sorted(os.listdir(ARTICLES_DIR))
+        if f.endswith(".html")
+    ]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Post-process static article HTML in a single pass")
+    parser.add_argument("files", nargs="*", help="article files (default: all of public/articles)")
+    parser.add_argument("--only", help=f"comma-separated transforms to run ({', '.join(TRANSFORMS)})")
+    parser.add_argument("--workers", type=int, default=None, help="process pool size (default: CPU count)")
+    parser.add_argument("--profile", action="store_true",
+                        help="cProfile the run into .build/metrics/ (with --workers 1 to include the transforms)")
+    args = parser.parse_args()
+
+    only = None
+    if args.only:
+        only = set(args.only.split(","))
+        unknown = only - set(TRANSFORMS)
+        if unknown:
+            print(f"❌ Unknown transform(s): {', '.join(sorted(unknown))}")
+            sys.exit(1)
+
+    paths = [os.path.abspath(p) for p in args.files] or article_paths()
+    print(f"Post-processing {len(paths)} static article files...\n")
+    metrics.start("postprocess", profile=args.profile)
+    status = "error"
+    try:
+        if not only or "related" in only:
+            with metrics.phase("related"):
+                related_articles.refresh()
+        with metrics.phase("postprocess"):
+            process_files(paths, only, args.workers)
+        status = "ok"
+    finally:
+        metrics.finish(status)
+
+
+if __name__ == "__main__":
+    main()
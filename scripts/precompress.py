@@ -0,0 +1,146 @@
+"""
+Writes precompressed .br (Brotli, quality 11) and .gz (gzip -9) siblings
+for the static HTML/XML files in public/, for hosts that serve them by
+Accept-Encoding (nginx gzip_static/brotli_static, a CDN origin) without
+compressing per request. Vercel compresses on its own and never picks them
+up, so .vercelignore keeps them out of its deploys. A file is only recompressed when its content hash
+differs from the one recorded in .build/precompress.json (build state, so
+not in the deployed public/ tree; a cache left at the old public/ location
+is read once and removed on the next save).
+
+Usage: python scripts/precompress.py   (also run at the end of generate_html.py)
+"""
+import os
+import gzip
+import json
+import hashlib
+from concurrent.futures import ProcessPoolExecutor
+
+import brotli
+
+PROJECT_ROOT = os.path.abspath(os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+PUBLIC_DIR = os.path.join(PROJECT_ROOT, "public")
+ARTICLES_DIR = os.path.join(PUBLIC_DIR, "articles")
+CACHE_PATH = os.path.join(PROJECT_ROOT, ".build", "precompress.json")
+LEGACY_CACHE_PATH = os.path.join(PUBLIC_DIR, ".precompress.json")
+EXTENSIONS = (".html", ".xml")
+
+
+def kb(n):
+    return f"{n / 1024:.1f} KB"
+
+
+def target_paths():
+    """Every article page plus the sitemap XML files at the top of public/."""
+    paths = [
+        os.path.join(ARTICLES_DIR, f)
+        for f in sorted(os.listdir(ARTICLES_DIR))
+        if f.endswith(EXTENSIONS)
+    ]
+    paths += [
+        os.path.join(PUBLIC_DIR, f)
+        for f in sorted(os.listdir(PUBLIC_DIR))
+        if f.endswith(".xml")
+    ]
+    return paths
+
+
+def write_atomic(path, data):
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "wb") as f:
+        f.write(data)
+    os.replace(tmp_path, path)
+
+
+def compress_file(path):
+    """Writes path.gz and path.br. Returns (path, raw, gzip, brotli) sizes."""
+    with open(path, "rb") as f:
+        raw = f.read()
+    # mtime=0 keeps the gzip output byte-for-byte deterministic
+    gz = gzip.compress(raw, compresslevel=9, mtime=0)
+    br = brotli.compress(raw, quality=11, mode=brotli.MODE_TEXT)
+    write_atomic(f"{path}.gz", gz)
+    write_atomic(f"{path}.br", br)
+    return path, len(raw), len(gz), len(br)
+
+
+def sibling_sizes(path):
+    return os.path.getsize(path), os.path.getsize(f"{path}.gz"), os.path.getsize(f"{path}.br")
+
+
+def load_cache():
+    for path in (CACHE_PATH, LEGACY_CACHE_PATH):
+        if os.path.exists(path):
+            with open(path, "r", encoding="utf-8") as f:
+                return json.load(f)
+    return {}
+
+
+def save_cache(cache):
+    os.makedirs(os.path.dirname(CACHE_PATH), exist_ok=True)
+    write_atomic(CACHE_PATH, json.dumps(cache, indent=2, sort_keys=True).encode("utf-8"))
+    if os.path.exists(LEGACY_CACHE_PATH):
+        os.remove(LEGACY_CACHE_PATH)
+
+
+def file_hash(path):
+    with open(path, "rb") as f:
+        return hashlib.sha256(f.read()).hexdigest()
+
+
+def precompress(paths=None, workers=None):
+    """
+    Compresses every changed file in `paths` (default: target_paths()).
+    Returns {path: (raw, gzip, brotli)} for all of them.
+    """
+    paths = paths or target_paths()
+    cache = load_cache()
+    hashes = {path: file_hash(path) for path in paths}
+
+    def key(path):
+        return os.path.relpath(path, PUBLIC_DIR)
+
+    stale = [
+        path for path in paths
+        if cache.get(key(path)) != hashes[path]
+        or not os.path.exists(f"{path}.gz")
+        or not os.path.exists(f"{path}.br")
+    ]
+
+    sizes = {}
+    if stale:
+        print(f"🗜  Compressing {len(stale)} of {len(paths)} files ({len(paths) - len(stale)} unchanged)...")
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            for path, raw, gz, br in pool.map(compress_file, stale):
+                sizes[path] = (raw, gz, br)
+                cache[key(path)] = hashes[path]
+        save_cache(cache)
+    else:
+        print(f"🗜  All {len(paths)} precompressed files are up to date.")
+
+    for path in paths:
+        if path not in sizes:
+            sizes[path] = sibling_sizes(path)
+    return sizes
+
+
+def print_size_report(sizes):
+    articles = {p: s for p, s in sizes.items() if os.path.dirname(p) == ARTICLES_DIR}
+    for label, group in (("public/articles", articles), ("all files", sizes)):
+        raw = sum(s[0] for s in group.values())
+        gz = sum(s[1] for s in group.values())
+        br = sum(s[2] for s in group.values())
+        if not raw:
+            continue
+        print(f"   {label} ({len(group)} files): raw {kb(raw)}, "
+              f"gzip {kb(gz)} ({gz / raw:.1%}), brotli {kb(br)} ({br / raw:.1%})")
+
+
+def main():
+    sizes = precompress()
+    print("📦 Size report:")
+    print_size_report(sizes)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,498 @@
+"""
+Batch price-alert evaluator.
+Replaces the per-alert loop in the send-price-alert edge function (one
+price query and one email call per alert) with a bulk pass:
+
+  1. load every enabled price_alerts row, the opted-in profiles and the
+     products in a handful of paged queries
+  2. take each product's current price from the price_analytics rollups
+     (cached; only recomputed after the scraper writes new history); a
+     product whose newest reading has no price is out of stock and skipped
+  3. join on product_id: alerts are indexed by product with their targets
+     sorted, so each product's triggered alerts are one bisect away
+  4. POST the triggered alerts to the edge function in batches of up to
+     ALERT_BATCH_SIZE ({"alerts": [...]}, one Resend batch call each,
+     made with the batch's Idempotency-Key),
+     ALERT_WORKERS at a time, throttled to ALERT_RATE requests per second
+  5. PATCH last_notified_at for every alert that was sent
+
+Every notification has an idempotency key (alert id, target price, current
+price) recorded in .build/price_alerts.sqlite before it is sent, so a rerun
+never sends the same alert at the same price twice; a further price drop or
+a new target re-arms it. Alerts notified in the last COOLDOWN_HOURS are
+skipped, as in the edge function. Keys left "pending" by an interrupted
+run are not resent unless --retry-pending is given.
+
+price_alerts and profiles are behind RLS: run with a service-role key in
+SUPABASE_ANON_KEY. PRICE_ALERT_ENDPOINT overrides the function URL.
+
+`--stub N` runs the whole pipeline twice against a local stub of Supabase
+and the function endpoint holding N synthetic alerts, and checks that the
+second run sends nothing.
+
+Usage: python scripts/price_alert_batch.py [--dry-run] [--retry-pending] [--stub 100000]
+"""
+import os
+import sys
+import json
+import time
+import random
+import sqlite3
+import hashlib
+import argparse
+import tempfile
+import threading
+from bisect import bisect_left
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from datetime import datetime, timedelta, timezone
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qsl, urlsplit
+
+import requests
+
+import metrics
+import price_analytics
+import supabase_client
+from http_renderer import SITE_URL
+
+PROJECT_ROOT = os.path.abspath(os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+LEDGER_PATH = os.path.join(PROJECT_ROOT, ".build", "price_alerts.sqlite")
+
+ALERT_BATCH_SIZE = int(os.environ.get("ALERT_BATCH_SIZE", "100"))   # Resend's batch limit
+ALERT_WORKERS = int(os.environ.get("ALERT_WORKERS", "4"))
+ALERT_RATE = float(os.environ.get("ALERT_RATE", "2"))               # requests/second
+COOLDOWN_HOURS = 24
+SEND_TIMEOUT = (5, 60)
+
+
+def endpoint():
+    return os.environ.get("PRICE_ALERT_ENDPOINT", f"{supabase_client.SUPABASE_URL}/functions/v1/send-price-alert")
+
+
+# --- Loading ---
+
+def load_alerts():
+    return supabase_client.get_all("price_alerts", {
+        "select": "id,user_id,product_id,target_price,last_notified_at",
+        "alert_enabled": "eq.true",
+        "order": "id.asc",
+    })
+
+
+def load_profiles():
+    """{user id: email} for users who want price-drop emails."""
+    rows = supabase_client.get_all("profiles", {
+        "select": "id,email",
+        "email_notifications": "eq.true",
+        "price_drop_alerts": "eq.true",
+        "order": "id.asc",
+    })
+    return {row["id"]: row["email"] for row in rows if row.get("email")}
+
+
+def load_products():
+    rows = supabase_client.get_all("products", {
+        "select": "id,name,slug,amazon_link,flipkart_link",
+        "order": "id.asc",
+    })
+    return {str(row["id"]): row for row in rows}
+
+
+def product_url(product):
+    if product.get("slug"):
+        return f"{SITE_URL}/product/{product['slug']}"
+    return product.get("amazon_link") or product.get("flipkart_link") or SITE_URL
+
+
+# --- Evaluation ---
+
+def index_alerts(alerts):
+    """{product_id: (targets ascending, alerts in the same order)}."""
+    by_product = {}
+    for alert in alerts:
+        by_product.setdefault(str(alert["product_id"]), []).append(alert)
+    index = {}
+    for product_id, group in by_product.items():
+        group.sort(key=lambda a: a["target_price"])
+        index[product_id] = ([a["target_price"] for a in group], group)
+    return index
+
+
+def recently_notified(alert, cutoff):
+    notified = alert.get("last_notified_at")
+    return bool(notified) and datetime.fromisoformat(notified.replace("Z", "+00:00")) > cutoff
+
+
+def idempotency_key(alert_id, target_price, current_price):
+    return hashlib.sha256(f"{alert_id}:{target_price}:{current_price}".encode("utf-8")).hexdigest()
+
+
+def evaluate(alerts, rollups, products, emails, now=None):
+    """
+    Returns (notifications, skipped) where each notification is
+    {"key", "alert_id", "payload"} and skipped counts why alerts were left out.
+    """
+    cutoff = (now or datetime.now(timezone.utc)) - timedelta(hours=COOLDOWN_HOURS)
+    skipped = {"no price": 0, "out of stock": 0, "opted out": 0, "cooldown": 0}
+    notifications = []
+    for product_id, (targets, group) in index_alerts(alerts).items():
+        rollup = rollups.get(product_id)
+        product = products.get(product_id)
+        if not rollup or rollup["current"] is None or not product:
+            skipped["no price"] += len(group)
+            continue
+        if not rollup.get("latest_priced"):
+            # `current` is the last price seen before the product went out of stock
+            skipped["out of stock"] += len(group)
+            continue
+        current = rollup["current"]
+        for alert in group[bisect_left(targets, current):]:
+            email = emails.get(alert["user_id"])
+            if not email:
+                skipped["opted out"] += 1
+                continue
+            if recently_notified(alert, cutoff):
+                skipped["cooldown"] += 1
+                continue
+            notifications.append({
+                "key": idempotency_key(alert["id"], alert["target_price"], current),
+                "alert_id": alert["id"],
+                "payload": {
+                    "userId": alert["user_id"],
+                    "productName": product["name"],
+                    "targetPrice": alert["target_price"],
+                    "currentPrice": current,
+                    "productUrl": product_url(product),
+                    "userEmail": email,
+                },
+            })
+    return notifications, skipped
+
+
+# --- Idempotency ledger ---
+
+def open_ledger(path=LEDGER_PATH):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    db = sqlite3.connect(path, check_same_thread=False)
+    db.execute("""
+        CREATE TABLE IF NOT EXISTS notifications (
+            key TEXT PRIMARY KEY,
+            alert_id TEXT NOT NULL,
+            status TEXT NOT NULL,
+            updated_at TEXT NOT NULL
+        )
+    """)
+    return db
+
+
+def ledger_statuses(db, keys):
+    statuses = {}
+    keys = list(keys)
+    for i in range(0, len(keys), 500):
+        batch = keys[i:i + 500]
+        placeholders = ",".join("?" * len(batch))
+        statuses.update(db.execute(
+            f"SELECT key, status FROM notifications WHERE key IN ({placeholders})", batch
+        ).fetchall())
+    return statuses
+
+
+def set_status(db, lock, notifications, status):
+    stamp = datetime.now(timezone.utc).isoformat(timespec="seconds")
+    with lock:
+        db.executemany(
+            "INSERT INTO notifications (key, alert_id, status, updated_at) VALUES (?, ?, ?, ?) "
+            "ON CONFLICT(key) DO UPDATE SET status = excluded.status, updated_at = excluded.updated_at",
+            [(n["key"], str(n["alert_id"]), status, stamp) for n in notifications],
+        )
+        db.commit()
+
+
+def forget(db, lock, notifications):
+    with lock:
+        db.executemany("DELETE FROM notifications WHERE key = ?", [(n["key"],) for n in notifications])
+        db.commit()
+
+
+# --- Dispatch ---
+
+class RateLimiter:
+    """Token bucket shared by the dispatch threads."""
+
+    def __init__(self, rate, burst=1):
+        self.rate = rate
+        self.capacity = max(burst, 1)
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+        self.lock = threading.Lock()
+
+    def acquire(self):
+        while True:
+            with self.lock:
+                now = time.monotonic()
+                self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+                self.updated = now
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                wait = (1 - self.tokens) / self.rate
+            time.sleep(wait)
+
+
+def send_batch(batch, limiter):
+    """
+    POSTs one batch. Returns "sent", "rejected" (the function answered with
+    an error, so nothing went out) or "unknown" (no answer).
+    """
+    limiter.acquire()
+    body = {"alerts": [dict(n["payload"], idempotencyKey=n["key"]) for n in batch]}
+    batch_key = hashlib.sha256("".join(n["key"] for n in batch).encode("utf-8")).hexdigest()
+    try:
+        response = supabase_client.get_session().post(
+            endpoint(),
+            headers=supabase_client.headers({"Idempotency-Key": batch_key}),
+            json=body,
+            timeout=SEND_TIMEOUT,
+        )
+    except requests.RequestException as e:
+        print(f"   ⚠ Batch of {len(batch)} got no response: {e}")
+        return "unknown"
+    if response.ok:
+        return "sent"
+    print(f"   ⚠ Batch of {len(batch)} rejected: {response.status_code} {response.text[:200]}")
+    return "rejected"
+
+
+def dispatch(notifications, db, workers=ALERT_WORKERS, batch_size=ALERT_BATCH_SIZE, rate=None):
+    """Sends every notification; returns {"sent": [...], "rejected": [...], "unknown": [...]}."""
+    lock = threading.Lock()
+    limiter = RateLimiter(rate or ALERT_RATE, burst=workers)
+    batches = [notifications[i:i + batch_size] for i in range(0, len(notifications), batch_size)]
+    results = {"sent": [], "rejected": [], "unknown": []}
+
+    # Recorded before sending: a crash mid-run leaves them pending, not unsent
+    set_status(db, lock, notifications, "pending")
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        futures = {pool.submit(send_batch, batch, limiter): batch for batch in batches}
+        for future in as_completed(futures):
+            batch = futures[future]
+            outcome = future.result()
+            if outcome == "sent":
+                set_status(db, lock, batch, "sent")
+            elif outcome == "rejected":
+                forget(db, lock, batch)
+            results[outcome].extend(batch)
+    return results
+
+
+# --- Run ---
+
+def run(dry_run=False, retry_pending=False, ledger_path=LEDGER_PATH):
+    started = time.perf_counter()
+    analytics = price_analytics.refresh()
+    alerts = load_alerts()
+    emails = load_profiles()
+    products = load_products()
+    loaded = time.perf_counter()
+    print(f"🔔 {len(alerts):,} active alerts, {len(emails):,} opted-in users, {len(products):,} products "
+          f"(loaded in {loaded - started:.1f}s)")
+
+    notifications, skipped = evaluate(alerts, analytics["products"], products, emails)
+    evaluated = time.perf_counter()
+    metrics.observe("alert_phase_seconds", loaded - started, phase="load")
+    metrics.observe("alert_phase_seconds", evaluated - loaded, phase="evaluate")
+    metrics.incr("alerts_active", len(alerts))
+    metrics.incr("alerts_triggered", len(notifications))
+    for why, count in skipped.items():
+        metrics.incr("alerts_skipped", count, reason=why)
+
+    db = open_ledger(ledger_path)
+    statuses = ledger_statuses(db, (n["key"] for n in notifications))
+    already_sent = sum(1 for n in notifications if statuses.get(n["key"]) == "sent")
+    pending = sum(1 for n in notifications if statuses.get(n["key"]) == "pending")
+    allowed = {None, "pending"} if retry_pending else {None}
+    due = [n for n in notifications if statuses.get(n["key"]) in allowed]
+
+    skip_summary = ", ".join(f"{count:,} {why}" for why, count in skipped.items() if count)
+    print(f"   {len(notifications):,} at or below target, {len(due):,} due "
+          f"({already_sent:,} already sent{f', {skip_summary}' if skip_summary else ''}) "
+          f"— evaluated in {(evaluated - loaded) * 1000:.0f} ms")
+    if pending and not retry_pending:
+        print(f"   ⚠ {pending:,} alerts are pending from an interrupted run; --retry-pending resends them")
+
+    if dry_run or not due:
+        db.close()
+        return {"due": len(due), "sent": 0, "failed": 0}
+
+    results = dispatch(due, db)
+    dispatched = time.perf_counter()
+    db.close()
+
+    sent_ids = [n["alert_id"] for n in results["sent"]]
+    stamp = datetime.now(timezone.utc).isoformat()
+    _, patch_failed = supabase_client.patch_in("price_alerts", "id", sent_ids, {"last_notified_at": stamp})
+
+    failed = len(results["rejected"]) + len(results["unknown"])
+    metrics.observe("alert_phase_seconds", dispatched - evaluated, phase="dispatch")
+    metrics.incr("alerts_sent", len(sent_ids))
+    for outcome in ("rejected", "unknown"):
+        if results[outcome]:
+            metrics.incr("alert_send_failures", len(results[outcome]), cause=outcome)
+    print(f"📧 Sent {len(sent_ids):,} alerts in {(dispatched - evaluated):.1f}s"
+          f"{f', {failed:,} failed' if failed else ''}")
+    if results["unknown"]:
+        print(f"   ⚠ {len(results['unknown']):,} left pending (no response — may or may not have been delivered)")
+    if patch_failed:
+        print(f"   ⚠ last_notified_at not updated for {len(patch_failed):,} alerts")
+    return {"due": len(due), "sent": len(sent_ids), "failed": failed}
+
+
+# --- Local stub ---
+
+def synthetic_tables(alert_count, product_count=500, user_count=None):
+    rng = random.Random(7)
+    user_count = user_count or max(alert_count // 3, 1)
+    now = datetime.now(timezone.utc)
+    products = [
+        {"id": f"p{i}", "name": f"Product {i}", "slug": f"product-{i}",
+         "amazon_link": f"https://amazon.example/{i}", "flipkart_link": None}
+        for i in range(product_count)
+    ]
+    history = []
+    for i, product in enumerate(products):
+        base = rng.randint(2000, 60000)
+        for day in range(5, -1, -1):
+            history.append({
+                "id": len(history), "product_id": product["id"],
+                "created_at": (now - timedelta(days=day)).strftime("%Y-%m-%dT%H:%M:%S+00:00"),
+                "amazon_price": None if day == 0 and i % 25 == 0 else round(base * rng.uniform(0.85, 1.1)),
+                "flipkart_price": None if i % 3 or (day == 0 and i % 25 == 0) else round(base * rng.uniform(0.85, 1.1)),
+            })
+    profiles = [
+        {"id": f"u{i}", "email": f"user{i}@example.com",
+         "email_notifications": True, "price_drop_alerts": i % 10 != 0}
+        for i in range(user_count)
+    ]
+    priced = [row for row in history if row["amazon_price"]]
+    alerts = []
+    for i in range(alert_count):
+        product = priced[rng.randrange(len(priced))]
+        alerts.append({
+            "id": f"a{i}", "user_id": f"u{rng.randrange(user_count)}", "product_id": product["product_id"],
+            "target_price": round(product["amazon_price"] * rng.uniform(0.8, 1.2)),
+            "alert_enabled": i % 20 != 0, "last_notified_at": None,
+        })
+    return {"products": products, "product_price_history": history, "profiles": profiles, "price_alerts": alerts}
+
+
+def matches(row, filters):
+    return all(str(row.get(column)).lower() == value[3:].lower() for column, value in filters)
+
+
+def make_stub_handler(tables, received):
+    filtered = {}
+
+    def select(table, params):
+        """Rows matching the eq. filters, memoised so paging stays linear."""
+        cache_key = (table, tuple(params))
+        if cache_key not in filtered:
+            rows = [row for row in tables[table] if matches(row, [(k, v) for k, v in params if v.startswith("eq.")])]
+            if dict(params).get("order", "").endswith(".desc"):
+                rows = rows[::-1]
+            filtered[cache_key] = rows
+        return filtered[cache_key]
+
+    class StubHandler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+
+        def log_message(self, format, *args):
+            pass
+
+        def send(self, status, body=b""):
+            self.send_response(status)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def read_body(self):
+            return self.rfile.read(int(self.headers.get("Content-Length") or 0))
+
+        def do_GET(self):
+            url = urlsplit(self.path)
+            table = url.path[len("/rest/v1/"):]
+            if table not in tables:
+                return self.send(404, b"[]")
+            rows = select(table, parse_qsl(url.query))
+            start, _, end = self.headers.get("Range", "").partition("-")
+            if end:
+                rows = rows[int(start):int(end) + 1]
+            self.send(200, json.dumps(rows).encode("utf-8"))
+
+        def do_PATCH(self):
+            self.read_body()
+            self.send(204)
+
+        def do_POST(self):
+            alerts = json.loads(self.read_body())["alerts"]
+            with received["lock"]:
+                received["requests"] += 1
+                for alert in alerts:
+                    received["keys"][alert["idempotencyKey"]] = received["keys"].get(alert["idempotencyKey"], 0) + 1
+            self.send(200, json.dumps({"success": True, "sent": len(alerts)}).encode("utf-8"))
+
+    return StubHandler
+
+
+def run_stub(alert_count):
+    tables = synthetic_tables(alert_count)
+    received = {"lock": threading.Lock(), "requests": 0, "keys": {}}
+    server = ThreadingHTTPServer(("127.0.0.1", 0), make_stub_handler(tables, received))
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, name="stub-server", daemon=True).start()
+    stub_url = f"http://127.0.0.1:{server.server_address[1]}"
+    print(f"🧪 Stub server at {stub_url} ({alert_count:,} alerts)\n")
+
+    # Keep the stub's cache and ledger away from the real ones
+    workdir = tempfile.mkdtemp(prefix="apnilist-alerts-")
+    supabase_client.SUPABASE_URL = stub_url
+    price_analytics.CACHE_PATH = os.path.join(workdir, "price_analytics.json")
+    os.environ.setdefault("PRICE_ALERT_ENDPOINT", f"{stub_url}/functions/v1/send-price-alert")
+    ledger_path = os.path.join(workdir, "price_alerts.sqlite")
+
+    global ALERT_RATE
+    ALERT_RATE = float(os.environ.get("ALERT_RATE", "1000"))
+    first = run(ledger_path=ledger_path)
+    print()
+    second = run(ledger_path=ledger_path)
+    server.shutdown()
+
+    duplicates = sum(1 for count in received["keys"].values() if count > 1)
+    print(f"\n🧪 {received['requests']:,} requests, {len(received['keys']):,} distinct alerts received, "
+          f"{duplicates} sent twice; rerun sent {second['sent']}")
+    return 0 if duplicates == 0 and second["sent"] == 0 and first["failed"] == 0 else 1
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Evaluate every price alert and send notifications in batches")
+    parser.add_argument("--dry-run", action="store_true", help="evaluate and report without sending")
+    parser.add_argument("--retry-pending", action="store_true",
+                        help="resend alerts left pending by an interrupted run")
+    parser.add_argument("--stub", type=int, metavar="N",
+                        help="run twice against a local stub with N synthetic alerts")
+    args = parser.parse_args()
+
+    if args.stub:
+        return run_stub(args.stub)
+    metrics.start("price_alert_batch")
+    status = "error"
+    try:
+        result = run(dry_run=args.dry_run, retry_pending=args.retry_pending)
+        status = "ok" if result["failed"] == 0 else "failed"
+    finally:
+        metrics.finish(status)
+    return 0 if result["failed"] == 0 else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,297 @@
+"""
+Vectorised price-history analytics.
+Streams product_price_history into columnar NumPy arrays (product index,
+timestamp, best price) and computes every product's rollup in one pass:
+
+  current, min, max, median, observations
+  latest_priced     the newest reading has a price (not out of stock)
+  min / avg over the last 7, 30 and 90 days
+  drop_pct_30d      current price vs the 30-day high
+  lowest_in_days    current price is the lowest for this many days
+  all_time_low      current price is the lowest ever tracked
+
+"Best price" is the cheaper of the positive Amazon/Flipkart prices of a
+reading. Windows are measured back from each product's own newest reading,
+so a product's rollup only changes when its own history does (the page
+generators hash it into their build manifests).
+
+Rollups are cached in .build/price_analytics.json, keyed by the newest
+created_at in product_price_history (and ROLLUP_VERSION), so they are only
+recomputed after the price scraper has written new rows. The FAQ, article and product page
+generators read the cache with load_cached().
+
+Usage: python scripts/price_analytics.py [--refresh]
+"""
+import os
+import json
+import time
+import argparse
+
+import numpy as np
+
+import metrics
+import supabase_client
+
+PROJECT_ROOT = os.path.abspath(os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+CACHE_PATH = os.path.join(PROJECT_ROOT, ".build", "price_analytics.json")
+
+HISTORY_COLUMNS = "id,product_id,created_at,amazon_price,flipkart_price"
+WINDOWS = (7, 30, 90)
+SECONDS_PER_DAY = 86400
+
+# Bump when the rollup fields change, so a cache from an older run is recomputed
+ROLLUP_VERSION = 3
+
+_cached = None
+
+
+def latest_change():
+    """Newest created_at in product_price_history — the cache key."""
+    rows = supabase_client.get("product_price_history", {
+        "select": "created_at",
+        "order": "created_at.desc",
+        "limit": "1",
+    })
+    return rows[0]["created_at"] if rows else None
+
+
+def page_columns(page):
+    """
+    One page of history rows → (product_ids, seconds, best_price) arrays,
+    each filled in a single np.fromiter pass.
+    """
+    count = len(page)
+    product_ids = np.fromiter((row["product_id"] for row in page), dtype=object, count=count)
+    # ISO-8601 UTC timestamps (as returned by PostgREST), truncated to the second
+    seconds = np.fromiter((row["created_at"][:19] for row in page), dtype="datetime64[s]", count=count)
+    # Missing and zero prices both become NaN, so fmin picks the other vendor's
+    amazon = np.fromiter((row["amazon_price"] or np.nan for row in page), dtype=np.float64, count=count)
+    flipkart = np.fromiter((row["flipkart_price"] or np.nan for row in page), dtype=np.float64, count=count)
+    amazon[amazon < 0] = np.nan
+    flipkart[flipkart < 0] = np.nan
+    return product_ids, seconds.astype(np.int64), np.fmin(amazon, flipkart)
+
+
+def load_columns():
+    """
+    Streams the history a keyset page (on id) at a time into (product_ids,
+    product_index, seconds, best_price) arrays without keeping the row
+    dicts around.
+    """
+    id_chunks, second_chunks, price_chunks = [], [], []
+    for page in supabase_client.iter_keyset("product_price_history", {"select": HISTORY_COLUMNS}, column="id"):
+        product_ids, seconds, prices = page_columns(page)
+        id_chunks.append(product_ids)
+        second_chunks.append(seconds)
+        price_chunks.append(prices)
+
+    if not id_chunks:
+        return np.array([], dtype=object), np.array([], dtype=np.int64), np.array([], dtype=np.int64), np.array([])
+    product_ids, product_index = np.unique(np.concatenate(id_chunks).astype(str), return_inverse=True)
+    return product_ids, product_index, np.concatenate(second_chunks), np.concatenate(price_chunks)
+
+
+def run_starts(sorted_index):
+    """Mask of the first position of each product in an array sorted by product index."""
+    return np.r_[True, sorted_index[1:] != sorted_index[:-1]]
+
+
+def compute_rollups(product_ids, product_index, seconds, prices):
+    """
+    One vectorised pass over every reading. Returns (as_of, {product_id: rollup}).
+    Products with no priced reading at all are left out.
+    """
+    if not len(prices):
+        return None, {}
+
+    # Sort by product, then time, on one int64 key; `starts` delimits each product's run
+    span = int(seconds.max() - seconds.min()) + 1
+    order = np.argsort(product_index * span + (seconds - seconds.min()))
+    index, seconds, prices = product_index[order], seconds[order], prices[order]
+    is_start = run_starts(index)
+    starts = np.flatnonzero(is_start)
+    products = index[starts]
+    valid = ~np.isnan(prices)
+    positions = np.arange(len(prices))
+    as_of = seconds.max()
+
+    counts = np.add.reduceat(valid.astype(np.int64), starts)
+    lows = np.fmin.reduceat(prices, starts)
+    highs = np.fmax.reduceat(prices, starts)
+    first_seen = seconds[starts]
+    last_seen = np.maximum.reduceat(seconds, starts)
+    group_of_row = np.cumsum(is_start) - 1
+    anchor = last_seen[group_of_row]
+
+    # Current price: the newest reading that has one
+    last_valid = np.maximum.reduceat(np.where(valid, positions, -1), starts)
+    current = np.where(last_valid >= 0, prices[np.maximum(last_valid, 0)], np.nan)
+    ends = np.r_[starts[1:], len(prices)] - 1
+
+    # Median: re-sort each product's prices (NaN last) and take the middle
+    price_span = np.nanmax(prices) + 1
+    by_price = np.argsort(index * price_span + np.where(valid, prices, price_span - 0.5))
+    sorted_prices = prices[by_price]
+    lo_mid = starts + np.maximum(counts - 1, 0) // 2
+    hi_mid = starts + counts // 2
+    hi_mid = np.where(counts > 0, hi_mid, starts)
+    median = np.where(counts > 0, (sorted_prices[lo_mid] + sorted_prices[hi_mid]) / 2, np.nan)
+
+    windows = {}
+    for days in WINDOWS:
+        in_window = valid & (seconds >= anchor - days * SECONDS_PER_DAY)
+        windowed = np.where(in_window, prices, np.nan)
+        n = np.add.reduceat(in_window.astype(np.int64), starts)
+        total = np.add.reduceat(np.where(in_window, prices, 0.0), starts)
+        windows[days] = {
+            "min": np.fmin.reduceat(windowed, starts),
+            "max": np.fmax.reduceat(windowed, starts),
+            "avg": np.divide(total, n, out=np.full(len(n), np.nan), where=n > 0),
+        }
+
+    # Lowest in N days: time since the last reading cheaper than today's price
+    cheaper = valid & (prices < current[group_of_row])
+    last_cheaper = np.maximum.reduceat(np.where(cheaper, positions, -1), starts)
+    since = np.where(last_cheaper >= 0, seconds[np.maximum(last_cheaper, 0)], first_seen)
+    lowest_in_days = (last_seen - since) // SECONDS_PER_DAY
+
+    high_30 = windows[30]["max"]
+    drop_pct = np.where(high_30 > 0, (high_30 - current) / high_30 * 100, np.nan)
+
+    def number(value, digits=2):
+        return None if np.isnan(value) else round(float(value), digits)
+
+    rollups = {}
+    for g in np.flatnonzero(counts > 0):
+        rollup = {
+            "current": number(current[g]),
+            "latest_priced": bool(last_valid[g] == ends[g]),
+            "min": number(lows[g]),
+            "max": number(highs[g]),
+            "median": number(median[g]),
+            "observations": int(counts[g]),
+            "first_seen": str(np.datetime64(int(first_seen[g]), "s")),
+            "last_seen": str(np.datetime64(int(last_seen[g]), "s")),
+            "drop_pct_30d": number(drop_pct[g], 1),
+            "lowest_in_days": int(lowest_in_days[g]),
+            "all_time_low": bool(last_cheaper[g] < 0),
+        }
+        for days, stats in windows.items():
+            rollup[f"min_{days}d"] = number(stats["min"][g])
+            rollup[f"avg_{days}d"] = number(stats["avg"][g])
+        rollups[str(product_ids[products[g]])] = rollup
+    return str(np.datetime64(int(as_of), "s")), rollups
+
+
+def unique_keys(pairs):
+    """{key: id} from (key, id) pairs, leaving out keys shared by several ids."""
+    ids = {}
+    for key, product_id in pairs:
+        ids.setdefault(key, set()).add(product_id)
+    return {key: found.pop() for key, found in ids.items() if len(found) == 1}
+
+
+def product_keys():
+    """
+    ({lowercased name: id}, {store link: id}), for pages that only carry a
+    product's name and offer URL. A name or link that several products share
+    is left out rather than resolved to whichever product came last.
+    """
+    rows = supabase_client.get_all("products", {
+        "select": "id,name,amazon_link,flipkart_link",
+        "order": "id.asc",
+    })
+    names = unique_keys((row["name"].strip().lower(), row["id"]) for row in rows if row.get("name"))
+    links = unique_keys(
+        (row[column].strip(), row["id"])
+        for row in rows
+        for column in ("amazon_link", "flipkart_link")
+        if row.get(column)
+    )
+    ambiguous = len({row["name"].strip().lower() for row in rows if row.get("name")}) - len(names)
+    if ambiguous:
+        print(f"   ⚠ {ambiguous} product name(s) belong to several products — matched by offer link only")
+    return names, links
+
+
+def read_cache():
+    if not os.path.exists(CACHE_PATH):
+        return None
+    with open(CACHE_PATH, "r", encoding="utf-8") as f:
+        return json.load(f)
+
+
+def write_cache(analytics):
+    os.makedirs(os.path.dirname(CACHE_PATH), exist_ok=True)
+    tmp_path = f"{CACHE_PATH}.tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(analytics, f)
+    os.replace(tmp_path, CACHE_PATH)
+
+
+def refresh(force=False):
+    """
+    Returns the analytics, recomputing them only if product_price_history
+    has changed since the cache was written.
+    """
+    global _cached
+    key = latest_change()
+    cached = read_cache()
+    if cached and cached.get("key") == key and cached.get("version") == ROLLUP_VERSION and not force:
+        metrics.incr("price_analytics_cache", result="hit")
+        print(f"📈 Price analytics up to date ({len(cached['products'])} products, as of {cached['as_of']})")
+        _cached = cached
+        return cached
+
+    started = time.perf_counter()
+    columns = load_columns()
+    loaded = time.perf_counter()
+    as_of, rollups = compute_rollups(*columns)
+    computed = time.perf_counter()
+    metrics.incr("price_analytics_cache", result="miss")
+    metrics.observe("price_analytics_seconds", loaded - started, step="load")
+    metrics.observe("price_analytics_seconds", computed - loaded, step="compute")
+    names, links = product_keys()
+    analytics = {"key": key, "version": ROLLUP_VERSION, "as_of": as_of, "products": rollups,
+                 "names": names, "links": links}
+    write_cache(analytics)
+    print(f"📈 Price analytics: {len(columns[2]):,} readings → {len(rollups)} products "
+          f"(load {loaded - started:.1f}s, compute {(computed - loaded) * 1000:.0f} ms)")
+    _cached = analytics
+    return analytics
+
+
+def load_cached():
+    """The cached analytics without touching the network (None if never computed)."""
+    global _cached
+    if _cached is None:
+        _cached = read_cache()
+    return _cached
+
+
+def rollup_for(product_id=None, name=None, url=None):
+    """
+    Looks a product's rollup up by id or, for pages that only have JSON-LD,
+    by its offer URL (a store link) and then its name.
+    """
+    analytics = load_cached()
+    if not analytics:
+        return None
+    if product_id is None and url:
+        product_id = analytics["links"].get(url.strip())
+    if product_id is None and name:
+        product_id = analytics["names"].get(name.strip().lower())
+    return analytics["products"].get(str(product_id)) if product_id is not None else None
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compute per-product price-history rollups")
+    parser.add_argument("--refresh", action="store_true", help="recompute even if the cache is current")
+    args = parser.parse_args()
+    analytics = refresh(force=args.refresh)
+    at_low = sum(1 for r in analytics["products"].values() if r["all_time_low"])
+    print(f"   {at_low} products are at their all-time low")
+
+
+if __name__ == "__main__":
+    main()
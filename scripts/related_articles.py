@@ -0,0 +1,345 @@
+"""
+Precomputed "Related guides" for every article page.
+
+Each indexed article (article_index.py) is vectorised as TF-IDF over its
+title, slug, JSON-LD keywords and product names, and the top RELATED_K most
+similar articles are found for all of them at once: a sparse X·Xᵀ over the
+terms' postings, accumulated BLOCK_SIZE rows at a time with np.bincount.
+Terms used by only one article, or by too many (MAX_DF_*), are left out of
+the product, which keeps it to about a second at 10k articles.
+
+The graph is saved to .build/related.json, and each page's term counts
+(keyed by its output hash) to .build/related_terms.json, so only changed
+pages are re-tokenised. postprocess.py's `related` transform renders the
+graph into each page as a "Related guides" list plus an ItemList JSON-LD
+block. refresh() returns only the slugs whose related list changed, so
+adding an article rewrites just the pages that now link to it.
+
+Redirected originals (slug store) are left out of the graph.
+
+Usage: python scripts/related_articles.py [--dry-run]
+"""
+import os
+import re
+import sys
+import html
+import json
+import time
+import argparse
+
+import numpy as np
+
+import article_index
+import slug_redirects
+
+PROJECT_ROOT = os.path.abspath(os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+GRAPH_PATH = os.path.join(PROJECT_ROOT, ".build", "related.json")
+TERMS_PATH = os.path.join(PROJECT_ROOT, ".build", "related_terms.json")
+SITE_URL = "https://www.apnilist.co.in"
+
+RELATED_K = int(os.environ.get("RELATED_K", "4"))
+# Pairs scoring below this are not worth linking
+MIN_SCORE = 0.08
+# Terms in more than this share of articles (and more than MAX_DF_FLOOR of
+# them) are too generic to relate anything; they also dominate the cost
+MAX_DF_RATIO = 0.01
+MAX_DF_FLOOR = 50
+BLOCK_SIZE = 256
+
+FIELD_WEIGHTS = {"title": 2.0, "slug": 1.0, "keywords": 1.0, "products": 0.5}
+TOKEN_PATTERN = re.compile(r"[a-z][a-z0-9]+|\d{3,}")
+STOPWORDS = {
+    "a", "an", "and", "best", "buy", "buying", "by", "for", "from", "guide", "in", "india", "indian", "is",
+    "of", "on", "or", "the", "to", "top", "under", "vs", "with", "your",
+}
+
+RELATED_JSON_LD_PREFIX = ('<script type="application/ld+json">'
+                          '{"@context": "https://schema.org", "@type": "ItemList", "name": "Related guides"')
+RELATED_JSON_LD_PATTERN = re.compile(re.escape(RELATED_JSON_LD_PREFIX) + r".*?</script>\n?", re.DOTALL)
+# The React aside's box: either the client-side list or its empty state
+RELATED_BOX_PATTERN = re.compile(
+    r'(<h2[^>]*>)Related (?:Articles|guides)</h2>'
+    r'(?:<ul[^>]*>.*?</ul>|<p[^>]*>No related articles found\.</p>)',
+    re.DOTALL,
+)
+RELATED_SECTION_PATTERN = re.compile(r'<section data-related-guides="">.*?</section>', re.DOTALL)
+
+
+def tokens(text):
+    return [t for t in TOKEN_PATTERN.findall((text or "").lower()) if t not in STOPWORDS]
+
+
+def term_counts(page, product_names):
+    counts = {}
+    fields = {
+        "title": page["title"],
+        "slug": page["slug"].replace("-", " "),
+        "keywords": page["keywords"],
+        "products": " ".join(product_names),
+    }
+    for field, text in fields.items():
+        weight = FIELD_WEIGHTS[field]
+        for term in tokens(text):
+            counts[term] = counts.get(term, 0.0) + weight
+    return counts
+
+
+def load_term_cache(path=TERMS_PATH):
+    if not os.path.exists(path):
+        return {}
+    with open(path, "r", encoding="utf-8") as f:
+        return json.load(f)
+
+
+def load_documents(index, term_cache):
+    """
+    [(slug, page row, {term: weighted tf})] for every article that should be
+    linked. Term counts are reused from `term_cache` ({slug: [output_hash,
+    counts]}, updated in place) for pages whose HTML has not changed.
+    """
+    redirected = set(slug_redirects.load_slug_map())
+    pages = {slug: page for slug, page in index.pages().items() if slug not in redirected and page["title"]}
+    stale = [slug for slug, page in pages.items()
+             if term_cache.get(slug, [None])[0] != page["output_hash"]]
+
+    if stale:
+        products = {}
+        for slug, name in index.query("SELECT slug, name FROM products ORDER BY slug, position"):
+            products.setdefault(slug, []).append(name)
+        for slug in stale:
+            term_cache[slug] = [pages[slug]["output_hash"], term_counts(pages[slug], products.get(slug, []))]
+    for slug in set(term_cache) - set(pages):
+        del term_cache[slug]
+    return [(slug, page, term_cache[slug][1]) for slug, page in pages.items()]
+
+
+def tfidf(documents):
+    """
+    Sparse, L2-normalised TF-IDF in CSR form: (indptr, term_ids, weights, df).
+    Terms that only one article uses still count towards its norm.
+    """
+    vocabulary = {}
+    indptr = [0]
+    term_ids = []
+    tf = []
+    for _, _, counts in documents:
+        for term, count in counts.items():
+            term_ids.append(vocabulary.setdefault(term, len(vocabulary)))
+            tf.append(count)
+        indptr.append(len(term_ids))
+
+    indptr = np.asarray(indptr, dtype=np.int64)
+    term_ids = np.asarray(term_ids, dtype=np.int64)
+    df = np.bincount(term_ids, minlength=len(vocabulary))
+    idf = np.log((1 + len(documents)) / (1 + df)) + 1
+    weights = (1 + np.log(np.asarray(tf, dtype=np.float64))) * idf[term_ids]
+
+    rows = np.repeat(np.arange(len(documents)), np.diff(indptr))
+    norms = np.sqrt(np.bincount(rows, weights=weights ** 2, minlength=len(documents)))
+    weights /= np.maximum(norms, 1e-12)[rows]
+    return indptr, term_ids, weights.astype(np.float32), df
+
+
+def top_k_similar(indptr, term_ids, weights, df, k=RELATED_K, min_score=MIN_SCORE, block_size=BLOCK_SIZE):
+    """
+    Cosine top-k for every row of the CSR matrix, as (indices, scores) arrays of
+    shape (n, k); missing neighbours are -1 / 0.
+    """
+    n = len(indptr) - 1
+    rows = np.repeat(np.arange(n), np.diff(indptr))
+    max_df = max(MAX_DF_FLOOR, int(MAX_DF_RATIO * n))
+    shared = (df[term_ids] > 1) & (df[term_ids] <= max_df)
+
+    # Postings (CSC) of the terms that can link two articles
+    order = np.argsort(term_ids[shared], kind="stable")
+    posting_docs = rows[shared][order]
+    posting_weights = weights[shared][order]
+    posting_ptr = np.zeros(len(df) + 1, dtype=np.int64)
+    np.cumsum(np.bincount(term_ids[shared], minlength=len(df)), out=posting_ptr[1:])
+
+    indices = np.full((n, k), -1, dtype=np.int64)
+    scores = np.zeros((n, k), dtype=np.float32)
+
+    for start in range(0, n, block_size):
+        stop = min(start + block_size, n)
+        lo, hi = indptr[start], indptr[stop]
+        mask = shared[lo:hi]
+        block_rows = rows[lo:hi][mask] - start
+        block_terms = term_ids[lo:hi][mask]
+        block_weights = weights[lo:hi][mask]
+
+        # Expand every (row, term) entry into the term's postings
+        lengths = posting_ptr[block_terms + 1] - posting_ptr[block_terms]
+        total = int(lengths.sum())
+        offsets = np.repeat(posting_ptr[block_terms] - (np.cumsum(lengths) - lengths), lengths)
+        postings = offsets + np.arange(total)
+        flat = np.repeat(block_rows, lengths) * n + posting_docs[postings]
+        products = np.repeat(block_weights, lengths) * posting_weights[postings]
+        similarity = np.bincount(flat, weights=products, minlength=(stop - start) * n)
+        similarity[np.arange(stop - start) * n + np.arange(start, stop)] = 0
+
+        # Top k per row among the few pairs that clear min_score
+        candidates = np.flatnonzero(similarity >= min_score)
+        candidate_rows, candidate_docs = np.divmod(candidates, n)
+        ranked = np.lexsort((-similarity[candidates], candidate_rows))
+        candidate_rows = candidate_rows[ranked]
+        first = np.searchsorted(candidate_rows, np.arange(stop - start))
+        rank = np.arange(len(ranked)) - first[candidate_rows]
+        top = rank < k
+        indices[start + candidate_rows[top], rank[top]] = candidate_docs[ranked][top]
+        scores[start + candidate_rows[top], rank[top]] = similarity[candidates][ranked][top]
+    return indices, scores
+
+
+def page_image(page):
+    image = page["og_image"]
+    return None if not image or image == article_index.PLACEHOLDER_IMAGE else image
+
+
+def build_graph(index, term_cache=None):
+    """{slug: [{slug, title, description, image, score}]} for every linked article."""
+    documents = load_documents(index, {} if term_cache is None else term_cache)
+    if not documents:
+        return {}
+    indptr, term_ids, weights, df = tfidf(documents)
+    indices, scores = top_k_similar(indptr, term_ids, weights, df)
+
+    graph = {}
+    for i, (slug, _, _) in enumerate(documents):
+        graph[slug] = [{
+            "slug": documents[j][0],
+            "title": documents[j][1]["title"],
+            "description": documents[j][1]["description"] or "",
+            "image": page_image(documents[j][1]),
+            "score": round(float(score), 4),
+        } for j, score in zip(indices[i], scores[i]) if j >= 0]
+    return graph
+
+
+def load_graph(path=GRAPH_PATH):
+    if not os.path.exists(path):
+        return {}
+    with open(path, "r", encoding="utf-8") as f:
+        return json.load(f)
+
+
+def save_json(data, path):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(data, f, sort_keys=True, ensure_ascii=False)
+    os.replace(tmp_path, path)
+
+
+def link_list(related):
+    """The part of a graph entry that ends up in the page (scores move on every rebuild)."""
+    return [{key: value for key, value in entry.items() if key != "score"} for entry in related]
+
+
+def refresh(dry_run=False):
+    """
+    Rebuilds and saves the graph. Returns (graph, changed_slugs): the slugs
+    whose rendered related list differs from the previous graph.
+    """
+    index = article_index.default_index()
+    index.sync()
+    started = time.perf_counter()
+    term_cache = load_term_cache()
+    graph = build_graph(index, term_cache)
+    elapsed = time.perf_counter() - started
+
+    previous = load_graph()
+    changed = sorted(slug for slug in graph if link_list(graph[slug]) != link_list(previous.get(slug, [])))
+    linked = sum(1 for related in graph.values() if related)
+    print(f"🔗 Related guides: {linked}/{len(graph)} articles linked in {elapsed * 1000:.0f} ms, "
+          f"{len(changed)} changed")
+    if not dry_run:
+        save_json(graph, GRAPH_PATH)
+        save_json(term_cache, TERMS_PATH)
+    return graph, changed
+
+
+# --- Rendering ---
+
+def related_json_ld(related):
+    schema = {
+        "@context": "https://schema.org",
+        "@type": "ItemList",
+        "name": "Related guides",
+        "itemListElement": [{
+            "@type": "ListItem",
+            "position": i,
+            "url": f"{SITE_URL}/articles/{entry['slug']}",
+            "name": entry["title"],
+        } for i, entry in enumerate(related, 1)],
+    }
+    return f'<script type="application/ld+json">{json.dumps(schema, ensure_ascii=False)}</script>'
+
+
+def related_items(related):
+    items = []
+    for entry in related:
+        image = ""
+        if entry["image"]:
+            image = (f'<img src="{html.escape(entry["image"])}" alt="{html.escape(entry["title"])}" '
+                     f'width="64" height="64" loading="lazy" decoding="async" '
+                     f'class="w-16 h-16 rounded-md object-cover">')
+        items.append(
+            f'<li><a class="flex items-center gap-3 hover:bg-muted p-2 rounded-md transition" '
+            f'href="/articles/{entry["slug"]}">{image}<div class="flex flex-col">'
+            f'<span class="font-medium text-sm text-foreground line-clamp-2">{html.escape(entry["title"])}</span>'
+            f'<span class="text-xs text-muted-foreground line-clamp-1">{html.escape(entry["description"])}</span>'
+            f'</div></a></li>'
+        )
+    return f'<ul class="space-y-3" data-related-guides="">{"".join(items)}</ul>'
+
+
+def inject_related(page_html, related):
+    """
+    Puts the related list into the page's "Related Articles" box (else a
+    section before </main>) and replaces its related-guides JSON-LD.
+    Returns (html, change description or None).
+    """
+    original = page_html
+    page_html = RELATED_JSON_LD_PATTERN.sub("", page_html)
+    page_html = RELATED_SECTION_PATTERN.sub("", page_html)
+    if not related:
+        return page_html, ("removed related guides" if page_html != original else None)
+
+    items = related_items(related)
+    page_html, found = RELATED_BOX_PATTERN.subn(lambda m: f"{m.group(1)}Related guides</h2>{items}", page_html, count=1)
+    if not found:
+        if "</main>" not in page_html:
+            return original, None
+        section = (f'<section data-related-guides="" class="container mx-auto px-4 py-8 space-y-3">'
+                   f'<h2 class="text-lg font-bold">Related guides</h2>{items}</section>')
+        page_html = page_html.replace("</main>", f"{section}</main>", 1)
+    if "</head>" in page_html:
+        page_html = page_html.replace("</head>", f"{related_json_ld(related)}\n</head>", 1)
+
+    if page_html == original:
+        return original, None
+    return page_html, f"{len(related)} related guides"
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Rebuild the related-guides graph and update changed pages")
+    parser.add_argument("--dry-run", action="store_true", help="report what changed without saving or rewriting")
+    args = parser.parse_args()
+
+    graph, changed = refresh(dry_run=args.dry_run)
+    for slug in changed:
+        print(f"   • {slug}: {', '.join(entry['slug'] for entry in graph[slug]) or '(none)'}")
+    if args.dry_run or not changed:
+        return 0
+
+    import postprocess
+    import precompress
+    paths = [os.path.join(article_index.ARTICLES_DIR, f"{slug}.html") for slug in changed]
+    postprocess.process_files(paths, only={"related"})
+    precompress.precompress(paths)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,278 @@
+"""
+Streaming, sharded sitemap writer.
+URLs are written to public/sitemap-<n>.xml shards one <url> at a time; a new
+shard starts every 50,000 URLs or 50 MB, and public/sitemap_index.xml lists
+the shards. Every URL's serialized element and shard number are kept in a
+local SQLite state file (.build/sitemap.sqlite), so individual URLs can be
+upserted or removed by rewriting only the shards they live in.
+
+If the state file is missing it is rebuilt by streaming the existing shards
+(or the legacy single public/sitemap.xml).
+"""
+import os
+import sqlite3
+import xml.etree.ElementTree as ET
+from xml.sax.saxutils import escape
+
+PROJECT_ROOT = os.path.abspath(os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+PUBLIC_DIR = os.path.join(PROJECT_ROOT, "public")
+STATE_PATH = os.path.join(PROJECT_ROOT, ".build", "sitemap.sqlite")
+SITE_URL = "https://www.apnilist.co.in"
+
+SITEMAP_NS = "http://www.sitemaps.org/schemas/sitemap/0.9"
+INDEX_NAME = "sitemap_index.xml"
+LEGACY_NAME = "sitemap.xml"
+SHARD_NAME = "sitemap-{}.xml"
+
+MAX_URLS = 50000
+MAX_BYTES = 50 * 1024 * 1024
+
+URLSET_HEADER = f'<?xml version="1.0" encoding="UTF-8"?>\n<urlset xmlns="{SITEMAP_NS}">\n'
+URLSET_FOOTER = "</urlset>\n"
+OVERHEAD_BYTES = len(URLSET_HEADER) + len(URLSET_FOOTER)
+
+
+def url_element(entry):
+    """Serializes {loc, lastmod?, changefreq?, priority?} as one <url> element."""
+    parts = [f"  <url>\n    <loc>{escape(entry['loc'])}</loc>\n"]
+    for field in ("lastmod", "changefreq", "priority"):
+        if entry.get(field):
+            parts.append(f"    <{field}>{escape(str(entry[field]))}</{field}>\n")
+    parts.append("  </url>\n")
+    return "".join(parts)
+
+
+def shard_path(shard):
+    return os.path.join(PUBLIC_DIR, SHARD_NAME.format(shard))
+
+
+def open_state(reset=False):
+    os.makedirs(os.path.dirname(STATE_PATH), exist_ok=True)
+    conn = sqlite3.connect(STATE_PATH)
+    if reset:
+        conn.execute("DROP TABLE IF EXISTS urls")
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS urls (
+            seq INTEGER PRIMARY KEY AUTOINCREMENT,
+            loc TEXT NOT NULL UNIQUE,
+            shard INTEGER NOT NULL,
+            lastmod TEXT,
+            bytes INTEGER NOT NULL,
+            element TEXT NOT NULL
+        )
+    """)
+    conn.execute("CREATE INDEX IF NOT EXISTS urls_shard ON urls (shard, seq)")
+    return conn
+
+
+class ShardStream:
+    """Writes <url> elements to consecutive shard files, rolling over at the limits."""
+
+    def __init__(self, conn):
+        self.conn = conn
+        self.shard = 0
+        self.count = 0
+        self.size = 0
+        self.file = None
+        self._next_shard()
+
+    def _next_shard(self):
+        self.close()
+        self.shard += 1
+        self.count = 0
+        self.size = OVERHEAD_BYTES
+        self.file = open(f"{shard_path(self.shard)}.tmp", "w", encoding="utf-8")
+        self.file.write(URLSET_HEADER)
+
+    def write(self, entry):
+        if self.conn.execute("SELECT 1 FROM urls WHERE loc = ?", (entry["loc"],)).fetchone():
+            return
+        element = url_element(entry)
+        n = len(element.encode("utf-8"))
+        if self.count and (self.count >= MAX_URLS or self.size + n > MAX_BYTES):
+            self._next_shard()
+        self.file.write(element)
+        self.count += 1
+        self.size += n
+        self.conn.execute(
+            "INSERT INTO urls (loc, shard, lastmod, bytes, element) VALUES (?, ?, ?, ?, ?)",
+            (entry["loc"], self.shard, entry.get("lastmod"), n, element),
+        )
+
+    def close(self):
+        if self.file:
+            self.file.write(URLSET_FOOTER)
+            self.file.close()
+            os.replace(self.file.name, shard_path(self.shard))
+            self.file = None
+
+
+def shard_numbers(conn):
+    return [row[0] for row in conn.execute("SELECT DISTINCT shard FROM urls ORDER BY shard")]
+
+
+def write_index(conn):
+    """Writes sitemap_index.xml; each shard's lastmod is its newest URL's."""
+    rows = conn.execute("SELECT shard, MAX(lastmod) FROM urls GROUP BY shard ORDER BY shard").fetchall()
+    path = os.path.join(PUBLIC_DIR, INDEX_NAME)
+    with open(f"{path}.tmp", "w", encoding="utf-8") as f:
+        f.write(f'<?xml version="1.0" encoding="UTF-8"?>\n<sitemapindex xmlns="{SITEMAP_NS}">\n')
+        for shard, lastmod in rows:
+            f.write(f"  <sitemap>\n    <loc>{SITE_URL}/{SHARD_NAME.format(shard)}</loc>\n")
+            if lastmod:
+                f.write(f"    <lastmod>{escape(lastmod)}</lastmod>\n")
+            f.write("  </sitemap>\n")
+        f.write("</sitemapindex>\n")
+    os.replace(f"{path}.tmp", path)
+
+    # Drop shards that no longer hold any URLs, and the legacy single-file sitemap
+    live = {shard for shard, _ in rows}
+    for name in os.listdir(PUBLIC_DIR):
+        if name.startswith("sitemap-") and name.endswith(".xml"):
+            number = name[len("sitemap-"):-len(".xml")]
+            if number.isdigit() and int(number) not in live:
+                os.remove(os.path.join(PUBLIC_DIR, name))
+    legacy = os.path.join(PUBLIC_DIR, LEGACY_NAME)
+    if os.path.exists(legacy):
+        os.remove(legacy)
+
+
+def write_sitemaps(entries):
+    """
+    Streams `entries` (an iterable of {loc, lastmod, changefreq, priority})
+    into fresh shards and rewrites the index. Returns the number of URLs written.
+    """
+    conn = open_state(reset=True)
+    stream = ShardStream(conn)
+    try:
+        for entry in entries:
+            stream.write(entry)
+    finally:
+        stream.close()
+    conn.commit()
+    total = conn.execute("SELECT COUNT(*) FROM urls").fetchone()[0]
+    write_index(conn)
+    conn.close()
+    return total
+
+
+def iter_sitemap_entries(path):
+    """Streams {loc, lastmod, changefreq, priority} out of an existing urlset file."""
+    tag = f"{{{SITEMAP_NS}}}url"
+    for _, elem in ET.iterparse(path, events=("end",)):
+        if elem.tag == tag:
+            entry = {}
+            for child in elem:
+                entry[child.tag.split("}", 1)[-1]] = (child.text or "").strip()
+            yield entry
+            elem.clear()
+
+
+def rebuild_state():
+    """
+    Recreates the state file by streaming the shards on disk. A legacy
+    single-file public/sitemap.xml is converted into shards instead.
+    """
+    shards = sorted(
+        int(name[len("sitemap-"):-len(".xml")])
+        for name in os.listdir(PUBLIC_DIR)
+        if name.startswith("sitemap-") and name.endswith(".xml") and name[len("sitemap-"):-len(".xml")].isdigit()
+    )
+    legacy = os.path.join(PUBLIC_DIR, LEGACY_NAME)
+    if not shards:
+        entries = list(iter_sitemap_entries(legacy)) if os.path.exists(legacy) else []
+        write_sitemaps(entries)
+        return
+
+    conn = open_state(reset=True)
+    for shard in shards:
+        for entry in iter_sitemap_entries(shard_path(shard)):
+            element = url_element(entry)
+            conn.execute(
+                "INSERT OR REPLACE INTO urls (loc, shard, lastmod, bytes, element) VALUES (?, ?, ?, ?, ?)",
+                (entry["loc"], shard, entry.get("lastmod"), len(element.encode("utf-8")), element),
+            )
+    conn.commit()
+    conn.close()
+
+
+def load_state():
+    if not os.path.exists(STATE_PATH):
+        rebuild_state()
+    return open_state()
+
+
+def rewrite_shards(conn, shards):
+    for shard in shards:
+        path = shard_path(shard)
+        with open(f"{path}.tmp", "w", encoding="utf-8") as f:
+            f.write(URLSET_HEADER)
+            for (element,) in conn.execute("SELECT element FROM urls WHERE shard = ? ORDER BY seq", (shard,)):
+                f.write(element)
+            f.write(URLSET_FOOTER)
+        os.replace(f"{path}.tmp", path)
+
+
+def upsert_urls(entries):
+    """
+    Adds or updates individual URLs, rewriting only the shards they touch.
+    Returns (added, updated).
+    """
+    conn = load_state()
+    touched = set()
+    added = updated = 0
+    for entry in entries:
+        element = url_element(entry)
+        n = len(element.encode("utf-8"))
+        row = conn.execute("SELECT shard, element FROM urls WHERE loc = ?", (entry["loc"],)).fetchone()
+        if row:
+            if row[1] == element:
+                continue
+            conn.execute(
+                "UPDATE urls SET lastmod = ?, bytes = ?, element = ? WHERE loc = ?",
+                (entry.get("lastmod"), n, element, entry["loc"]),
+            )
+            touched.add(row[0])
+            updated += 1
+            continue
+
+        last = conn.execute(
+            "SELECT shard, COUNT(*), SUM(bytes) FROM urls GROUP BY shard ORDER BY shard DESC LIMIT 1"
+        ).fetchone()
+        if last and last[1] < MAX_URLS and OVERHEAD_BYTES + last[2] + n <= MAX_BYTES:
+            shard = last[0]
+        else:
+            shard = (last[0] + 1) if last else 1
+        conn.execute(
+            "INSERT INTO urls (loc, shard, lastmod, bytes, element) VALUES (?, ?, ?, ?, ?)",
+            (entry["loc"], shard, entry.get("lastmod"), n, element),
+        )
+        touched.add(shard)
+        added += 1
+
+    conn.commit()
+    if touched:
+        rewrite_shards(conn, sorted(touched))
+        write_index(conn)
+    conn.close()
+    return added, updated
+
+
+def remove_urls(locs):
+    """Removes individual URLs, rewriting only the shards they lived in. Returns the count removed."""
+    conn = load_state()
+    touched = set()
+    removed = 0
+    for loc in locs:
+        row = conn.execute("SELECT shard FROM urls WHERE loc = ?", (loc,)).fetchone()
+        if row:
+            conn.execute("DELETE FROM urls WHERE loc = ?", (loc,))
+            touched.add(row[0])
+            removed += 1
+    conn.commit()
+    live = set(shard_numbers(conn))
+    if touched:
+        rewrite_shards(conn, sorted(touched & live))
+        write_index(conn)
+    conn.close()
+    return removed
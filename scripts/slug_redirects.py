@@ -0,0 +1,114 @@
+"""
+Persistent old → new article slug store and redirect generation.
+
+The store (src/lib/slugRedirects.json) is the single source of truth for
+article slug migrations. It is kept flat: chains are resolved on every
+write (A→B plus B→C is stored as A→C and B→C), so a visitor never takes
+two hops. The same file is read by:
+
+  - middleware.ts       — edge lookup that 308-redirects /articles/<old>
+  - src/lib/slugMap.ts  — client-side resolveCleanSlug()
+  - the scripts         — via migrate_to_clean_urls.SLUG_MAPPING
+
+vercel.json only gets a regex rule for destinations that several old slugs
+point at (one alternation rule per destination); every other mapping is
+served from the middleware's lookup map.
+"""
+import os
+import re
+import json
+
+PROJECT_ROOT = os.path.abspath(os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+STORE_PATH = os.path.join(PROJECT_ROOT, "src", "lib", "slugRedirects.json")
+
+# Destinations with at least this many old slugs get a vercel.json rule
+MIN_GROUP_SIZE = 2
+GROUP_SOURCE_PREFIX = "/articles/:slug("
+SAFE_SLUG_PATTERN = re.compile(r'[^a-z0-9-]')
+
+
+def load_slug_map(path=STORE_PATH):
+    if not os.path.exists(path):
+        return {}
+    with open(path, "r", encoding="utf-8") as f:
+        return json.load(f)
+
+
+def save_slug_map(slug_map, path=STORE_PATH):
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(dict(sorted(slug_map.items())), f, indent=2)
+        f.write("\n")
+    os.replace(tmp_path, path)
+
+
+def resolve_chains(slug_map):
+    """
+    Points every old slug straight at its final destination.
+    Raises ValueError on a cycle (A→B→A).
+    """
+    flat = {}
+    for old_slug in slug_map:
+        hops = [old_slug]
+        target = slug_map[old_slug]
+        while target in slug_map:
+            if target in hops:
+                raise ValueError(f"Redirect cycle: {' → '.join(hops)} → {target}")
+            hops.append(target)
+            target = slug_map[target]
+        flat[old_slug] = target
+    return flat
+
+
+def add_mappings(new_mappings, path=STORE_PATH):
+    """
+    Merges {old: new} into the store and re-resolves chains.
+    Returns (slug_map, shortened) where `shortened` counts existing entries
+    that now skip an intermediate hop.
+    """
+    current = load_slug_map(path)
+    merged = resolve_chains({**current, **new_mappings})
+    shortened = sum(
+        1 for old_slug, target in current.items()
+        if old_slug not in new_mappings and merged[old_slug] != target
+    )
+    save_slug_map(merged, path)
+    return merged, shortened
+
+
+def escape_slug(slug):
+    """Escapes anything outside [a-z0-9-] for a path-to-regexp group."""
+    return SAFE_SLUG_PATTERN.sub(lambda m: "\\" + m.group(0), slug)
+
+
+def collapse_rules(slug_map, min_group_size=MIN_GROUP_SIZE):
+    """
+    One `/articles/:slug(a|b|c)` rule per destination shared by at least
+    `min_group_size` old slugs. Returns (rules, map_only_count).
+    """
+    by_destination = {}
+    for old_slug, new_slug in sorted(slug_map.items()):
+        by_destination.setdefault(new_slug, []).append(old_slug)
+
+    rules = []
+    map_only = 0
+    for new_slug, old_slugs in sorted(by_destination.items()):
+        if len(old_slugs) < min_group_size:
+            map_only += len(old_slugs)
+            continue
+        rules.append({
+            "source": f"{GROUP_SOURCE_PREFIX}{'|'.join(escape_slug(s) for s in old_slugs)})",
+            "destination": f"/articles/{new_slug}",
+            "permanent": True,
+        })
+    return rules, map_only
+
+
+def is_generated_rule(redirect, slug_map):
+    """Literal per-slug rules from older migrations, and our own group rules."""
+    if redirect.get("has"):
+        return False
+    source = redirect.get("source", "")
+    if source.startswith(GROUP_SOURCE_PREFIX):
+        return True
+    return source.startswith("/articles/") and source[len("/articles/"):] in slug_map
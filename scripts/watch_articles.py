@@ -0,0 +1,387 @@
+"""
+Watch mode: re-renders articles within seconds of being edited.
+
+Polls Supabase every --interval seconds for articles with
+updated_at > cursor, debounces bursts of edits to the same article, then
+re-renders only the touched pages and runs the rest of the pipeline on
+them alone:
+
+  render        warm browser pool (selenium) or the HTTP renderer
+  mark          static_html_generated / status in bulk (job ledger)
+  related       rebuild the related-guides graph (related_articles.py)
+  postprocess   every postprocess.py transform, on the new files only, and
+                the `related` transform on pages whose related list changed
+  sitemap       upsert just these URLs into the shards, with lastmod from
+                their content hashes (indexnow.py; submitted after deploy)
+  search_index  rebuild public/search/ (build_search_index.py)
+  precompress   .br/.gz for whatever changed
+
+An article is flushed once it has been quiet for --debounce seconds, or at
+the latest --max-wait seconds after its first edit, so publish-to-live
+stays under a minute during a burst. Edits that don't change the page's
+inputs (including our own PATCH bumping updated_at) are skipped via the
+build manifest.
+
+The cursor is kept in .build/watch_cursor.json and only advanced once
+everything before it has been flushed, so a restart re-checks (rather than
+drops) edits that were still pending. A flush that fails (Supabase or
+render error) is logged and its articles are queued again, holding the
+cursor until they go through. The daemon holds the generate_html.py
+run lock while it runs.
+
+Usage: python scripts/watch_articles.py [--renderer http] [--interval 10] [--debounce 15]
+                                        [--max-wait 45] [--since 2026-01-01T00:00:00Z] [--once]
+"""
+import os
+import sys
+import glob
+import json
+import time
+import queue
+import argparse
+import threading
+from datetime import datetime, timezone
+
+import build_manifest
+import generate_html
+import http_renderer
+import job_ledger
+import metrics
+import postprocess
+import build_search_index
+import precompress
+import price_analytics
+import related_articles
+import sitemap_writer
+import supabase_client
+from migrate_to_clean_urls import SLUG_MAPPING
+
+PROJECT_ROOT = os.path.abspath(os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+CURSOR_PATH = os.path.join(PROJECT_ROOT, ".build", "watch_cursor.json")
+
+WATCH_INTERVAL = float(os.environ.get("WATCH_INTERVAL", "10"))
+WATCH_DEBOUNCE = float(os.environ.get("WATCH_DEBOUNCE", "15"))
+WATCH_MAX_WAIT = float(os.environ.get("WATCH_MAX_WAIT", "45"))
+WATCH_WORKERS = int(os.environ.get("WATCH_WORKERS", min(2, generate_html.RENDER_WORKERS)))
+
+
+def parse_time(value):
+    return datetime.fromisoformat(value.replace("Z", "+00:00"))
+
+
+def load_cursor():
+    if not os.path.exists(CURSOR_PATH):
+        return None
+    with open(CURSOR_PATH, "r", encoding="utf-8") as f:
+        return json.load(f).get("cursor")
+
+
+def save_cursor(cursor):
+    os.makedirs(os.path.dirname(CURSOR_PATH), exist_ok=True)
+    tmp_path = f"{CURSOR_PATH}.tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump({"cursor": cursor}, f)
+    os.replace(tmp_path, CURSOR_PATH)
+
+
+def latest_update():
+    rows = supabase_client.get("articles", {"select": "updated_at", "order": "updated_at.desc", "limit": "1"})
+    return rows[0]["updated_at"] if rows else None
+
+
+def changed_since(cursor):
+    """[{slug, updated_at}] for every article edited after `cursor`, oldest first."""
+    return supabase_client.get_all("articles", {
+        "select": "slug,updated_at",
+        "updated_at": f"gt.{cursor}",
+        "order": "updated_at.asc",
+    })
+
+
+class Debouncer:
+    """Collects edited slugs until they have been quiet for `debounce` seconds."""
+
+    def __init__(self, debounce, max_wait):
+        self.debounce = debounce
+        self.max_wait = max_wait
+        self.pending = {}   # slug → {"first", "last", "updated_at"}
+
+    def add(self, rows, now):
+        for row in rows:
+            entry = self.pending.setdefault(row["slug"], {"first": now, "last": now, "updated_at": row["updated_at"]})
+            entry["last"] = now
+            entry["updated_at"] = max(entry["updated_at"], row["updated_at"])
+
+    def ready(self, now, flush_all=False):
+        """Pops and returns {slug: updated_at} for every slug that is due."""
+        due = {
+            slug: entry["updated_at"]
+            for slug, entry in self.pending.items()
+            if flush_all or now - entry["last"] >= self.debounce or now - entry["first"] >= self.max_wait
+        }
+        for slug in due:
+            del self.pending[slug]
+        return due
+
+    def requeue(self, due, now):
+        """Puts back {slug: updated_at} from a failed flush; retried once quiet again."""
+        self.add([{"slug": slug, "updated_at": updated_at} for slug, updated_at in due.items()], now)
+
+    def oldest_pending(self):
+        return min((entry["updated_at"] for entry in self.pending.values()), default=None)
+
+
+class BrowserPool:
+    """
+    Keeps `size` headless browsers warm between batches. Each browser is
+    recycled after RECYCLE_AFTER pages, or as soon as it crashes.
+    """
+
+    def __init__(self, size):
+        self.size = size
+        self.idle = queue.Queue()
+        self.pages = {}
+        self.lock = threading.Lock()
+
+    def warm_up(self):
+        print(f"🔥 Warming up {self.size} browser(s)...")
+        for _ in range(self.size):
+            self.idle.put(self.start_driver())
+
+    def start_driver(self):
+        started = time.perf_counter()
+        driver = generate_html.setup_driver()
+        metrics.observe("driver_startup_seconds", time.perf_counter() - started)
+        with self.lock:
+            self.pages[id(driver)] = 0
+        return driver
+
+    def release(self, driver, ok):
+        with self.lock:
+            self.pages[id(driver)] += 1
+            worn_out = self.pages[id(driver)] >= generate_html.RECYCLE_AFTER
+        if worn_out or (not ok and not generate_html.is_driver_alive(driver)):
+            with self.lock:
+                del self.pages[id(driver)]
+            generate_html.quit_driver(driver)
+            driver = self.start_driver()
+        self.idle.put(driver)
+
+    def render(self, slugs, on_rendered, on_started, on_failed):
+        """Renders slugs on the warm browsers. Returns the slugs that were written."""
+        slug_queue = queue.Queue()
+        for slug in slugs:
+            slug_queue.put(slug)
+        processed = []
+
+        def work():
+            while True:
+                try:
+                    slug = slug_queue.get_nowait()
+                except queue.Empty:
+                    return
+                driver = self.idle.get()
+                on_started(slug)
+                page_started = time.perf_counter()
+                result = generate_html.generate_static_file(driver, slug)
+                metrics.observe("page_render_seconds", time.perf_counter() - page_started,
+                                renderer="selenium", result=result)
+                if result == generate_html.RENDERED:
+                    on_rendered(slug)
+                    processed.append(slug)
+                else:
+                    on_failed(slug, result)
+                self.release(driver, result == generate_html.RENDERED)
+
+        threads = [threading.Thread(target=work, name=f"watch-worker-{i + 1}")
+                   for i in range(min(self.size, len(slugs)))]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+        return processed
+
+    def close(self):
+        while not self.idle.empty():
+            generate_html.quit_driver(self.idle.get_nowait())
+
+
+def flush(due, renderer, pool, ledger, manifest):
+    """Runs the pipeline for {slug: updated_at}. Returns the number of pages written."""
+    renderer_version = generate_html.RENDERER_VERSIONS[renderer]
+    with metrics.phase("supabase_fetch"):
+        bundles = {}
+        for slug in due:
+            if slug in SLUG_MAPPING:
+                continue
+            bundle = http_renderer.fetch_article_bundle(slug)
+            if bundle is not None:
+                bundles[slug] = bundle
+
+    if renderer == "http":
+        price_analytics.refresh()
+    input_hashes = {slug: build_manifest.input_hash(bundle, renderer == "http") for slug, bundle in bundles.items()}
+    slugs = [
+        slug for slug, digest in input_hashes.items()
+        if build_manifest.stale_reason(manifest, slug, digest, renderer_version)
+    ]
+    skipped = len(due) - len(slugs)
+    if not slugs:
+        print(f"   {len(due)} edit(s), nothing to re-render")
+        return 0
+
+    print(f"📋 Re-rendering {len(slugs)} article(s){f' ({skipped} unchanged)' if skipped else ''}: {', '.join(slugs)}")
+    ledger.queue(slugs, input_hashes)
+
+    def on_rendered(slug):
+        build_manifest.record_page(manifest, slug, input_hashes[slug], renderer_version)
+        ledger.written(slug)
+        metrics.incr("pages_rendered", renderer=renderer)
+
+    def on_failed(slug, reason):
+        ledger.failed(slug, reason)
+        metrics.incr("render_failures", renderer=renderer, cause=str(reason).split(":", 1)[0])
+
+    with metrics.phase("render", renderer=renderer):
+        if pool:
+            processed = pool.render(slugs, on_rendered, ledger.started, on_failed)
+        else:
+            processed, _, _ = generate_html.render_slugs_http(
+                slugs, bundles, on_rendered=on_rendered, on_started=ledger.started, on_failed=on_failed)
+    build_manifest.save_manifest(manifest)
+    if not processed:
+        return 0
+
+    with metrics.phase("mark"):
+        generate_html.mark_articles_as_processed(processed, ledger)
+
+    paths = [os.path.join(generate_html.OUTPUT_DIR, f"{slug}.html") for slug in processed]
+    with metrics.phase("related"):
+        _, related_changed = related_articles.refresh()
+    relinked = [os.path.join(generate_html.OUTPUT_DIR, f"{slug}.html")
+                for slug in related_changed if slug not in processed]
+    with metrics.phase("postprocess"):
+        postprocess.process_files(paths, workers=1 if len(paths) < 4 else None)
+        if relinked:
+            postprocess.process_files(relinked, only={"related"}, workers=1 if len(relinked) < 4 else None)
+    with metrics.phase("sitemap"):
+        # Relinked pages changed too, so their lastmod moves with them
+        lastmods = generate_html.article_lastmods(paths + relinked)
+        changed = processed + [slug for slug in related_changed if slug not in processed]
+        added, updated = sitemap_writer.upsert_urls(generate_html.article_entry(slug, lastmods) for slug in changed)
+        print(f"🗺️  Sitemap: {added} added, {updated} updated")
+    with metrics.phase("search_index"):
+        build_search_index.build()
+    with metrics.phase("precompress"):
+        sitemaps = glob.glob(os.path.join(sitemap_writer.PUBLIC_DIR, "sitemap*.xml"))
+        precompress.precompress(paths + relinked + sitemaps, workers=1)
+
+    live = datetime.now(timezone.utc)
+    for slug in processed:
+        metrics.observe("publish_latency_seconds", (live - parse_time(due[slug])).total_seconds())
+    return len(processed)
+
+
+def watch(args, ledger):
+    pool = None
+    if args.renderer == "selenium":
+        if not generate_html.is_server_running():
+            print(f"❌ ERROR: Dev server not found at {generate_html.BASE_URL}")
+            return 1
+        pool = BrowserPool(args.workers)
+        pool.warm_up()
+
+    cursor = args.since or load_cursor() or latest_update()
+    if cursor is None:
+        print("❌ No articles in Supabase to watch.")
+        return 1
+    save_cursor(cursor)
+    print(f"👀 Watching articles edited after {cursor} "
+          f"(poll {args.interval:.0f}s, debounce {args.debounce:.0f}s, max wait {args.max_wait:.0f}s)")
+
+    debouncer = Debouncer(args.debounce, args.max_wait)
+    poll_cursor = cursor
+    try:
+        while True:
+            try:
+                rows = changed_since(poll_cursor)
+            except Exception as e:
+                print(f"⚠ Poll failed: {e}")
+                rows = []
+            now = time.monotonic()
+            if rows:
+                debouncer.add(rows, now)
+                poll_cursor = rows[-1]["updated_at"]
+                print(f"✏️  {len(rows)} edit(s): {', '.join(sorted({row['slug'] for row in rows}))}")
+
+            due = debouncer.ready(now, flush_all=args.once)
+            failed = False
+            if due:
+                metrics.start("watch")
+                status = "error"
+                try:
+                    flush(due, args.renderer, pool, ledger, build_manifest.load_manifest())
+                    status = "ok"
+                except Exception as e:
+                    # Keep the daemon up: the edits go back in the queue and the cursor stays put
+                    print(f"⚠ Flush of {len(due)} article(s) failed, retrying after {args.debounce:.0f}s: {e}")
+                    metrics.incr("watch_flush_failures", len(due))
+                    debouncer.requeue(due, time.monotonic())
+                    status = "failed"
+                    failed = True
+                finally:
+                    metrics.finish(status)
+
+            # Only move the saved cursor past edits that have been flushed
+            oldest = debouncer.oldest_pending()
+            if oldest is None and poll_cursor != cursor:
+                cursor = poll_cursor
+                save_cursor(cursor)
+
+            if args.once:
+                return 1 if failed else 0
+            time.sleep(args.interval)
+    except KeyboardInterrupt:
+        print("\n👋 Stopping watcher")
+        return 0
+    finally:
+        if pool:
+            pool.close()
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Re-render articles as they are edited in Supabase")
+    parser.add_argument("--renderer", choices=["selenium", "http"], default=os.environ.get("RENDERER", "selenium"))
+    parser.add_argument("--interval", type=float, default=WATCH_INTERVAL, help="seconds between polls")
+    parser.add_argument("--debounce", type=float, default=WATCH_DEBOUNCE,
+                        help="seconds an article must be quiet before it is re-rendered")
+    parser.add_argument("--max-wait", type=float, default=WATCH_MAX_WAIT,
+                        help="re-render an article at most this long after its first edit, even mid-burst")
+    parser.add_argument("--workers", type=int, default=WATCH_WORKERS, help="warm browsers (selenium)")
+    parser.add_argument("--since", help="ISO timestamp to start from instead of the saved cursor")
+    parser.add_argument("--once", action="store_true", help="poll once, flush everything and exit")
+    return parser.parse_args()
+
+
+def main():
+    args = parse_args()
+    try:
+        lock = job_ledger.RunLock().acquire()
+    except job_ledger.RunLocked as e:
+        print(f"❌ {e}")
+        return 1
+    ledger = job_ledger.JobLedger()
+    ledger.start_run("watch", args.renderer)
+    status = "interrupted"
+    try:
+        code = watch(args, ledger)
+        status = "finished" if code == 0 else "failed"
+        return code
+    finally:
+        ledger.finish_run(status)
+        ledger.close()
+        lock.release()
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -22,7 +22,26 @@ const MostTrackedSection = () => {
   const [products, setProducts] = useState<Product[]>([]);
 
   useEffect(() => {
+    // Rolled up from wishlist activity by scripts/analytics_rollup.py and served from the CDN
+    const fetchFeed = async (): Promise<Product[] | null> => {
+      try {
+        const response = await fetch("/feeds/most-tracked.json");
+        if (!response.ok) return null;
+        const feed: { items: Product[] } = await response.json();
+        return feed.items?.length ? feed.items.slice(0, 6) : null;
+      } catch {
+        return null;
+      }
+    };
+
     const fetchProducts = async () => {
+      const fromFeed = await fetchFeed();
+      if (fromFeed) {
+        setProducts(fromFeed);
+        return;
+      }
+
+      // No feed yet: fall back to live queries
       const { data: productsData } = await supabase
         .from("products")
         .select("id, name, image, amazon_link, flipkart_link, rating")
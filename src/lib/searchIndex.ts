@@ -0,0 +1,252 @@
+// Browser side of the static search index that scripts/build_search_index.py
+// writes to public/search/. The manifest is fetched once; term shards and
+// doc chunks are fetched lazily (and cached) as queries touch them, so a
+// search never queries Supabase. Callers fall back to Supabase only when a
+// load here rejects (see SearchResults.tsx).
+
+export type SearchDoc = {
+  k: "a" | "p"; // article or product
+  slug: string;
+  title: string;
+  excerpt?: string;
+  image?: string | null;
+  category?: string | null;
+  tags?: string[];
+  author?: string | null;
+  views?: number;
+  created_at?: string;
+  brand?: string;
+  price?: number | null;
+};
+
+export type SearchHit = SearchDoc & { id: number; score: number };
+
+type SearchManifest = {
+  version: number;
+  built_at: string;
+  doc_chunk: number;
+  ranges: { a: [number, number]; p: [number, number] }; // [first, end) doc ids of each kind
+  categories: { name: string; slug: string }[];
+  shards: { file: string; first: string; terms: number }[];
+  docs: string[];
+};
+
+type Shard = { terms: string[]; postings: number[][] };
+
+type Scores = Map<number, number>;
+
+const BASE_URL = "/search/";
+const INDEX_VERSION = 1;
+
+// How much a term match counts, relative to its field weight
+const EXACT = 1;
+const PREFIX = 0.6;
+const TYPO = 0.4;
+
+let manifestPromise: Promise<SearchManifest> | null = null;
+const fileCache = new Map<string, Promise<any>>();
+
+const fetchJson = async (file: string) => {
+  const response = await fetch(BASE_URL + file);
+  if (!response.ok) throw new Error(`Search index ${file}: HTTP ${response.status}`);
+  return response.json();
+};
+
+// Shard and chunk names are content hashes, so a fetched file never goes stale
+const loadFile = <T>(file: string): Promise<T> => {
+  if (!fileCache.has(file)) {
+    fileCache.set(file, fetchJson(file).catch((err) => {
+      fileCache.delete(file);
+      throw err;
+    }));
+  }
+  return fileCache.get(file);
+};
+
+export const loadManifest = (): Promise<SearchManifest> => {
+  if (!manifestPromise) {
+    manifestPromise = fetchJson("index.json")
+      .then((manifest: SearchManifest) => {
+        if (manifest.version !== INDEX_VERSION) throw new Error(`Search index version ${manifest.version}`);
+        return manifest;
+      })
+      .catch((err) => {
+        manifestPromise = null;
+        throw err;
+      });
+  }
+  return manifestPromise;
+};
+
+// Must match tokenize() in scripts/build_search_index.py
+export const tokenize = (text: string): string[] => text.toLowerCase().match(/[a-z0-9]+/g) ?? [];
+
+const facet = (kind: string, value: string) => `${kind}:${value.trim().toLowerCase()}`;
+
+// Shards are contiguous sorted term ranges: every shard that can hold a term in [lo, hi]
+const shardsFor = (manifest: SearchManifest, lo: string, hi: string): string[] => {
+  const shards = manifest.shards;
+  let left = 0;
+  let right = shards.length - 1;
+  while (left < right) {
+    const mid = (left + right + 1) >> 1;
+    if (shards[mid].first <= lo) left = mid;
+    else right = mid - 1;
+  }
+  const files: string[] = [];
+  for (let i = left; i < shards.length && (i === left || shards[i].first <= hi); i++) {
+    files.push(shards[i].file);
+  }
+  return files;
+};
+
+// Calls visit(term, postings) for every term in [lo, hi]
+const scanTerms = async (
+  manifest: SearchManifest,
+  lo: string,
+  hi: string,
+  visit: (term: string, postings: number[]) => void,
+) => {
+  const shards = await Promise.all(shardsFor(manifest, lo, hi).map((file) => loadFile<Shard>(file)));
+  for (const shard of shards) {
+    shard.terms.forEach((term, i) => {
+      if (term >= lo && term <= hi) visit(term, shard.postings[i]);
+    });
+  }
+};
+
+// Postings are (doc id delta << 2) | field weight
+const addPostings = (scores: Scores, postings: number[], factor: number) => {
+  let id = 0;
+  for (const value of postings) {
+    id += value >> 2;
+    const score = (value & 3) * factor;
+    if (score > (scores.get(id) ?? 0)) scores.set(id, score);
+  }
+};
+
+// Optimal string alignment distance (adjacent swaps count as one edit), capped at max + 1
+const editDistance = (a: string, b: string, max: number): number => {
+  if (Math.abs(a.length - b.length) > max) return max + 1;
+  let prevPrev: number[] = [];
+  let prev = Array.from({ length: b.length + 1 }, (_, j) => j);
+  for (let i = 1; i <= a.length; i++) {
+    const row = [i];
+    let rowMin = i;
+    for (let j = 1; j <= b.length; j++) {
+      const cost = a[i - 1] === b[j - 1] ? 0 : 1;
+      let value = Math.min(prev[j] + 1, row[j - 1] + 1, prev[j - 1] + cost);
+      if (i > 1 && j > 1 && a[i - 1] === b[j - 2] && a[i - 2] === b[j - 1]) {
+        value = Math.min(value, prevPrev[j - 2] + 1);
+      }
+      row.push(value);
+      rowMin = Math.min(rowMin, value);
+    }
+    if (rowMin > max) return max + 1;
+    prevPrev = prev;
+    prev = row;
+  }
+  return prev[b.length];
+};
+
+const allowedTypos = (token: string) => (token.length >= 8 ? 2 : token.length >= 4 ? 1 : 0);
+
+// Exact and prefix matches; typo-tolerant matches (same first letter) only if those find nothing
+const matchToken = async (manifest: SearchManifest, token: string): Promise<Scores> => {
+  const scores: Scores = new Map();
+  const hi = token.length >= 2 ? token + "\uffff" : token;
+  await scanTerms(manifest, token, hi, (term, postings) => {
+    if (term.includes(":")) return; // facet terms
+    addPostings(scores, postings, term === token ? EXACT : PREFIX);
+  });
+
+  const maxTypos = allowedTypos(token);
+  if (scores.size || !maxTypos) return scores;
+  await scanTerms(manifest, token[0], token[0] + "\uffff", (term, postings) => {
+    if (!term.includes(":") && editDistance(token, term, maxTypos) <= maxTypos) {
+      addPostings(scores, postings, TYPO);
+    }
+  });
+  return scores;
+};
+
+const matchFacet = async (manifest: SearchManifest, term: string): Promise<Scores> => {
+  const scores: Scores = new Map();
+  await scanTerms(manifest, term, term, (_, postings) => addPostings(scores, postings, EXACT));
+  return scores;
+};
+
+const union = (sets: Scores[]): Scores => {
+  const merged: Scores = new Map();
+  for (const set of sets) {
+    set.forEach((score, id) => merged.set(id, Math.max(score, merged.get(id) ?? 0)));
+  }
+  return merged;
+};
+
+// Docs in every set, scores summed; null means "no constraint"
+const intersect = (sets: Scores[]): Scores | null => {
+  if (!sets.length) return null;
+  const [smallest, ...rest] = [...sets].sort((a, b) => a.size - b.size);
+  const result: Scores = new Map();
+  smallest.forEach((score, id) => {
+    let total = score;
+    for (const set of rest) {
+      const other = set.get(id);
+      if (other === undefined) return;
+      total += other;
+    }
+    result.set(id, total);
+  });
+  return result;
+};
+
+const loadDocs = async (manifest: SearchManifest, ids: number[]): Promise<Map<number, SearchDoc>> => {
+  const chunks = [...new Set(ids.map((id) => Math.floor(id / manifest.doc_chunk)))];
+  const loaded = await Promise.all(chunks.map((chunk) => loadFile<SearchDoc[]>(manifest.docs[chunk])));
+  const docs = new Map<number, SearchDoc>();
+  chunks.forEach((chunk, i) => {
+    loaded[i].forEach((doc, offset) => docs.set(chunk * manifest.doc_chunk + offset, doc));
+  });
+  return docs;
+};
+
+export const loadSearchCategories = async () => (await loadManifest()).categories;
+
+export type SearchOptions = {
+  query?: string;
+  category?: string | null; // category slug
+  tags?: string[]; // any of
+  kind?: "a" | "p";
+  limit?: number; // only the best hits, without loading every matching doc
+};
+
+// Every doc matching the query words (all of them), the category and any of
+// the tags, best match first. With no constraints at all, every doc matches.
+export const searchIndex = async ({ query = "", category, tags = [], kind, limit }: SearchOptions): Promise<SearchHit[]> => {
+  const manifest = await loadManifest();
+  const tokens = [...new Set(tokenize(query))];
+
+  const sets = await Promise.all(tokens.map((token) => matchToken(manifest, token)));
+  if (category) sets.push(await matchFacet(manifest, facet("cat", category)));
+  if (tags.length) {
+    sets.push(union(await Promise.all(tags.map((tag) => matchFacet(manifest, facet("tag", tag))))));
+  }
+
+  const ranges = kind ? [manifest.ranges[kind]] : [manifest.ranges.a, manifest.ranges.p];
+  let scores = intersect(sets);
+  if (!scores) {
+    scores = new Map();
+    for (const [first, end] of ranges) {
+      for (let id = first; id < end; id++) scores.set(id, 0);
+    }
+  }
+  let ids = [...scores.keys()].filter((id) => ranges.some(([first, end]) => id >= first && id < end));
+  if (limit !== undefined) {
+    ids = ids.sort((a, b) => scores.get(b) - scores.get(a) || a - b).slice(0, limit);
+  }
+
+  const docs = await loadDocs(manifest, ids);
+  const hits: SearchHit[] = ids.map((id) => ({ ...docs.get(id), id, score: scores.get(id) }));
+  return hits.sort((a, b) => b.score - a.score || (b.views ?? 0) - (a.views ?? 0));
+};
@@ -1,39 +1,8 @@
-const SLUG_MAP: Record<string, string> = {
-  "air-purifier-19-12-2025": "best-hepa-air-purifier",
-  "air-purifier-20-12-2025": "best-car-air-purifier",
-  "airfrier-25-02-2026": "best-air-fryer",
-  "alkaline-water-purifier-29-01-2026": "best-alkaline-water-purifier",
-  "chimney-19-12-2025": "best-auto-clean-chimney",
-  "chimney-20-12-2025": "best-filterless-chimney",
-  "coffee-maker-19-12-2025": "best-espresso-machine",
-  "coffee-maker-20-12-2025": "best-bean-to-cup-coffee-maker",
-  "dishwasher-06-02-2026": "best-dishwasher",
-  "foldable-mobile-20-12-2025": "best-foldable-phone",
-  "juicer-19-12-2025": "best-cold-press-juicer",
-  "juicer-20-12-2025": "best-centrifugal-juicer",
-  "laptop-19-12-2025": "best-gaming-laptop",
-  "laptop-20-12-2025": "best-ultrabook-laptop",
-  "laptop-under-50k-21-12-2025": "best-laptop-under-40000",
-  "lipstick-06-02-2026": "best-matte-lipstick",
-  "microwave-19-12-2025": "best-convection-microwave",
-  "microwave-20-12-2025": "best-microwave-oven",
-  "mobile-19-12-2025": "best-camera-phone",
-  "mobile-20-12-2025": "best-gaming-phone",
-  "projectors-21-12-2025": "best-smart-projector",
-  "refrigerator-19-12-2025": "best-convertible-refrigerator",
-  "refrigerator-20-12-2025": "best-side-by-side-refrigerator",
-  "semi-autonatic-washing-machine-21-12-2025": "best-semi-automatic-washing-machine",
-  "smart-washing-machine-21-12-2025": "best-smart-washing-machine",
-  "tv-19-12-2025": "best-oled-qled-tv",
-  "tv-20-12-2025": "best-budget-4k-tv",
-  "vaccum-cleaner-19-12-2025": "best-robot-vacuum-cleaner",
-  "vaccum-cleaner-20-12-2025": "best-cordless-vacuum-cleaner",
-  "vaccum-cleaner-wet-dry-20-12-2025": "best-wet-dry-vacuum-cleaner",
-  "washing-machine-20-12-2025": "best-front-load-washing-machine",
-  "washing-machine-21-12-2025": "best-fully-automatic-washing-machine",
-  "watch-07-02-2026": "best-automatic-watch",
-  "water-purifier-29-01-2026": "best-water-purifier-under-15000",
-};
+import slugRedirects from "./slugRedirects.json";
+
+// Old dated slug → clean slug. Written by scripts/migrate_to_clean_urls.py;
+// the same file drives the edge redirects in middleware.ts.
+const SLUG_MAP: Record<string, string> = slugRedirects;
 
 export function resolveCleanSlug(slug: string): string {
   return SLUG_MAP[slug] ?? slug;
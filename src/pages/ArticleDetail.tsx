@@ -202,6 +202,7 @@ const ArticleDetail = () => {
   const [displayProducts, setDisplayProducts] = useState<DisplayProduct[]>([]);
   const [smartPick, setSmartPick] = useState<SmartPick | null>(null);
   const [relatedArticles, setRelatedArticles] = useState<RelatedArticle[]>([]);
+  const [relatedLoading, setRelatedLoading] = useState(false);
   const [loading, setLoading] = useState(true);
   const { toast } = useToast();
 
@@ -397,6 +398,7 @@ const ArticleDetail = () => {
 
   const fetchRelatedArticlesByCategory = async (categoryId: string, currentArticleId: string) => {
     try {
+      setRelatedLoading(true);
       const { data, error } = await supabase
         .from("articles")
         .select("id, title, slug, featured_image, excerpt")
@@ -419,6 +421,8 @@ const ArticleDetail = () => {
     } catch (err: any) {
       console.error("Error fetching related articles:", err.message);
       setRelatedArticles([]);
+    } finally {
+      setRelatedLoading(false);
     }
   };
 
@@ -481,6 +485,35 @@ const ArticleDetail = () => {
     fetchTopSales();
   }, [categoryId]);
 
+  // Readiness signal for static generation (scripts/generate_html.py): flips once
+  // Supabase data is in and the images on the page have loaded or failed.
+  useEffect(() => {
+    window.__APNILIST_READY__ = false;
+    if (loading || salesLoading || triviaLoading || relatedLoading) return;
+
+    if (!article) {
+      window.__APNILIST_READY__ = "error";
+      return;
+    }
+
+    let cancelled = false;
+    const pendingImages = Array.from(document.images)
+      .filter((img) => !img.complete)
+      .map((img) => new Promise<void>((resolve) => {
+        img.addEventListener("load", () => resolve(), { once: true });
+        img.addEventListener("error", () => resolve(), { once: true });
+      }));
+    const imageTimeout = new Promise<void>((resolve) => setTimeout(resolve, 5000));
+
+    Promise.race([Promise.all(pendingImages), imageTimeout]).then(() => {
+      if (!cancelled) window.__APNILIST_READY__ = true;
+    });
+
+    return () => {
+      cancelled = true;
+    };
+  }, [loading, salesLoading, triviaLoading, relatedLoading, article, displayProducts, relatedArticles]);
+
   if (loading) {
     return (
         <div className="min-h-screen bg-background flex flex-col">
@@ -53,6 +53,25 @@ type ProductDetails = {
   review_summary: string | null;
 };
 
+type StaticProductData = {
+  product: Product;
+  history: PriceRow[];
+  details: ProductDetails | null;
+};
+
+// Reads the JSON embedded in /product/<slug>.html; null if there is no static page
+const loadStaticProduct = async (slug: string): Promise<StaticProductData | null> => {
+  try {
+    const response = await fetch(`/product/${slug}.html`);
+    if (!response.ok) return null;
+    const doc = new DOMParser().parseFromString(await response.text(), "text/html");
+    const json = doc.getElementById("product-data")?.textContent;
+    return json ? (JSON.parse(json) as StaticProductData) : null;
+  } catch {
+    return null;
+  }
+};
+
 const toArray = (v: any): string[] => Array.isArray(v) ? v : (typeof v === "string" ? [v] : []);
 
 const ProductDetail = () => {
@@ -78,35 +97,47 @@ const ProductDetail = () => {
     const load = async () => {
       if (!slug) return;
       setLoading(true);
-      const isUuid = /^[0-9a-f]{8}-[0-9a-f]{4}-[0-9a-f]{4}-[0-9a-f]{4}-[0-9a-f]{12}$/i.test(slug);
-      const query = supabase
-        .from("products")
-        .select("id, name, slug, image, amazon_link, flipkart_link, rating, pros, cons, short_description, badge");
-      const { data: p, error } = await (isUuid ? query.eq("id", slug) : query.eq("slug", slug)).maybeSingle();
-
-      if (error || !p) {
-        setLoading(false);
-        return;
+      // Prefer the page pre-rendered by scripts/generate_product_pages.py
+      const staticData = await loadStaticProduct(slug);
+      let p: Product | null = staticData?.product ?? null;
+      let hist: PriceRow[] | null = staticData?.history ?? null;
+      let pd: ProductDetails | null = staticData?.details ?? null;
+
+      if (!staticData) {
+        const isUuid = /^[0-9a-f]{8}-[0-9a-f]{4}-[0-9a-f]{4}-[0-9a-f]{4}-[0-9a-f]{12}$/i.test(slug);
+        const query = supabase
+          .from("products")
+          .select("id, name, slug, image, amazon_link, flipkart_link, rating, pros, cons, short_description, badge");
+        const { data, error } = await (isUuid ? query.eq("id", slug) : query.eq("slug", slug)).maybeSingle();
+
+        if (error || !data) {
+          setLoading(false);
+          return;
+        }
+        p = data as Product;
+
+        const [{ data: histData }, { data: pdData }] = await Promise.all([
+          supabase
+            .from("product_price_history")
+            .select("created_at, amazon_price, flipkart_price, amazon_discount, flipkart_discount")
+            .eq("product_id", p.id)
+            .order("created_at", { ascending: true })
+            .limit(90),
+          (supabase as any)
+            .from("product_details")
+            .select("*")
+            .eq("product_id", p.id)
+            .maybeSingle(),
+        ]);
+        hist = histData as PriceRow[];
+        pd = pdData as ProductDetails;
       }
-      setProduct(p as Product);
-      setActiveImage(p.image);
 
-      const [{ data: hist }, { data: pd }] = await Promise.all([
-        supabase
-          .from("product_price_history")
-          .select("created_at, amazon_price, flipkart_price, amazon_discount, flipkart_discount")
-          .eq("product_id", p.id)
-          .order("created_at", { ascending: true })
-          .limit(90),
-        (supabase as any)
-          .from("product_details")
-          .select("*")
-          .eq("product_id", p.id)
-          .maybeSingle(),
-      ]);
-      setHistory((hist as PriceRow[]) || []);
+      setProduct(p);
+      setActiveImage(p.image);
+      setHistory(hist || []);
       if (pd) {
-        setDetails(pd as ProductDetails);
+        setDetails(pd);
         const gal = (pd as any).gallery as string[] | undefined;
         if (gal && gal.length > 0) setActiveImage(gal[0]);
       }
@@ -6,6 +6,7 @@ import { Card } from "@/components/ui/card";
 import { Button } from "@/components/ui/button";
 import { Badge } from "@/components/ui/badge";
 import { supabase } from "@/integrations/supabase/client";
+import { searchIndex, loadSearchCategories, SearchHit } from "@/lib/searchIndex";
 import { useToast } from "@/hooks/use-toast";
 import dayjs from "dayjs";
 import { getCategoryImage } from "@/lib/categoryImages";
@@ -45,6 +46,7 @@ const ageFilters = [
 ];
 
 const sortOptions = [
+  { label: "Best Match", value: "relevance" },
   { label: "Newest First", value: "newest" },
   { label: "Oldest First", value: "oldest" },
   { label: "Most Liked", value: "most_liked" },
@@ -52,6 +54,64 @@ const sortOptions = [
 
 const resultsPerPage = 20;
 const toTitleCase = (str: string) => str ? str.charAt(0).toUpperCase() + str.slice(1).toLowerCase() : "";
+const productResultsShown = 6;
+
+// Result cards come from the static search index (public/search/), or from
+// Supabase only when the index can't be loaded
+const toArticle = (hit: SearchHit): Article => ({
+  id: hit.slug,
+  title: hit.title,
+  slug: hit.slug,
+  excerpt: hit.excerpt || "",
+  featured_image: hit.image || "",
+  category_id: null,
+  categories: hit.category ? { name: hit.category } : null,
+  created_at: hit.created_at,
+  views: hit.views,
+  author: hit.author,
+  tags: hit.tags,
+});
+
+// The static index failed to load (not built yet, or a bad deploy): the live queries it replaced
+const searchSupabase = async (query: string, category: string | null, tags: string[]) => {
+  let queryBuilder = supabase
+    .from("articles")
+    .select("*, categories(name)")
+    .in("status", ["published", "processed"]);
+
+  if (category) {
+    const { data: catData } = await supabase
+      .from("categories")
+      .select("id")
+      .ilike("slug", category)
+      .maybeSingle();
+    if (!catData) return { articles: [] as Article[], products: [] as SearchHit[] };
+    queryBuilder = queryBuilder.eq("category_id", catData.id);
+  }
+  if (tags.length > 0) queryBuilder = queryBuilder.overlaps("tags", tags); // OR operation
+  if (query) queryBuilder = queryBuilder.ilike("title", `%${query}%`);
+
+  const { data, error } = await queryBuilder;
+  if (error) throw error;
+
+  let products: SearchHit[] = [];
+  if (query) {
+    const { data: productData } = await supabase
+      .from("products")
+      .select("id, name, slug, image")
+      .ilike("name", `%${query}%`)
+      .limit(productResultsShown);
+    products = (productData || []).map((p, i) => ({
+      k: "p" as const,
+      slug: p.slug || p.id,
+      title: p.name,
+      image: p.image,
+      id: i,
+      score: 0,
+    }));
+  }
+  return { articles: (data || []) as Article[], products };
+};
 
 
 
@@ -230,16 +290,18 @@ const smartFilterMap: {
 const SearchResults = () => {
   const [searchParams] = useSearchParams();
   const categorySlug = searchParams.get("category");
+  const query = (searchParams.get("q") || "").trim();
 
   const [selectedTags, setSelectedTags] = useState<string[]>([]);
   const [allCategories, setAllCategories] = useState<{ id: string; name: string; slug: string }[]>([]);
   const [selectedCategory, setSelectedCategory] = useState<string | null>(null);
 
   const [articles, setArticles] = useState<Article[]>([]);
+  const [products, setProducts] = useState<SearchHit[]>([]);
   const [loading, setLoading] = useState(true);
   const [selectedPriceFilter, setSelectedPriceFilter] = useState<number | null>(null);
   const [selectedAgeFilter, setSelectedAgeFilter] = useState<number | null>(null);
-  const [selectedSort, setSelectedSort] = useState<string>("newest");
+  const [selectedSort, setSelectedSort] = useState<string>(query ? "relevance" : "newest");
   const [page, setPage] = useState(1);
   const { toast } = useToast();
 
@@ -260,22 +322,29 @@ const SearchResults = () => {
 
   // Fetch categories
   useEffect(() => {
-    const fetchCategories = async () => {
-      const { data, error } = await supabase
-        .from("categories")
-        .select("id, name, slug")
-        .neq('name', 'Uncategorized')
-        .order("name", { ascending: true });
-
-      if (error) {
-        console.error("Error fetching categories:", error);
-        return;
-      }
-      setAllCategories(data || []);
-    };
-    fetchCategories();
+    loadSearchCategories()
+      .then((categories) => setAllCategories(categories.map((c) => ({ id: c.slug, ...c }))))
+      .catch(async (indexError) => {
+        console.warn("Search index unavailable, loading categories from Supabase:", indexError);
+        const { data, error } = await supabase
+          .from("categories")
+          .select("id, name, slug")
+          .neq("name", "Uncategorized")
+          .order("name", { ascending: true });
+        if (error) {
+          console.error("Error fetching categories:", error);
+          return;
+        }
+        setAllCategories(data || []);
+      });
   }, []);
 
+  // A new search term ranks by relevance again
+  useEffect(() => {
+    setSelectedSort(query ? "relevance" : "newest");
+    setPage(1);
+  }, [query]);
+
   // Auto-select category from URL
   useEffect(() => {
     if (categorySlug) {
@@ -291,48 +360,23 @@ const SearchResults = () => {
       try {
         setLoading(true);
         
-        // 1. Start with 'queryBuilder' as your base query
-        let queryBuilder = supabase
-          .from("articles")
-          .select("*, categories(name)")
-          .eq("status", "published");
-
-        // 2. Conditionally add category filter
-        if (selectedCategory) {
-          const { data: catData } = await supabase
-            .from("categories")
-            .select("id")
-            .ilike("slug", selectedCategory)
-            .maybeSingle();
-
-          if (catData) {
-            queryBuilder = queryBuilder.eq("category_id", catData.id);
-          } else {
-            // Category in URL doesn't exist
-            setArticles([]);
-            setLoading(false);
-            return;
-          }
-        }
-
-        // 3. Conditionally add tags filter
-
-          if (selectedTags.length > 0) {
-            //queryBuilder = queryBuilder.contains("tags", selectedTags);
-            queryBuilder = queryBuilder.overlaps("tags", selectedTags); //OR Operation
-          }
-
-        // 4. Execute the query ONCE
-        const { data, error } = await queryBuilder;
-        
-        if (error) {
-          // This is where the .cs error would be caught
-          console.error("Supabase query error:", error);
-          throw error;
+        // 1-3. Query words, category and tags are all looked up in the static index
+        const filters = { query, category: selectedCategory, tags: selectedTags };
+        let filtered: Article[];
+        try {
+          const [articleHits, productHits] = await Promise.all([
+            searchIndex({ ...filters, kind: "a" }),
+            query ? searchIndex({ ...filters, kind: "p", limit: productResultsShown }) : Promise.resolve([]),
+          ]);
+          setProducts(productHits);
+          filtered = articleHits.map(toArticle);
+        } catch (indexError) {
+          console.warn("Search index unavailable, querying Supabase:", indexError);
+          const live = await searchSupabase(query, selectedCategory, selectedTags);
+          setProducts(live.products);
+          filtered = live.articles;
         }
 
-        let filtered = data || [];
-
         // --- Client-side filtering (price, age, sort) ---
         if (selectedPriceFilter) {
           filtered = filtered.filter((a: any) => (a.price || 0) <= selectedPriceFilter);
@@ -363,7 +407,7 @@ const SearchResults = () => {
     };
     
     fetchArticles();
-  }, [selectedCategory, selectedPriceFilter, selectedAgeFilter, selectedSort, selectedTags, toast]); // <-- `selectedTags` is in the dependency array
+  }, [query, selectedCategory, selectedPriceFilter, selectedAgeFilter, selectedSort, selectedTags, toast]); // <-- `selectedTags` is in the dependency array
   // --- END OF CORRECTED HOOK ---
 
 
@@ -464,7 +508,9 @@ const SearchResults = () => {
           <div className="flex-1 space-y-4">
             <div className="mb-6">
               <h1 className="text-2xl font-bold mb-1 flex items-center gap-2 flex-wrap">
-                {selectedCategory ? (
+                {query ? (
+                  <>Results for &ldquo;{query}&rdquo;</>
+                ) : selectedCategory ? (
                   <>
                     All Articles in
                     <Button variant="outline" size="sm">
@@ -506,6 +552,39 @@ const SearchResults = () => {
             )}
             {/* --- END RESULT COUNT --- */}
 
+            {/* Matching products */}
+            {products.length > 0 && !loading && (
+              <div className="mb-4">
+                <h2 className="font-semibold mb-2">Products</h2>
+                <div className="grid grid-cols-2 md:grid-cols-3 gap-3">
+                  {products.map((product) => (
+                    <Card key={product.slug} className="hover:shadow-md transition-all duration-300 rounded-xl border border-gray-200 bg-white overflow-hidden group">
+                      <Link to={`/product/${product.slug}`} className="flex items-center gap-3 p-3">
+                        <img
+                          src={product.image || getCategoryImage(product.category)}
+                          alt={product.title}
+                          loading="lazy"
+                          className="w-12 h-12 object-contain flex-shrink-0"
+                        />
+                        <div className="min-w-0">
+                          <p className="text-sm font-medium text-gray-900 line-clamp-2 group-hover:text-[hsl(10.1,67.8%,45%)]">
+                            {product.title}
+                          </p>
+                          {product.price ? (
+                            <p className="text-xs text-muted-foreground">₹{product.price.toLocaleString("en-IN")}</p>
+                          ) : null}
+                        </div>
+                      </Link>
+                    </Card>
+                  ))}
+                </div>
+              </div>
+            )}
+
+            {query && !loading && articles.length === 0 && products.length === 0 && (
+              <p className="text-muted-foreground">No articles or products match &ldquo;{query}&rdquo;.</p>
+            )}
+
             {paginatedArticles.map((article) => {
               const ageDays = dayjs().diff(dayjs(article.created_at), "day");
 
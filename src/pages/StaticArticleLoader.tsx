@@ -5,6 +5,7 @@ import Footer from "@/components/layout/Footer";
 import { Skeleton } from "@/components/ui/skeleton";
 import { SEO } from "@/components/SEO";
 import ArticleDetail from "./ArticleDetail";
+import { resolveCleanSlug } from "@/lib/slugMap";
 
 const StaticArticleLoader = () => {
   const { slug } = useParams();
@@ -48,9 +49,16 @@ const StaticArticleLoader = () => {
       }
     };
 
-    if (slug) {
-      fetchHtml();
+    if (!slug) return;
+
+    // Redirected originals are pruned from /articles, so go straight to the clean URL
+    const cleanSlug = resolveCleanSlug(slug);
+    if (cleanSlug !== slug) {
+      navigate(`/articles/${cleanSlug}`, { replace: true });
+      return;
     }
+
+    fetchHtml();
   }, [slug, navigate]);
 
   // If static file not found, render the database-driven ArticleDetail
@@ -1 +1,6 @@
 /// <reference types="vite/client" />
+
+interface Window {
+  /** Set by the draft article route once data and images have settled; read by scripts/generate_html.py. */
+  __APNILIST_READY__?: boolean | "error";
+}
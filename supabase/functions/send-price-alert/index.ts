@@ -6,7 +6,7 @@ const resend = new Resend(Deno.env.get("RESEND_API_KEY"));
 
 const corsHeaders = {
   "Access-Control-Allow-Origin": "*",
-  "Access-Control-Allow-Headers": "authorization, x-client-info, apikey, content-type",
+  "Access-Control-Allow-Headers": "authorization, x-client-info, apikey, content-type, idempotency-key",
 };
 
 interface PriceAlertRequest {
@@ -16,6 +16,90 @@ interface PriceAlertRequest {
   currentPrice: number;
   productUrl: string;
   userEmail: string;
+  idempotencyKey?: string;
+}
+
+async function sha256Hex(text: string) {
+  const digest = await crypto.subtle.digest("SHA-256", new TextEncoder().encode(text));
+  return Array.from(new Uint8Array(digest), (b) => b.toString(16).padStart(2, "0")).join("");
+}
+
+// POST /emails/batch with an Idempotency-Key, so a retried batch is not sent
+// twice. The resend@4.0.0 SDK's batch.send() has no idempotency option.
+async function sendBatch(emails: ReturnType<typeof alertEmail>[], idempotencyKey?: string) {
+  const response = await fetch("https://api.resend.com/emails/batch", {
+    method: "POST",
+    headers: {
+      Authorization: `Bearer ${Deno.env.get("RESEND_API_KEY")}`,
+      "Content-Type": "application/json",
+      ...(idempotencyKey ? { "Idempotency-Key": idempotencyKey } : {}),
+    },
+    body: JSON.stringify(emails),
+  });
+  if (!response.ok) {
+    return { error: new Error(`Resend batch failed: ${response.status} ${await response.text()}`) };
+  }
+  return { error: null };
+}
+
+// One Resend email for an alert; shared by the single and batch paths
+function alertEmail(payload: PriceAlertRequest, supabaseUrl: string) {
+  const savings = payload.targetPrice - payload.currentPrice;
+  const savingsPercent = Math.round((savings / payload.targetPrice) * 100);
+
+  return {
+    from: "ApniList Price Alerts <alerts@resend.dev>",
+    to: [payload.userEmail],
+    subject: `🔥 Price Alert: ${payload.productName} is at your target price!`,
+    html: `
+      <div style="font-family: Arial, sans-serif; max-width: 600px; margin: 0 auto;">
+        <div style="background: linear-gradient(135deg, #667eea 0%, #764ba2 100%); padding: 30px; text-align: center; border-radius: 10px 10px 0 0;">
+          <h1 style="color: white; margin: 0; font-size: 28px;">🔥 Price Alert!</h1>
+        </div>
+        
+        <div style="background: #ffffff; padding: 30px; border: 1px solid #e0e0e0; border-top: none; border-radius: 0 0 10px 10px;">
+          <h2 style="color: #333; margin-top: 0;">${payload.productName}</h2>
+          
+          <div style="background: #f5f5f5; padding: 20px; border-radius: 8px; margin: 20px 0;">
+            <p style="margin: 0 0 10px 0; color: #666; font-size: 14px;">CURRENT PRICE</p>
+            <p style="margin: 0; font-size: 36px; font-weight: bold; color: #4caf50;">₹${payload.currentPrice.toLocaleString('en-IN')}</p>
+          </div>
+
+          <div style="background: #fff3e0; padding: 15px; border-radius: 8px; margin: 20px 0; border-left: 4px solid #ff9800;">
+            <p style="margin: 0; color: #e65100; font-size: 16px; font-weight: bold;">
+              ✨ You save ₹${savings.toLocaleString('en-IN')} (${savingsPercent}% off your target price!)
+            </p>
+          </div>
+
+          <p style="color: #666; line-height: 1.6;">
+            The price has dropped to your target price of <strong>₹${payload.targetPrice.toLocaleString('en-IN')}</strong>! 
+            This is the perfect time to buy!
+          </p>
+
+          <div style="text-align: center; margin: 30px 0;">
+            <a href="${payload.productUrl}" 
+               style="background: linear-gradient(135deg, #667eea 0%, #764ba2 100%); 
+                      color: white; 
+                      padding: 15px 40px; 
+                      text-decoration: none; 
+                      border-radius: 25px; 
+                      font-weight: bold; 
+                      display: inline-block;
+                      box-shadow: 0 4px 15px rgba(102, 126, 234, 0.4);">
+              Buy Now 🛒
+            </a>
+          </div>
+
+          <hr style="border: none; border-top: 1px solid #e0e0e0; margin: 30px 0;" />
+
+          <p style="color: #999; font-size: 12px; text-align: center; margin: 0;">
+            You're receiving this because you set a price alert on ApniList.<br/>
+            Manage your alerts in your <a href="${supabaseUrl.replace('.supabase.co', '.lovableproject.com')}/profile" style="color: #667eea;">profile settings</a>.
+          </p>
+        </div>
+      </div>
+    `,
+  };
 }
 
 serve(async (req) => {
@@ -31,64 +115,41 @@ serve(async (req) => {
 
     // If called with a payload, send specific alert
     if (req.method === "POST") {
-      const payload: PriceAlertRequest = await req.json();
-      
-      const savings = payload.targetPrice - payload.currentPrice;
-      const savingsPercent = Math.round((savings / payload.targetPrice) * 100);
-
-      const { error } = await resend.emails.send({
-        from: "ApniList Price Alerts <alerts@resend.dev>",
-        to: [payload.userEmail],
-        subject: `🔥 Price Alert: ${payload.productName} is at your target price!`,
-        html: `
-          <div style="font-family: Arial, sans-serif; max-width: 600px; margin: 0 auto;">
-            <div style="background: linear-gradient(135deg, #667eea 0%, #764ba2 100%); padding: 30px; text-align: center; border-radius: 10px 10px 0 0;">
-              <h1 style="color: white; margin: 0; font-size: 28px;">🔥 Price Alert!</h1>
-            </div>
-            
-            <div style="background: #ffffff; padding: 30px; border: 1px solid #e0e0e0; border-top: none; border-radius: 0 0 10px 10px;">
-              <h2 style="color: #333; margin-top: 0;">${payload.productName}</h2>
-              
-              <div style="background: #f5f5f5; padding: 20px; border-radius: 8px; margin: 20px 0;">
-                <p style="margin: 0 0 10px 0; color: #666; font-size: 14px;">CURRENT PRICE</p>
-                <p style="margin: 0; font-size: 36px; font-weight: bold; color: #4caf50;">₹${payload.currentPrice.toLocaleString('en-IN')}</p>
-              </div>
-
-              <div style="background: #fff3e0; padding: 15px; border-radius: 8px; margin: 20px 0; border-left: 4px solid #ff9800;">
-                <p style="margin: 0; color: #e65100; font-size: 16px; font-weight: bold;">
-                  ✨ You save ₹${savings.toLocaleString('en-IN')} (${savingsPercent}% off your target price!)
-                </p>
-              </div>
+      const body = await req.json();
+
+      // Batch mode: { alerts: PriceAlertRequest[] } (scripts/price_alert_batch.py).
+      // Up to 100 alerts go out in one Resend batch call, keyed by the
+      // request's Idempotency-Key or else by the alerts' own keys.
+      if (Array.isArray(body.alerts)) {
+        const alerts: PriceAlertRequest[] = body.alerts;
+        const idempotencyKey =
+          req.headers.get("Idempotency-Key") ??
+          (alerts.length > 0 && alerts.every((alert) => alert.idempotencyKey)
+            ? await sha256Hex(alerts.map((alert) => alert.idempotencyKey).join(""))
+            : undefined);
+        const { error } = await sendBatch(
+          alerts.map((alert) => alertEmail(alert, supabaseUrl)),
+          idempotencyKey
+        );
+
+        if (error) {
+          console.error("Error sending alert batch:", error);
+          throw error;
+        }
 
-              <p style="color: #666; line-height: 1.6;">
-                The price has dropped to your target price of <strong>₹${payload.targetPrice.toLocaleString('en-IN')}</strong>! 
-                This is the perfect time to buy!
-              </p>
-
-              <div style="text-align: center; margin: 30px 0;">
-                <a href="${payload.productUrl}" 
-                   style="background: linear-gradient(135deg, #667eea 0%, #764ba2 100%); 
-                          color: white; 
-                          padding: 15px 40px; 
-                          text-decoration: none; 
-                          border-radius: 25px; 
-                          font-weight: bold; 
-                          display: inline-block;
-                          box-shadow: 0 4px 15px rgba(102, 126, 234, 0.4);">
-                  Buy Now 🛒
-                </a>
-              </div>
+        console.log(`Price alert batch sent: ${alerts.length} emails`);
 
-              <hr style="border: none; border-top: 1px solid #e0e0e0; margin: 30px 0;" />
+        return new Response(
+          JSON.stringify({ success: true, sent: alerts.length }),
+          {
+            headers: { ...corsHeaders, "Content-Type": "application/json" },
+            status: 200,
+          }
+        );
+      }
 
-              <p style="color: #999; font-size: 12px; text-align: center; margin: 0;">
-                You're receiving this because you set a price alert on ApniList.<br/>
-                Manage your alerts in your <a href="${supabaseUrl.replace('.supabase.co', '.lovableproject.com')}/profile" style="color: #667eea;">profile settings</a>.
-              </p>
-            </div>
-          </div>
-        `,
-      });
+      const payload: PriceAlertRequest = body;
+      const { error } = await resend.emails.send(alertEmail(payload, supabaseUrl));
 
       if (error) {
         console.error("Error sending email:", error);